@@ -1,3 +1,31 @@
+import importlib
+
 name = "biobb_ahatool"
 __all__ = ["ahatool"]
 __version__ = "1.2"
+
+# Building blocks and launchers are imported on first access (PEP 562), so importing the
+# package does not import biobb_common
+_LAZY_ATTRIBUTES = {
+    'Ahatool': 'biobb_ahatool.ahatool.ahatool',
+    'ahatool_batch': 'biobb_ahatool.ahatool.ahatool',
+    'AhatoolContainer': 'biobb_ahatool.ahatool.ahatool_container',
+    'ahatool_container': 'biobb_ahatool.ahatool.ahatool_container',
+    'ahatool_async': 'biobb_ahatool.ahatool.ahatool_async',
+    'ahatool_container_async': 'biobb_ahatool.ahatool.ahatool_async',
+    'ahatool_many': 'biobb_ahatool.ahatool.ahatool_async',
+}
+
+
+def __getattr__(attribute):
+    if attribute == 'ahatool':
+        return importlib.import_module('biobb_ahatool.ahatool')
+    if attribute in _LAZY_ATTRIBUTES:
+        value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[attribute]), attribute)
+        globals()[attribute] = value
+        return value
+    raise AttributeError(f'module {__name__!r} has no attribute {attribute!r}')
+
+
+def __dir__():
+    return sorted(set(globals()) | {'ahatool'} | set(_LAZY_ATTRIBUTES))
@@ -0,0 +1,65 @@
+import traceback
+from pathlib import Path
+from pycompss.api.task import task
+from pycompss.api.constraint import constraint
+from pycompss.api.parameter import FILE_IN, FILE_OUT
+from biobb_common.tools import file_utils as fu
+from biobb_ahatool.ahatool import ahatool
+from biobb_ahatool.ahatool.resources import auto_threads
+
+# Computing units a task can reserve, matching the threads accepted by AHATool.sh
+COMPUTING_UNITS = (1, 2, 4)
+
+
+def _ahatool(input_path, output_path, properties, **kwargs):
+    try:
+        return_code = ahatool.Ahatool(input_path=input_path, output_path=output_path, properties=properties, **kwargs).launch()
+        if return_code != 0 and not fu.check_complete_files([output_path]):
+            fu.write_failed_output(output_path)
+    except Exception:
+        traceback.print_exc()
+        fu.write_failed_output(output_path)
+
+
+@constraint(computing_units="1")
+@task(input_path=FILE_IN, output_path=FILE_OUT)
+def _ahatool_pc_1(input_path, output_path, properties, **kwargs):
+    _ahatool(input_path, output_path, properties, **kwargs)
+
+
+@constraint(computing_units="2")
+@task(input_path=FILE_IN, output_path=FILE_OUT)
+def _ahatool_pc_2(input_path, output_path, properties, **kwargs):
+    _ahatool(input_path, output_path, properties, **kwargs)
+
+
+@constraint(computing_units="4")
+@task(input_path=FILE_IN, output_path=FILE_OUT)
+def _ahatool_pc_4(input_path, output_path, properties, **kwargs):
+    _ahatool(input_path, output_path, properties, **kwargs)
+
+
+def computing_units(properties):
+    """Return the computing units reserved for a run with the *threads* property of **properties**.
+
+    With 'auto' threads the units are sized from the resources of the submitting node. The
+    run then sizes its threads again inside the CPUs reserved for the task in the worker.
+    """
+    threads = properties.get('threads') or 1
+    if threads == 'auto':
+        threads = auto_threads(properties.get('database'))['threads']
+    threads = int(threads)
+    return next((units for units in COMPUTING_UNITS if units >= threads), COMPUTING_UNITS[-1])
+
+
+def ahatool_pc(input_path, output_path, properties, **kwargs):
+    """Submit an ahatool task reserving as many computing units as the *threads* property.
+
+    The *database* property is passed as an absolute path, not transferred as a task file, so
+    that the workers use the database in place with its index files. It must be reachable from
+    every worker, as in a shared file system.
+    """
+    if properties.get('database'):
+        properties = dict(properties, database=str(Path(properties['database']).resolve()))
+    tasks = {1: _ahatool_pc_1, 2: _ahatool_pc_2, 4: _ahatool_pc_4}
+    tasks[computing_units(properties)](input_path, output_path, properties, **kwargs)
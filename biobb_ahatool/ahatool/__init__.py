@@ -1,2 +1,30 @@
+import importlib
+
 name = "ahatool"
-__all__ = ["ahatool"]
\ No newline at end of file
+__all__ = ["ahatool"]
+
+# Submodules and their building blocks are imported on first access (PEP 562), so importing
+# the package does not import biobb_common
+_SUBMODULES = ('ahatool', 'ahatool_container', 'ahatool_async', 'database', 'dedup', 'hits', 'warm_container')
+_LAZY_ATTRIBUTES = {
+    'Ahatool': 'ahatool',
+    'ahatool_batch': 'ahatool',
+    'AhatoolContainer': 'ahatool_container',
+    'ahatool_async': 'ahatool_async',
+    'ahatool_container_async': 'ahatool_async',
+    'ahatool_many': 'ahatool_async',
+}
+
+
+def __getattr__(attribute):
+    if attribute in _SUBMODULES:
+        return importlib.import_module(f'{__name__}.{attribute}')
+    if attribute in _LAZY_ATTRIBUTES:
+        value = getattr(importlib.import_module(f'{__name__}.{_LAZY_ATTRIBUTES[attribute]}'), attribute)
+        globals()[attribute] = value
+        return value
+    raise AttributeError(f'module {__name__!r} has no attribute {attribute!r}')
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_SUBMODULES) | set(_LAZY_ATTRIBUTES))
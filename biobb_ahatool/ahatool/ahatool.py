@@ -1,14 +1,29 @@
 #!/usr/bin/env python3
 
 """Module containing the TemplateContainer class and the command line interface."""
-import argparse
 import os
 import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
 
 from biobb_common.generic.biobb_object import BiobbObject
-from biobb_common.configuration import  settings
 from biobb_common.tools import file_utils as fu
 from biobb_common.tools.file_utils import launchlogger
+from biobb_ahatool.ahatool.cache import ResultCache
+from biobb_ahatool.ahatool.checkpoint import Checkpoint
+from biobb_ahatool.ahatool.common import file_digest, path_size, run_key
+from biobb_ahatool.ahatool.dedup import DEDUP_MAPPING, DEDUP_QUERIES, fan_out, fan_out_queries, fasta_inputs, group_inputs, sequence_queries, write_mapping
+from biobb_ahatool.ahatool.limits import LIMITS_SCRIPT, limit_results, stopped_by, write_limits_script
+from biobb_ahatool.ahatool.metrics import RunMetrics, metrics_path
+from biobb_ahatool.ahatool.resources import auto_threads, available_cpus, describe
+from biobb_ahatool.ahatool.results import MERGE_MARKER, merge_results
+from biobb_ahatool.ahatool.sharding import evalue_scales, is_fasta, sequence_names, split_database, split_input, write_shards_script
+from biobb_ahatool.ahatool.staging import DatabaseScratch, link_support_files, shared_support_dir
+
+# Input file extensions picked up when a batch input is a folder
+BATCH_INPUT_EXTENSIONS = ('.fasta', '.fa', '.hmm', '.aln')
 
 
 # 1. Rename class as required
@@ -28,7 +43,22 @@ class Ahatool(BiobbObject):
             * **support_folder** (*str*) - ('AHATool_Resources') Path to the resources folder.
             * **database** (*str*) - ('nr.fa') Database options: 1. nr_db; 2. custom_db.
             * **evalue** (*float*) - (0.0000000001) e-value (recommended: 1e-10).
-            * **threads** (*int*) - (2) Processors options: 1, 2, 4.
+            * **threads** (*int*) - (2) Processors options: 1, 2, 4 or 'auto' to choose them from the CPUs (affinity and cgroup quota) and memory available to the process and the database size.
+            * **database_shards** (*int*) - (1) Number of shards the FASTA database is split into. Every shard is searched by a parallel AHATool.sh job using *threads* processors and the hit tables are merged with E-values corrected to the full database size.
+            * **database_shard_dir** (*str*) - (None) Folder where the database shards are written and reused. Defaults to the database folder.
+            * **input_chunks** (*int*) - (1) Number of chunks a FASTA input is split into, balanced by residue count. Only used with *start* 'search', where every sequence is an independent query: every chunk is run by a parallel AHATool.sh job using *threads* processors and the outputs are merged into one zip with the files of a single run, the hits grouped by query in input order. Differing files that cannot be merged are kept once per chunk in chunk_<i> folders. The build stage makes one profile from the whole input, so it is never chunked. Not used with *database_shards*.
+            * **support_staging_dir** (*str*) - (None) Folder where the read-only copy of the binary and the support files shared by all the runs of the host is created. Defaults to the system temporary folder.
+            * **support_staged** (*bool*) - (False) The binary and the support files are already linked in the working directory (e.g. by :func:`ahatool_batch`) and are not staged again.
+            * **cache_dir** (*str*) - (None) Path to a folder caching the output of previous runs. Runs with the same input content, database, evalue, start, prefix and AHATool.sh are not executed again.
+            * **cache_max_size** (*int*) - (10737418240) Maximum size in bytes of the cache folder. The least recently used outputs are evicted above it.
+            * **checkpoint_dir** (*str*) - (None) Folder where every run keeps its intermediate files in a work folder named after the run parameters until it succeeds. A new attempt of a failed run resumes from the search stage if the profile HMM was built. Not used with *database_shards*.
+            * **scratch_dir** (*str*) - (None) Node-local folder where the database and its index files are copied once, verified by size and checksum, and reused by all the runs of the node. The least recently used copies not in use are evicted when the folder is full.
+            * **scratch_max_size** (*int*) - (None) Maximum size in bytes of the database copies in the scratch folder. Defaults to the free space of the folder.
+            * **max_hits** (*int*) - (None) Maximum number of targets kept in every hit table of the output. The rows of the other targets are removed and the output is marked as truncated.
+            * **max_output_size** (*int*) - (None) Maximum size in bytes of the result files. The run is stopped when everything written in the sandbox folder during the run, intermediate files included, exceeds it, and the largest files other than the hit tables and then the last hits are removed from the output to fit in it.
+            * **time_limit** (*int*) - (None) Maximum wall-clock seconds of the AHATool.sh run. The run is then stopped and the results written so far, if any, are kept in the output marked as truncated.
+            * **metrics** (*bool*) - (False) Write the wall time, bytes moved and child peak RSS of every stage of the run to a JSON file next to the output (<output name>_metrics.json).
+            * **metrics_log** (*bool*) - (False) Write the metrics of every stage of the run to the logs.
             * **remove_tmp** (*bool*) - (True) [WF property] Remove temporal files.
             * **restart** (*bool*) - (False) [WF property] Do not execute if output files exist.
             * **container_path** (*str*) - (None) Container path definition.
@@ -69,6 +99,7 @@ class Ahatool(BiobbObject):
     def __init__(self, input_path, output_path,
                 properties = None, **kwargs) -> None:
         properties = properties or {}
+        init_start = time.perf_counter()
 
         # 2.0 Call parent class constructor
         super().__init__(properties)
@@ -81,26 +112,37 @@ class Ahatool(BiobbObject):
         self.database = properties.get('database', None)
         self.evalue = properties.get('evalue', None)
         self.threads = properties.get('threads', None)
+        self.sizing = None
+        self.database_shards = properties.get('database_shards', 1)
+        self.database_shard_dir = properties.get('database_shard_dir', None)
+        self.input_chunks = properties.get('input_chunks', 1)
         self.binary_path = properties.get('binary_path', 'AHATool.sh')
         self.support_folder = properties.get('support_folder', 'AHATool_Resources/')
         self.support_files = properties.get('support_files', [])
+        self.support_staging_dir = properties.get('support_staging_dir', None)
+        self.support_staged = properties.get('support_staged', False)
+        self.cache_dir = properties.get('cache_dir', None)
+        self.cache_max_size = properties.get('cache_max_size', 10737418240)
+        self.checkpoint_dir = properties.get('checkpoint_dir', None)
+        self.checkpoint = None
+        self.scratch_dir = properties.get('scratch_dir', None)
+        self.scratch_max_size = properties.get('scratch_max_size', None)
+        self.scratch = None
+        self.max_hits = properties.get('max_hits', None)
+        self.max_output_size = properties.get('max_output_size', None)
+        self.time_limit = properties.get('time_limit', None)
+        self.stopped = None
+        self.truncation = None
+        self.metrics = properties.get('metrics', False)
+        self.metrics_log = properties.get('metrics_log', False)
 
         # 2.1 Modify to match constructor parameters
         # Input/Output files
         self.io_dict = {
-            'in': {'input_path': input_path, 'binary_path': self.binary_path},
+            'in': {'input_path': input_path},
             'out': {'output_path': output_path}
         }
 
-        # Add support files to io_dict and working directory
-        list_support_files = os.listdir(self.support_folder)
-        for f in list_support_files:
-            f1 = self.support_folder+f
-            f2 = os.getcwd()
-            shutil.copy2(self.support_folder+f, os.getcwd())
-            self.support_files.append(os.path.join(os.getcwd(), f))
-            self.io_dict["in"][f] = os.path.join(self.support_folder, f)
-
         self.properties = properties
 
         # Check the properties
@@ -108,18 +150,89 @@ class Ahatool(BiobbObject):
         # Check the arguments
         self.check_arguments()
 
+        self.run_metrics = RunMetrics()
+        self.run_metrics.record('init', time.perf_counter() - init_start)
+
     @launchlogger
     def launch(self) -> int:
         """Execute the :class:`Ahatool <ahatool.ahatool.Ahatool>` object."""
-        
+        if self.prepare_launch(): return 0
+
+        # Run Biobb block, releasing the scratch copy and the sandbox folder if it fails
+        try:
+            with self.run_metrics.stage('run_biobb'):
+                self.run_biobb()
+        except BaseException:
+            self.abort_launch()
+            raise
+
+        return self.finish_launch()
+
+    def prepare_launch(self) -> bool:
+        """Stage the files and build the command line of the run. Return True if the execution is skipped."""
+
         # 4. Setup Biobb
-        if self.check_restart(): return 0
-        self.stage_files()
+        if self.check_restart(): return True
+
+        # Reuse the output of an identical previous run
+        binary = shutil.which(self.binary_path) or self.binary_path
+        version = file_digest(binary) if os.path.isfile(binary) else binary
+        if self.cache_dir:
+            self.cache = ResultCache(self.cache_dir, self.cache_max_size)
+            self.cache_key = self.cache.key(self.io_dict['in']['input_path'], self.database, version=version,
+                                            evalue=self.evalue, start=self.start, prefix=self.prefix,
+                                            max_hits=self.max_hits, max_output_size=self.max_output_size,
+                                            database_shards=self.database_shards, input_chunks=self.input_chunks)
+            if self.cache.fetch(self.cache_key, self.io_dict['out']['output_path']):
+                fu.log(f'Output found in cache {self.cache_dir}, the execution will be skipped', self.out_log, self.global_log)
+                return True
+
+        with self.run_metrics.stage('stage_files', path_size(self.io_dict['in']['input_path'])):
+            self.stage_files()
+
+            # Keep the sandbox in a persistent work folder, resuming the run of a previous attempt
+            if self.checkpoint_dir and self.database_shards <= 1 and self.input_chunks <= 1:
+                self.checkpoint = Checkpoint(self.checkpoint_dir, run_key(
+                    self.io_dict['in']['input_path'], self.database, version=version,
+                    evalue=self.evalue, start=self.start, prefix=self.prefix))
+                manifest = self.checkpoint.open(input_path=self.io_dict['in']['input_path'], database=self.database,
+                                                evalue=self.evalue, start=self.start, prefix=self.prefix)
+                self.checkpoint.use_as_sandbox(self.stage_io_dict)
+                fu.log(f'Using work folder {self.checkpoint.work_dir}, attempt {manifest["attempts"]}', self.out_log, self.global_log)
+                profile = self.checkpoint.built_profile()
+                if profile and self.start != 'search':
+                    fu.log(f'Resuming from the search stage with the profile HMM of a previous attempt: {profile}', self.out_log, self.global_log)
+                    self.start = 'search'
+                    self.stage_io_dict['in']['input_path'] = profile
+
+            # Link the shared copy of the binary and support files into the working and the staging directories
+            if not self.support_staged:
+                shared_dir = shared_support_dir(self.support_folder, self.binary_path, self.support_staging_dir)
+                self.support_files += link_support_files(shared_dir, os.getcwd())
+                link_support_files(shared_dir, self.stage_io_dict.get("unique_dir"))
+                fu.log(f'Linking support files from {shared_dir}', self.out_log, self.global_log)
+            else:
+                shared_dir = str(Path(self.binary_path).resolve().parent)
+
+        # Copy the database to the node-local scratch folder, reusing the copy of previous runs
+        if self.database and self.scratch_dir:
+            self.scratch = DatabaseScratch(self.scratch_dir, self.scratch_max_size)
+            with self.run_metrics.stage('database_scratch'):
+                self.database = self.scratch.stage(self.database, self.out_log, self.global_log)
 
         # Creating temporary folder
         #self.tmp_folder = fu.create_unique_dir()
         #fu.log('Creating %s temporary folder' % self.tmp_folder, self.out_log)
 
+        # Size the threads of every job from the available CPUs and memory
+        if self.threads == 'auto':
+            sharded = bool(self.database) and self.database_shards > 1
+            parallel_jobs = self.database_shards if sharded else self.input_chunks
+            self.sizing = auto_threads(self.database, max(1, parallel_jobs), sharded=sharded)
+            self.sizing['parallel_jobs'] = max(1, parallel_jobs)
+            self.threads = self.sizing['threads']
+            fu.log(describe(self.sizing), self.out_log, self.global_log)
+
         # 5. Prepare the command line parameters as instructions list
         instructions = []
         if self.prefix:
@@ -128,7 +241,7 @@ class Ahatool(BiobbObject):
         if self.start:
             instructions.append(f'-s {self.start}')
             fu.log('Appending optional start', self.out_log, self.global_log)
-        if self.database:
+        if self.database and self.database_shards <= 1:
             instructions.append(f'-d {self.database}')
             fu.log('Appending optional database', self.out_log, self.global_log)
         if self.evalue:
@@ -138,23 +251,115 @@ class Ahatool(BiobbObject):
             instructions.append(f'-t {self.threads}')
             fu.log('Appending optional threads', self.out_log, self.global_log)
 
-        unique_dir = self.stage_io_dict.get("unique_dir")
-        self.binary_path = os.path.join(unique_dir, os.path.basename(self.binary_path))
+        # Already linked binaries are shared between runs and executed in place
+        if not self.support_staged:
+            unique_dir = self.stage_io_dict.get("unique_dir")
+            self.binary_path = os.path.join(unique_dir, os.path.basename(self.binary_path))
         # 6. Build the actual command line as a list of items (elements order will be maintained)
         self.cmd = [self.binary_path,
                ' '.join(instructions),
                "-o", self.stage_io_dict['out']['output_path'],
                "-i", self.stage_io_dict['in']['input_path']]
-        fu.log('Creating command line with instructions and required arguments', self.out_log, self.global_log)
 
-        # 8. Uncomment to check the command line 
-        print(' '.join(self.cmd))
+        # Sharded search: one job per database shard, each one in its own folder
+        if self.database and self.database_shards > 1:
+            self.shards = split_database(self.database, self.database_shards, self.database_shard_dir)
+            fu.log(f'Searching {self.shards["total_sequences"]} sequences in {self.database_shards} database shards', self.out_log, self.global_log)
+            commands = []
+            for i, shard in enumerate(self.shards['shards']):
+                shard_dir = Path(self.stage_io_dict.get("unique_dir")).joinpath(f'shard_{i}')
+                shard_dir.mkdir()
+                link_support_files(shared_dir, str(shard_dir))
+                commands.append(f'cd {shard_dir} && {self.cmd[0]} {self.cmd[1]} -d {shard} '
+                                f'-o {shard_dir.joinpath(Path(self.cmd[3]).name)} -i {self.cmd[5]}')
+            self.cmd = ['bash', write_shards_script(str(Path(self.stage_io_dict.get("unique_dir")).joinpath('run_shards.sh')), commands)]
+        # Chunked input: one job per chunk of the FASTA input, each one in its own folder
+        self.chunks = []
+        if self.input_chunks > 1 and self.start != 'search':
+            fu.log('input_chunks ignored: the build stage makes one profile from the whole input, only search runs are chunked', self.out_log, self.global_log)
+        if self.input_chunks > 1 and self.start == 'search' and self.database_shards <= 1 and is_fasta(self.stage_io_dict['in']['input_path']):
+            unique_dir = Path(self.stage_io_dict.get("unique_dir"))
+            self.chunks = split_input(self.stage_io_dict['in']['input_path'], self.input_chunks, str(unique_dir))
+            fu.log(f'Running the input in {len(self.chunks)} chunks', self.out_log, self.global_log)
+            commands = []
+            for chunk in self.chunks:
+                chunk_dir = Path(chunk).parent
+                link_support_files(shared_dir, str(chunk_dir))
+                commands.append(f'cd {chunk_dir} && {self.cmd[0]} {self.cmd[1]} '
+                                f'-o {chunk_dir.joinpath(Path(self.cmd[3]).name)} -i {chunk}')
+            self.cmd = ['bash', write_shards_script(str(unique_dir.joinpath('run_chunks.sh')), commands)]
+        # Intermediate files are written in the work folder to be found by later attempts
+        if self.checkpoint:
+            self.cmd = ['cd', self.stage_io_dict.get("unique_dir"), '&&'] + self.cmd
+        # Stop the run when it exceeds the time or output size limits
+        if self.time_limit or self.max_output_size:
+            unique_dir = self.stage_io_dict.get("unique_dir")
+            self.cmd = ['bash', write_limits_script(str(Path(unique_dir).joinpath(LIMITS_SCRIPT)), ' '.join(self.cmd),
+                                                    unique_dir, self.time_limit, self.max_output_size)]
+        fu.log('Creating command line with instructions and required arguments', self.out_log, self.global_log)
 
-        # Run Biobb block
-        self.run_biobb()
+        # 8. Log the command line
+        fu.log(f"Command line: {' '.join(self.cmd)}", self.out_log, self.global_log)
+        return False
+
+    def finish_launch(self) -> int:
+        """Merge and copy the results to the host, cache them and write the metrics. Return the return code."""
+
+        # Merge the results of every shard
+        if self.database and self.database_shards > 1 and self.return_code == 0:
+            with self.run_metrics.stage('merge_shards') as stage:
+                unique_dir = Path(self.stage_io_dict.get("unique_dir"))
+                output_name = Path(self.stage_io_dict['out']['output_path']).name
+                skipped = merge_results([str(unique_dir.joinpath(f'shard_{i}', output_name)) for i in range(len(self.shards['shards']))],
+                                        self.stage_io_dict['out']['output_path'], evalue_scales(self.shards),
+                                        float(self.evalue) if self.evalue else None)
+                stage['bytes_moved'] = path_size(self.stage_io_dict['out']['output_path'])
+            if skipped:
+                fu.log(f'Files differing between the parts that could not be merged (listed in {MERGE_MARKER}): {", ".join(skipped)}', self.out_log, self.global_log)
+
+        # Merge the results of every input chunk
+        if self.chunks and self.return_code == 0:
+            with self.run_metrics.stage('merge_chunks') as stage:
+                output_name = Path(self.stage_io_dict['out']['output_path']).name
+                input_path = self.stage_io_dict['in']['input_path']
+                skipped = merge_results([str(Path(chunk).parent.joinpath(output_name)) for chunk in self.chunks],
+                                        self.stage_io_dict['out']['output_path'], query_order=sequence_names(input_path),
+                                        part_names=[Path(chunk).parent.name for chunk in self.chunks],
+                                        replacements={Path(input_path).name: input_path})
+                stage['bytes_moved'] = path_size(self.stage_io_dict['out']['output_path'])
+            if skipped:
+                fu.log(f'Files differing between the parts that could not be merged (listed in {MERGE_MARKER}): {", ".join(skipped)}', self.out_log, self.global_log)
+
+        # Apply the hit count and output size limits, keeping the results of a run stopped by a limit
+        self.stopped = stopped_by(self.return_code) if self.time_limit or self.max_output_size else None
+        if self.stopped:
+            fu.log(f'Run stopped by the {self.stopped} limit', self.out_log, self.global_log)
+        if (self.max_hits or self.max_output_size or self.stopped) and os.path.isfile(self.stage_io_dict['out']['output_path']):
+            with self.run_metrics.stage('limit_results'):
+                self.truncation = limit_results(self.stage_io_dict['out']['output_path'], self.max_hits, self.max_output_size, self.stopped)
+            if self.truncation:
+                fu.log(f'Output truncated by the {", ".join(self.truncation["reasons"])} limits', self.out_log, self.global_log)
+                if self.stopped:
+                    self.return_code = 0
 
         # Copy files to host
-        self.copy_to_host()
+        with self.run_metrics.stage('copy_to_host') as stage:
+            self.copy_to_host()
+            if os.path.isfile(self.io_dict['out']['output_path']):
+                stage['bytes_moved'] = path_size(self.io_dict['out']['output_path'])
+
+        # Add the output to the cache
+        if self.cache_dir and self.return_code == 0 and not self.stopped and fu.check_complete_files(self.io_dict['out'].values()):
+            self.cache.store(self.cache_key, self.io_dict['out']['output_path'])
+
+        # Keep the work folder of a failed run for the next attempt
+        if self.checkpoint:
+            if self.return_code == 0 and fu.check_complete_files(self.io_dict['out'].values()):
+                if self.remove_tmp:
+                    self.checkpoint.remove()
+            else:
+                self.checkpoint.save(stages=['build'] if self.checkpoint.built_profile() else [], return_code=self.return_code)
+                fu.log(f'Run failed, its work folder {self.checkpoint.work_dir} is kept to resume it', self.out_log, self.global_log)
 
         # Remove temporary file(s)
         self.tmp_files.extend([
@@ -164,11 +369,31 @@ class Ahatool(BiobbObject):
         self.tmp_files += self.support_files
         #self.remove_tmp_files()
 
+        # Release the scratch copy of the database
+        if self.scratch:
+            self.scratch.release()
+
         # Check output arguments
         self.check_arguments(output_files_created=True, raise_exception=False)
 
+        # Write the metrics of the run
+        if self.metrics:
+            self.run_metrics.write(metrics_path(self.io_dict['out']['output_path']), block='Ahatool',
+                                   input_path=self.io_dict['in']['input_path'], return_code=self.return_code)
+        if self.metrics_log:
+            self.run_metrics.log(self.out_log, self.global_log)
+
         return self.return_code
 
+    def abort_launch(self) -> None:
+        """Remove the sandbox folder of an interrupted run."""
+        if self.scratch:
+            self.scratch.release()
+        unique_dir = getattr(self, 'stage_io_dict', {}).get('unique_dir')
+        # Without sandbox the working directory is used in place, work folders are kept for the next attempt
+        if unique_dir and not self.checkpoint and Path(unique_dir).resolve() != Path.cwd().resolve():
+            shutil.rmtree(unique_dir, ignore_errors=True)
+
 def ahatool(input_path: str, output_path: str, properties: dict = None, **kwargs) -> int:
     """Create :class:`Ahatool <ahatool.ahatool.Ahatool>` class and
     execute the :meth:`launch() <ahatool.ahatool.Ahatool.launch>` method."""
@@ -177,23 +402,196 @@ def ahatool(input_path: str, output_path: str, properties: dict = None, **kwargs
                             output_path=output_path,
                             properties=properties, **kwargs).launch()
 
+def _batch_inputs(input_paths) -> list:
+    """Expand a folder or a list of paths into the sorted list of batch input files."""
+    if isinstance(input_paths, (str, Path)):
+        input_paths = [input_paths]
+    inputs = []
+    for path in map(Path, input_paths):
+        if path.is_dir():
+            inputs.extend(sorted(str(p) for p in path.iterdir() if p.suffix.lower() in BATCH_INPUT_EXTENSIONS))
+        else:
+            inputs.append(str(path))
+    return inputs
+
+
+def _batch_run(input_path: str, output_path: str, properties: dict) -> int:
+    """Worker of :func:`ahatool_batch`. Errors are reported as a None return code instead of being raised."""
+    try:
+        return ahatool(input_path=input_path, output_path=output_path, properties=properties)
+    except Exception as error:
+        fu.log(f'{input_path}: {error}', None, properties.get('global_log'))
+        return None
+
+
+def _batch_workers(properties: dict, max_workers: int = None, cpus: float = None, memory: int = None) -> int:
+    """Return the concurrent runs of a batch, sizing the threads of every job if the *threads* property is 'auto'.
+
+    Every run of a sharded database or chunked input runs one AHATool.sh job per shard or chunk,
+    so the CPUs and memory are shared by the runs times their jobs.
+    """
+    sharded = bool(properties.get('database')) and int(properties.get('database_shards', 1)) > 1
+    chunked = properties.get('start') == 'search' and int(properties.get('input_chunks', 1)) > 1
+    parallel_jobs = int(properties['database_shards']) if sharded else int(properties['input_chunks']) if chunked else 1
+    cpus = available_cpus() if cpus is None else cpus
+    if properties.get('threads') == 'auto':
+        sizing = auto_threads(properties.get('database'), parallel_jobs, cpus, memory, sharded=sharded)
+        properties['threads'] = sizing['threads']
+        fu.log(describe(sizing), None, properties.get('global_log'))
+        return max_workers or sizing['runs']
+    return max_workers or max(1, int(cpus // (int(properties.get('threads') or 1) * parallel_jobs)))
+
+
+def ahatool_batch(input_paths, output_dir: str, properties: dict = None, max_workers: int = None,
+                  deduplicate: bool = False, **kwargs) -> dict:
+    """Execute :class:`Ahatool <ahatool.ahatool.Ahatool>` for every input file of a batch.
+
+    The binary and the support files are linked once in the working directory and shared
+    by all the runs, which are distributed in a process pool. Each input produces its own
+    zip in **output_dir**, named after the input file.
+
+    With **deduplicate**, the inputs searching the same sequences (see
+    :func:`query_key <ahatool.dedup.query_key>`) are run only once: the output of the first
+    one is copied to the outputs of the others and the groups are written to
+    ``deduplication.json`` in **output_dir**. In a search (*start* 'search') every sequence is
+    an independent query, so the distinct sequences of all the FASTA inputs are written once to
+    ``deduplicated_queries.fasta`` and searched in a chunk per worker, and the output of every
+    input gets the hits of its sequences (see :func:`fan_out_queries <ahatool.dedup.fan_out_queries>`).
+
+    Args:
+        input_paths (str | list): Folder with the input files or list of input file paths.
+        output_dir (str): Folder where the output zip files are written.
+        properties (dict): Properties shared by all the runs.
+        max_workers (int): Number of concurrent runs. Defaults to the available CPUs divided by the *threads* property and by the *database_shards* or *input_chunks* jobs of every run, or to the runs fitting in the available CPUs and memory if *threads* is 'auto'.
+        deduplicate (bool): Run only once the inputs searching the same sequences.
+
+    Returns:
+        dict: Return code of every input path (None if the run raised an exception).
+    """
+    properties = dict(properties or {})
+    global_log = properties.get('global_log')
+    inputs = _batch_inputs(input_paths)
+    if not inputs:
+        fu.log('No input files found for the batch', None, global_log)
+        return {}
+
+    output_paths = [str(Path(output_dir).joinpath(Path(f).stem + '.zip')) for f in inputs]
+    if len(set(output_paths)) != len(output_paths):
+        raise ValueError('Batch input files must have different names')
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+
+    # Size the threads of every run and the number of concurrent runs from the available CPUs and memory
+    max_workers = _batch_workers(properties, max_workers)
+
+    # Run only the first input of every group of inputs searching the same sequences. In a search
+    # every sequence is an independent query, so the FASTA inputs are deduplicated by sequence
+    output_of = dict(zip(inputs, output_paths))
+    sequence_inputs = fasta_inputs(inputs) if deduplicate and properties.get('start') == 'search' else []
+    groups = group_inputs([f for f in inputs if f not in sequence_inputs]) if deduplicate else {input_path: [input_path] for input_path in inputs}
+    run_inputs = [group[0] for group in groups.values()]
+    if deduplicate and groups:
+        fu.log(f'Deduplication: {sum(len(group) for group in groups.values())} inputs search {len(run_inputs)} unique queries', None, global_log)
+    run_outputs = [output_of[input_path] for input_path in run_inputs]
+
+    # Search the distinct sequences once, split in a chunk per worker
+    sequences, chunks = None, []
+    if sequence_inputs:
+        queries_path = str(Path(output_dir).joinpath(DEDUP_QUERIES + '.fasta'))
+        if str(Path(output_dir).joinpath(DEDUP_QUERIES + '.zip')) in output_paths:
+            raise ValueError(f'Batch input files searched by sequence cannot be named {DEDUP_QUERIES}')
+        sequences = {'representative': queries_path, 'representative_output': str(Path(output_dir).joinpath(DEDUP_QUERIES + '.zip')),
+                     'queries': sequence_queries(sequence_inputs, queries_path)}
+        query_order = sequence_names(queries_path)
+        fu.log(f'Deduplication: {sum(len(queries) for queries in sequences["queries"].values())} sequences of '
+               f'{len(sequence_inputs)} inputs search {len(query_order)} unique queries', None, global_log)
+        chunks_dir = tempfile.mkdtemp(prefix=f'.{DEDUP_QUERIES}_', dir=output_dir)
+        chunks = split_input(queries_path, max_workers, chunks_dir)
+        run_inputs += chunks
+        run_outputs += [str(Path(chunk).parent) + '.zip' for chunk in chunks]
+
+    # Link the binary and the support files only once for the whole batch
+    binary_path = properties.get('binary_path', 'AHATool.sh')
+    shared_dir = shared_support_dir(properties.get('support_folder', 'AHATool_Resources/'), binary_path,
+                                    properties.get('support_staging_dir'))
+    staged_files = link_support_files(shared_dir, os.getcwd())
+    properties['binary_path'] = os.path.join(os.getcwd(), os.path.basename(binary_path))
+    properties['support_staged'] = True
+
+    max_workers = max(1, min(max_workers, len(run_inputs)))
+    fu.log(f'Running a batch of {len(run_inputs)} inputs with {max_workers} workers', None, global_log)
+
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return_codes = dict(zip(run_inputs, executor.map(_batch_run, run_inputs, run_outputs, [properties] * len(run_inputs))))
+
+    if sequences:
+        # Merge the chunks and write the hits of its sequences to the output of every input
+        chunk_outputs = run_outputs[len(run_outputs) - len(chunks):]
+        sequences['return_code'] = next((code for code in (return_codes.pop(chunk) for chunk in chunks) if code != 0), 0)
+        if sequences['return_code'] == 0:
+            merge_results(chunk_outputs, sequences['representative_output'], query_order=query_order,
+                          part_names=[Path(chunk).parent.name for chunk in chunks])
+            for input_path, queries in sequences['queries'].items():
+                fan_out_queries(sequences['representative_output'], output_of[input_path], queries, input_path)
+        return_codes.update({input_path: sequences['return_code'] for input_path in sequence_inputs})
+        if properties.get('remove_tmp', True):
+            shutil.rmtree(chunks_dir, ignore_errors=True)
+
+    if deduplicate:
+        # Fan the output of every run out to the other inputs of its group
+        for key, group in groups.items():
+            if return_codes[group[0]] == 0:
+                fan_out(output_of[group[0]], {input_path: output_of[input_path] for input_path in group[1:]}, key, group[0])
+        write_mapping(str(Path(output_dir).joinpath(DEDUP_MAPPING)), groups, output_of, return_codes, sequences)
+        return_codes.update({input_path: return_codes[group[0]] for group in groups.values() for input_path in group})
+        return_codes = {input_path: return_codes[input_path] for input_path in output_of}
+    inputs = list(output_of)
+
+    failed = [f for f, code in return_codes.items() if code != 0]
+    if failed:
+        fu.log(f'Batch finished with {len(failed)} failed inputs: {", ".join(failed)}', None, global_log)
+    else:
+        fu.log(f'Batch finished: {len(inputs)} inputs processed successfully', None, global_log)
+
+    if properties.get('remove_tmp', True):
+        fu.rm_file_list(staged_files)
+
+    return return_codes
+
+
 def main():
     """Command line execution of this building block. Please check the command line documentation."""
+    # Only needed by the command line, not imported with the module to keep it light
+    import argparse
+    from biobb_common.configuration import settings
     parser = argparse.ArgumentParser(description='Description for the ahatool module.', formatter_class=lambda prog: argparse.RawTextHelpFormatter(prog, width=99999))
     parser.add_argument('--config', required=False, help='Configuration file')
+    parser.add_argument('--batch', required=False, action='store_true', help='Batch mode: input_path is a folder or a list of input files and output_path is the folder where the output zip files are written')
+    parser.add_argument('--max_workers', required=False, type=int, help='Number of concurrent runs in batch mode')
+    parser.add_argument('--deduplicate', required=False, action='store_true', help='Batch mode: run only once the inputs searching the same sequences')
 
     # 10. Include specific args of each building block following the examples. They should match step 2
     required_args = parser.add_argument_group('required arguments')
-    required_args.add_argument('--input_path', required=True, help='Path to the input file. Accepted formats: FASTA, fasta, HMM, ALN ')
+    required_args.add_argument('--input_path', required=True, nargs='+', help='Path to the input file. Accepted formats: FASTA, fasta, HMM, ALN ')
     required_args.add_argument('--output_path', required=True, help='Output file path. Accepted formats: zip.')
 
     args = parser.parse_args()
+    if len(args.input_path) > 1 and not args.batch:
+        parser.error('Multiple input paths require the --batch flag')
     args.config = args.config or "{}"
     properties = settings.ConfReader(config=args.config).get_prop_dic()
 
+    if args.batch:
+        return_codes = ahatool_batch(input_paths=args.input_path,
+                                     output_dir=args.output_path,
+                                     properties=properties,
+                                     max_workers=args.max_workers,
+                                     deduplicate=args.deduplicate)
+        sys.exit(int(any(code != 0 for code in return_codes.values())))
+
     # 11. Adapt to match Class constructor (step 2)
     # Specific call of each building block
-    ahatool(input_path=args.input_path,
+    ahatool(input_path=args.input_path[0],
                       output_path=args.output_path,
                       properties=properties)
 
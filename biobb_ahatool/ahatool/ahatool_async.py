@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+
+"""Module running ahatool and ahatool_container jobs with asyncio, supervised from a single event loop."""
+import asyncio
+import contextlib
+import os
+import signal
+import subprocess
+import time
+from pathlib import Path
+
+from biobb_common.tools import file_utils as fu
+from biobb_ahatool.ahatool.ahatool import Ahatool
+from biobb_ahatool.ahatool.ahatool_container import AhatoolContainer
+
+# Seconds a terminated command has to exit before being killed
+TERMINATE_GRACE_TIME = 10
+# Maximum length of a line of the command output
+STREAM_LINE_LIMIT = 1 << 20
+
+
+async def _log_stream(stream: asyncio.StreamReader, log) -> None:
+    """Write every line of **stream** to **log** as soon as it is read."""
+    while True:
+        line = await stream.readline()
+        if not line:
+            return
+        if log is not None:
+            log.info(line.decode('utf-8', errors='replace').rstrip('\n'))
+
+
+def _signal_group(process: asyncio.subprocess.Process, sig: int) -> None:
+    try:
+        os.killpg(process.pid, sig)
+    except ProcessLookupError:
+        pass
+
+
+async def _terminate(process: asyncio.subprocess.Process, grace_time: float = TERMINATE_GRACE_TIME) -> None:
+    """Terminate the process group of **process**, killing it if it does not exit in **grace_time** seconds.
+
+    Docker forwards the termination signal to the container, so cold container runs are
+    stopped too. Commands executed in warm containers may outlive their ``docker exec``.
+    """
+    if process.returncode is not None:
+        return
+    _signal_group(process, signal.SIGTERM)
+    try:
+        await asyncio.wait_for(process.wait(), grace_time)
+    except asyncio.TimeoutError:
+        _signal_group(process, signal.SIGKILL)
+        await process.wait()
+
+
+async def run_command(cmd: list, out_log=None, err_log=None, global_log=None, shell_path: str = '/bin/bash',
+                      env: dict = None, cwd: str = None, timeout: float = None) -> int:
+    """Execute **cmd** in a shell subprocess, streaming its stdout and stderr line by line into the logs.
+
+    The command runs in its own process group, which is terminated if the coroutine is
+    cancelled or **timeout** seconds pass. The cancellation or :class:`asyncio.TimeoutError`
+    is raised once the command has exited.
+
+    Args:
+        cmd (list): Command line items, joined as in :class:`CmdWrapper <biobb_common.command_wrapper.cmd_wrapper.CmdWrapper>`.
+        shell_path (str): Shell executing the command line.
+        env (dict): Environment variables added to the ones of this process.
+        cwd (str): Working directory of the command.
+        timeout (float): Maximum seconds the command can run.
+
+    Returns:
+        int: Exit code of the command.
+    """
+    cmd = ' '.join(cmd)
+    fu.log(cmd, out_log)
+    process = await asyncio.create_subprocess_shell(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                                    executable=shell_path, cwd=cwd, start_new_session=True,
+                                                    env={**os.environ, **env} if env else None,
+                                                    limit=STREAM_LINE_LIMIT)
+    try:
+        await asyncio.wait_for(asyncio.gather(_log_stream(process.stdout, out_log),
+                                              _log_stream(process.stderr, err_log),
+                                              process.wait()), timeout)
+    except (asyncio.CancelledError, asyncio.TimeoutError):
+        fu.log(f'Terminating: {cmd[0:80]}...', out_log, global_log)
+        await _terminate(process)
+        raise
+
+    fu.log(f'Exit code {process.returncode}', out_log)
+    fu.log(fu.get_logs_prefix() + 'Executing: ' + cmd[0:80] + '...', None, global_log)
+    fu.log(fu.get_logs_prefix() + f'Exit code {process.returncode}', None, global_log)
+    return process.returncode
+
+
+@contextlib.contextmanager
+def _block_logs(block):
+    """Create the out and err logs of **block** and close them at the end, as :func:`launchlogger <biobb_common.tools.file_utils.launchlogger>`."""
+    block.out_log, block.err_log = fu.get_logs(path=block.path, prefix=block.prefix, step=block.step,
+                                               can_write_console=block.can_write_console_log)
+    try:
+        yield
+    finally:
+        for log in (block.out_log, block.err_log):
+            for handler in log.handlers[:]:
+                handler.close()
+                log.removeHandler(handler)
+
+
+async def _settle(future: asyncio.Future) -> None:
+    """Wait for the executor **future** to finish, even if cancelled again, as its thread cannot be stopped."""
+    while not future.done():
+        try:
+            await asyncio.shield(future)
+        except asyncio.CancelledError:
+            continue
+        except Exception:
+            break
+    if not future.cancelled():
+        # Retrieve the exception, the cancellation is the one raised
+        future.exception()
+
+
+async def launch_async(block, timeout: float = None) -> int:
+    """Execute the launch of an :class:`Ahatool <ahatool.ahatool.Ahatool>` or
+    :class:`AhatoolContainer <ahatool.ahatool_container.AhatoolContainer>` object in the running event loop.
+
+    Staging and merging run in the default executor and the command runs as an asyncio
+    subprocess, so the event loop is free while AHATool.sh runs. If the coroutine is
+    cancelled or the command exceeds **timeout** seconds, the command is terminated, the
+    sandbox folder is removed and the exception is raised. A cancellation while staging
+    waits for the staging to finish before removing the sandbox folder.
+
+    Returns:
+        int: Return code of the run.
+    """
+    loop = asyncio.get_running_loop()
+    with _block_logs(block):
+        try:
+            prepare = loop.run_in_executor(None, block.prepare_launch)
+            try:
+                skipped = await asyncio.shield(prepare)
+            except asyncio.CancelledError:
+                # Abort once the staging has finished, so that nothing it creates is left behind
+                await _settle(prepare)
+                raise
+            if skipped:
+                return 0
+            block.create_cmd_line()
+            start = time.perf_counter()
+            try:
+                block.return_code = await run_command(
+                    block.cmd, block.out_log, block.err_log, block.global_log,
+                    shell_path=getattr(block, 'shell_path', '/bin/bash'),
+                    env=getattr(block, 'env_vars_dict', None),
+                    cwd=block.stage_io_dict['unique_dir'] if getattr(block, 'chdir_sandbox', False) else None,
+                    timeout=timeout)
+            finally:
+                block.run_metrics.record('run_biobb', time.perf_counter() - start)
+        except BaseException:
+            block.abort_launch()
+            raise
+        return await loop.run_in_executor(None, block.finish_launch)
+
+
+async def ahatool_async(input_path: str, output_path: str, properties: dict = None,
+                        timeout: float = None, **kwargs) -> int:
+    """Create :class:`Ahatool <ahatool.ahatool.Ahatool>` class and
+    execute its launch with :func:`launch_async`."""
+    return await launch_async(Ahatool(input_path=input_path, output_path=output_path,
+                                      properties=properties, **kwargs), timeout)
+
+
+async def ahatool_container_async(input_path: str, output_path: str, properties: dict = None,
+                                  timeout: float = None, **kwargs) -> int:
+    """Create :class:`AhatoolContainer <ahatool.ahatool_container.AhatoolContainer>` class and
+    execute its launch with :func:`launch_async`."""
+    return await launch_async(AhatoolContainer(input_path=input_path, output_path=output_path,
+                                               properties=properties, **kwargs), timeout)
+
+
+async def ahatool_many(input_paths: list, output_paths: list, properties: dict = None, container: bool = False,
+                       max_concurrency: int = 16, timeout: float = None) -> dict:
+    """Execute one ahatool job per input with at most **max_concurrency** jobs running at the same time.
+
+    A job that fails, raises or exceeds **timeout** seconds does not stop the others.
+    Cancelling the coroutine terminates all the running jobs.
+
+    Args:
+        input_paths (list): Input file paths.
+        output_paths (list): Output zip paths, one per input.
+        properties (dict): Properties shared by all the jobs.
+        container (bool): Run the jobs with :class:`AhatoolContainer <ahatool.ahatool_container.AhatoolContainer>`.
+        max_concurrency (int): Maximum number of concurrent jobs.
+        timeout (float): Maximum seconds every job can run.
+
+    Returns:
+        dict: Return code of every input path (None if the job raised an exception or timed out).
+    """
+    if len(input_paths) != len(output_paths):
+        raise ValueError('Every input path needs an output path')
+    launcher = ahatool_container_async if container else ahatool_async
+    global_log = (properties or {}).get('global_log')
+    semaphore = asyncio.Semaphore(max_concurrency)
+    for output_path in output_paths:
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+
+    async def job(input_path: str, output_path: str) -> int:
+        async with semaphore:
+            try:
+                return await launcher(input_path, output_path, dict(properties or {}), timeout)
+            except asyncio.TimeoutError:
+                fu.log(f'{input_path}: timed out after {timeout} seconds', None, global_log)
+            except Exception as error:
+                fu.log(f'{input_path}: {error}', None, global_log)
+            return None
+
+    return_codes = await asyncio.gather(*(job(i, o) for i, o in zip(input_paths, output_paths)))
+    return dict(zip(input_paths, return_codes))
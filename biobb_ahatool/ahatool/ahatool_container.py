@@ -1,15 +1,25 @@
 #!/usr/bin/env python3
 
 """Module containing the TemplateContainer class and the command line interface."""
-import argparse
 import os
 import shutil
+import time
 from pathlib import Path
 
 from biobb_common.generic.biobb_object import BiobbObject
-from biobb_common.configuration import settings
 from biobb_common.tools import file_utils as fu
 from biobb_common.tools.file_utils import launchlogger
+from biobb_ahatool.ahatool.cache import ResultCache
+from biobb_ahatool.ahatool.checkpoint import CHECKPOINT_MANIFEST, Checkpoint
+from biobb_ahatool.ahatool.common import path_size, run_key
+from biobb_ahatool.ahatool.limits import LIMITS_SCRIPT, limit_results, stopped_by, write_limits_script
+from biobb_ahatool.ahatool.metrics import RunMetrics, metrics_path
+from biobb_ahatool.ahatool.resources import auto_threads, describe
+from biobb_ahatool.ahatool.results import MERGE_MARKER, merge_results
+from biobb_ahatool.ahatool.staging import DatabaseScratch
+from biobb_ahatool.ahatool.streaming_zip import StreamingZip
+from biobb_ahatool.ahatool.sharding import evalue_scales, is_fasta, sequence_names, split_database, split_input, write_shards_script
+from biobb_ahatool.ahatool.warm_container import WARM_SANDBOX_DIR, WARM_WORK_DIR, get_warm_container
 
 
 # 1. Rename class as required
@@ -27,7 +37,20 @@ class AhatoolContainer(BiobbObject):
             * **start** (*str*) - ('build') Start of execution (search or build).
             * **database** (*str*) - ('./nr.fa') Database options: 1. nr_db; 2. custom_db. Path to the database.
             * **evalue** (*float*) - (0.0000000001) e-value (recommended: 1e-10).
-            * **threads** (*int*) - (2) Processors options: 1, 2, 4.
+            * **threads** (*int*) - (2) Processors options: 1, 2, 4 or 'auto' to choose them from the CPUs (affinity and cgroup quota) and memory available to the process and the database size. Docker containers are then limited to the chosen CPUs and to their share of the available memory.
+            * **database_shards** (*int*) - (1) Number of shards the FASTA database is split into. Every shard is searched by a parallel AHATool.sh job using *threads* processors and the hit tables are merged with E-values corrected to the full database size.
+            * **database_shard_dir** (*str*) - (None) Folder where the database shards are written and reused. Defaults to the database folder.
+            * **input_chunks** (*int*) - (1) Number of chunks a FASTA input is split into, balanced by residue count. Only used with *start* 'search', where every sequence is an independent query: every chunk is run by a parallel AHATool.sh job using *threads* processors and the outputs are merged into one zip with the files of a single run, the hits grouped by query in input order. Differing files that cannot be merged are kept once per chunk in chunk_<i> folders. The build stage makes one profile from the whole input, so it is never chunked. Not used with *database_shards*.
+            * **cache_dir** (*str*) - (None) Path to a folder caching the output of previous runs. Runs with the same input content, database, evalue, start, prefix and container image are not executed again.
+            * **cache_max_size** (*int*) - (10737418240) Maximum size in bytes of the cache folder. The least recently used outputs are evicted above it.
+            * **checkpoint_dir** (*str*) - (None) Folder where every run keeps its intermediate files in a work folder named after the run parameters until it succeeds. The work folder is mounted instead of a new sandbox folder and a new attempt of a failed run resumes from the search stage if the profile HMM was built. Not used with *database_shards*.
+            * **scratch_dir** (*str*) - (None) Node-local folder where the database and its index files are copied once, verified by size and checksum, and reused by all the runs of the node. The least recently used copies not in use are evicted when the folder is full.
+            * **scratch_max_size** (*int*) - (None) Maximum size in bytes of the database copies in the scratch folder. Defaults to the free space of the folder.
+            * **max_hits** (*int*) - (None) Maximum number of targets kept in every hit table of the output. The rows of the other targets are removed and the output is marked as truncated.
+            * **max_output_size** (*int*) - (None) Maximum size in bytes of the result files. The run is stopped when everything written in the sandbox folder during the run, intermediate files included, exceeds it, and the largest files other than the hit tables and then the last hits are removed from the output to fit in it.
+            * **time_limit** (*int*) - (None) Maximum wall-clock seconds of the AHATool.sh run. The run is then stopped and the results written so far, if any, are kept in the output marked as truncated.
+            * **metrics** (*bool*) - (False) Write the wall time and bytes moved of every stage of the run to a JSON file next to the output (<output name>_metrics.json). The child peak RSS is null, as the commands run in the container are not children of the process.
+            * **metrics_log** (*bool*) - (False) Write the metrics of every stage of the run to the logs.
             * **remove_tmp** (*bool*) - (True) [WF property] Remove temporal files.
             * **restart** (*bool*) - (False) [WF property] Do not execute if output files exist.
             * **container_path** (*str*) - (docker) Container path definition.
@@ -35,6 +58,12 @@ class AhatoolContainer(BiobbObject):
             * **container_volume_path** (*str*) - ('/home/projects') Container volume path definition.
             * **container_working_dir** (*str*) - ('/home/projects') Container working directory definition.
             * **container_user_id** (*str*) - (None) Container user_id definition.
+            * **zip_compression_level** (*int*) - (0) Compression level of the output zip: 0 stores the files, 1 to 9 deflates them. Already compressed files are always stored.
+            * **zip_include** (*list*) - (None) Glob patterns of the result files added to the output zip. Defaults to all of them.
+            * **zip_exclude** (*list*) - (None) Glob patterns of the result files left out of the output zip, such as large intermediate files.
+            * **zip_settle_time** (*int*) - (30) Seconds without modification after which a result file is considered finalized and added to the output zip while the run goes on.
+            * **warm_container** (*bool*) - (False) Start one long-lived container per image and database and execute every launch of the process in it instead of running a new container. The sandbox folders of these runs are moved to the biobb_ahatool_warm folder of the working directory, the only one mounted in the containers. Containers are stopped at exit or with :func:`shutdown_warm_containers <ahatool.warm_container.shutdown_warm_containers>`.
+            * **container_idle_timeout** (*int*) - (600) Seconds a warm container can stay idle before being stopped.
     Examples:
         This is a use example of how to use the building block from Python::
             from biobb_ahatool.ahatool.ahatool_container import aahtool_container
@@ -61,6 +90,7 @@ class AhatoolContainer(BiobbObject):
     # 2. Adapt input and output file paths as required. Include all files, even optional ones
     def __init__(self, input_path, output_path, properties=None, **kwargs) -> None:
         properties = properties or {}
+        init_start = time.perf_counter()
 
         # 2.0 Call parent class constructor
         super().__init__(properties)
@@ -80,10 +110,35 @@ class AhatoolContainer(BiobbObject):
         self.database = properties.get('database', None)
         self.evalue = properties.get('evalue', None)
         self.threads = properties.get('threads', None)
+        self.sizing = None
+        self.database_shards = properties.get('database_shards', 1)
+        self.database_shard_dir = properties.get('database_shard_dir', None)
+        self.input_chunks = properties.get('input_chunks', 1)
         self.binary_path = properties.get('binary_path', '/home/AHATool/AHATool.sh')
         self.container_volume_path = properties.get('container_volume_path', '/home/projects')
         self.container_path = properties.get('container_path', 'docker')
         self.container_user_id = properties.get('container_user_id', 'root')
+        self.cache_dir = properties.get('cache_dir', None)
+        self.cache_max_size = properties.get('cache_max_size', 10737418240)
+        self.checkpoint_dir = properties.get('checkpoint_dir', None)
+        self.checkpoint = None
+        self.scratch_dir = properties.get('scratch_dir', None)
+        self.scratch_max_size = properties.get('scratch_max_size', None)
+        self.scratch = None
+        self.max_hits = properties.get('max_hits', None)
+        self.max_output_size = properties.get('max_output_size', None)
+        self.time_limit = properties.get('time_limit', None)
+        self.stopped = None
+        self.truncation = None
+        self.zip_compression_level = properties.get('zip_compression_level', 0)
+        self.zip_include = properties.get('zip_include', None)
+        self.zip_exclude = properties.get('zip_exclude', None)
+        self.zip_settle_time = properties.get('zip_settle_time', 30)
+        self.warm_container = properties.get('warm_container', False)
+        self.container_idle_timeout = properties.get('container_idle_timeout', 600)
+        self.running_container = None
+        self.metrics = properties.get('metrics', False)
+        self.metrics_log = properties.get('metrics_log', False)
         self.properties = properties
 
         # Check the properties
@@ -91,29 +146,111 @@ class AhatoolContainer(BiobbObject):
         # Check the arguments
         self.check_arguments()
 
+        # The docker client is the only child of this process, its peak RSS is not the one of the run
+        self.run_metrics = RunMetrics(child_rss=False)
+        self.run_metrics.record('init', time.perf_counter() - init_start)
+
     @launchlogger
     def launch(self) -> int:
         """Execute the :class:`TemplateContainer <template.template_container.TemplateContainer>` object."""
+        if self.prepare_launch(): return 0
+
+        # Run Biobb block, releasing the scratch copy and the sandbox folder if it fails
+        try:
+            with self.run_metrics.stage('run_biobb'):
+                self.run_biobb()
+        except BaseException:
+            self.abort_launch()
+            raise
+
+        return self.finish_launch()
+
+    def prepare_launch(self) -> bool:
+        """Stage the files, build the command line and start the container of the run. Return True if the execution is skipped."""
 
         # 4. Setup Biobb
-        if self.check_restart(): return 0
-        self.stage_files()
+        if self.check_restart(): return True
+
+        # Reuse the output of an identical previous run
+        if self.cache_dir:
+            self.cache = ResultCache(self.cache_dir, self.cache_max_size)
+            self.cache_key = self.cache.key(self.io_dict['in']['input_path'], self.database,
+                                            version=f'{self.container_image}:{self.binary_path}',
+                                            evalue=self.evalue, start=self.start, prefix=self.prefix,
+                                            max_hits=self.max_hits, max_output_size=self.max_output_size,
+                                            database_shards=self.database_shards, input_chunks=self.input_chunks,
+                                            zip_include=self.zip_include, zip_exclude=self.zip_exclude,
+                                            zip_compression_level=self.zip_compression_level)
+            if self.cache.fetch(self.cache_key, self.io_dict['out']['output_path']):
+                fu.log(f'Output found in cache {self.cache_dir}, the execution will be skipped', self.out_log, self.global_log)
+                return True
+
+        with self.run_metrics.stage('stage_files', path_size(self.io_dict['in']['input_path'])):
+            self.stage_files()
+        input_name = os.path.basename(self.stage_io_dict['in']['input_path'])
+
+        # Keep the sandbox in a persistent work folder, resuming the run of a previous attempt
+        if self.checkpoint_dir and self.database_shards <= 1 and self.input_chunks <= 1:
+            self.checkpoint = Checkpoint(self.checkpoint_dir, run_key(
+                self.io_dict['in']['input_path'], self.database, version=f'{self.container_image}:{self.binary_path}',
+                evalue=self.evalue, start=self.start, prefix=self.prefix))
+            manifest = self.checkpoint.open(input_path=self.io_dict['in']['input_path'], database=self.database,
+                                            evalue=self.evalue, start=self.start, prefix=self.prefix)
+            self.checkpoint.use_as_sandbox(self.stage_io_dict)
+            fu.log(f'Using work folder {self.checkpoint.work_dir}, attempt {manifest["attempts"]}', self.out_log, self.global_log)
+            profile = self.checkpoint.built_profile()
+            if profile and self.start != 'search':
+                fu.log(f'Resuming from the search stage with the profile HMM of a previous attempt: {profile}', self.out_log, self.global_log)
+                self.start = 'search'
+                input_name = os.path.relpath(profile, self.checkpoint.work_dir)
+
+        # Copy the database to the node-local scratch folder, reusing the copy of previous runs
+        if self.database and self.scratch_dir:
+            self.scratch = DatabaseScratch(self.scratch_dir, self.scratch_max_size)
+            with self.run_metrics.stage('database_scratch'):
+                self.database = self.scratch.stage(self.database, self.out_log, self.global_log)
+
+        # Warm containers mount the parent of the sandbox folders, so every sandbox is visible in them.
+        # Sandboxes are moved to a dedicated folder so that the rest of the working directory is not mounted
+        if self.warm_container:
+            unique_dir = Path(self.stage_io_dict.get('unique_dir'))
+            if not self.checkpoint:
+                warm_dir = Path(WARM_SANDBOX_DIR).resolve()
+                warm_dir.mkdir(exist_ok=True)
+                self.stage_io_dict['unique_dir'] = str(unique_dir.rename(warm_dir.joinpath(unique_dir.name)))
+            self.container_volume_path = f"{WARM_WORK_DIR}/{unique_dir.name}"
+
+        # Size the threads of every job from the available CPUs and memory
+        if self.threads == 'auto':
+            sharded = bool(self.database) and self.database_shards > 1
+            parallel_jobs = self.database_shards if sharded else self.input_chunks
+            self.sizing = auto_threads(self.database, max(1, parallel_jobs), sharded=sharded)
+            self.sizing['parallel_jobs'] = max(1, parallel_jobs)
+            self.threads = self.sizing['threads']
+            fu.log(describe(self.sizing), self.out_log, self.global_log)
 
         # 5. Prepare the command line parameters as instructions list
         instructions = []
+        database_dir = None
         if self.prefix:
             instructions.append(f'-p {self.prefix}')
             fu.log('Appending optional prefix', self.out_log, self.global_log)
         if self.start:
             instructions.append(f'-s {self.start}')
             fu.log('Appending optional start', self.out_log, self.global_log)
-        if self.database:
+        if self.database and self.database_shards > 1:
+            # Split the database and link the folder of the shards to a volume in the container
+            self.shards = split_database(self.database, self.database_shards, self.database_shard_dir)
+            database_dir = Path(self.shards['shards'][0]).parent
+            self.container_generic_command = f"run -v {database_dir}:/home/database"
+            fu.log(f'Searching {self.shards["total_sequences"]} sequences in {self.database_shards} database shards', self.out_log, self.global_log)
+        elif self.database:
             # Get the path of the database in the container
             instructions.append(f'-d /home/database/{os.path.basename(self.database)}')
             # Get the folder of the database
-            pathdb = Path(self.database).parent
+            database_dir = Path(self.database).parent
             # Link the folder of the database to a volumme in the container
-            self.container_generic_command = f"run -v {pathdb}:/home/database"
+            self.container_generic_command = f"run -v {database_dir}:/home/database"
             fu.log('Appending optional database', self.out_log, self.global_log)
         if self.evalue:
             instructions.append(f'-e {self.evalue}')
@@ -121,34 +258,166 @@ class AhatoolContainer(BiobbObject):
         if self.threads:
             instructions.append(f'-t {self.threads}')
             fu.log('Appending optional threads', self.out_log, self.global_log)
+            # Limit the container to the automatic sizing, warm containers are shared by several runs.
+            # The memory limit is the share of the run of the available memory, not the estimate of its jobs
+            if self.sizing and self.container_path.endswith('docker') and not self.warm_container:
+                self.container_generic_command = f"{self.container_generic_command} --cpus {self.threads * self.sizing['parallel_jobs']}"
+                if self.sizing['run_memory']:
+                    self.container_generic_command = f"{self.container_generic_command} --memory {self.sizing['run_memory'] >> 20}m"
 
         # 6. Build the actual command line as a list of items (elements order will be maintained)
         self.cmd = [self.binary_path,
                     ' '.join(instructions),
-                    '-i', os.path.basename(self.stage_io_dict['in']['input_path'])]
+                    '-i', input_name]
+
+        # Sharded search: one job per database shard, each one in its own folder with a link to the input
+        if self.database and self.database_shards > 1:
+            commands = []
+            for i, shard in enumerate(self.shards['shards']):
+                shard_dir = Path(self.stage_io_dict.get('unique_dir')).joinpath(f'shard_{i}')
+                shard_dir.mkdir()
+                shard_dir.joinpath(self.cmd[3]).symlink_to(Path('..', self.cmd[3]))
+                commands.append(f'cd {self.container_volume_path}/shard_{i} && {" ".join(self.cmd)} -d /home/database/{Path(shard).name}')
+            write_shards_script(str(Path(self.stage_io_dict.get('unique_dir')).joinpath('run_shards.sh')), commands)
+            self.cmd = ['bash', f'{self.container_volume_path}/run_shards.sh']
+        # Chunked input: one job per chunk of the FASTA input, each one in its own folder
+        self.chunks = []
+        unique_dir = Path(self.stage_io_dict.get('unique_dir'))
+        if self.input_chunks > 1 and self.start != 'search':
+            fu.log('input_chunks ignored: the build stage makes one profile from the whole input, only search runs are chunked', self.out_log, self.global_log)
+        if self.input_chunks > 1 and self.start == 'search' and self.database_shards <= 1 and is_fasta(str(unique_dir.joinpath(input_name))):
+            self.chunks = split_input(str(unique_dir.joinpath(input_name)), self.input_chunks, str(unique_dir))
+            fu.log(f'Running the input in {len(self.chunks)} chunks', self.out_log, self.global_log)
+            commands = [f'cd {self.container_volume_path}/{Path(chunk).parent.name} && {" ".join(self.cmd)}' for chunk in self.chunks]
+            write_shards_script(str(unique_dir.joinpath('run_chunks.sh')), commands)
+            self.cmd = ['bash', f'{self.container_volume_path}/run_chunks.sh']
+        # Stop the run when it exceeds the time or output size limits
+        if self.time_limit or self.max_output_size:
+            write_limits_script(str(unique_dir.joinpath(LIMITS_SCRIPT)), ' '.join(self.cmd), self.container_volume_path,
+                                self.time_limit, self.max_output_size)
+            self.cmd = ['bash', f'{self.container_volume_path}/{LIMITS_SCRIPT}']
         fu.log('Creating command line with instructions and required arguments', self.out_log, self.global_log)
 
-        # 8. Uncomment to check the command line
-        print(' '.join(self.cmd))
+        # 8. Log the command line
+        fu.log(f"Command line: {' '.join(self.cmd)}", self.out_log, self.global_log)
+
+        # Archive the result files as they are finalized while the container runs
+        self.zip_writer = None
+        if not (self.database and self.database_shards > 1) and not self.chunks:
+            zip_exclude = (self.zip_exclude or []) + ([CHECKPOINT_MANIFEST] if self.checkpoint else []) + [LIMITS_SCRIPT]
+            self.zip_writer = StreamingZip(self.io_dict['out']['output_path'], self.stage_io_dict.get('unique_dir'),
+                                           self.zip_compression_level, self.zip_include, zip_exclude,
+                                           self.zip_settle_time).start()
+
+        # Execute in a warm container, in use until the run finishes
+        if self.warm_container:
+            volumes = {str(Path(self.stage_io_dict.get('unique_dir')).parent): WARM_WORK_DIR}
+            if database_dir:
+                volumes[str(database_dir.resolve())] = '/home/database'
+            self.running_container = get_warm_container(self.container_path, self.container_image, volumes,
+                                                        self.container_user_id, self.container_idle_timeout)
+            fu.log(f'Executing in warm container {self.running_container.name}', self.out_log, self.global_log)
+            self.cmd = self.running_container.exec_cmd(self.cmd, self.container_volume_path, self.container_shell_path)
+        return False
+
+    def finish_launch(self) -> int:
+        """Close the output zip, cache it, remove the sandbox folder and write the metrics. Return the return code."""
+        self._release_container()
+
+        skipped = []
+        with self.run_metrics.stage('zip_results') as stage:
+            # Merge the results of every input chunk & copy them to host, as Ahatool only if every job succeeded
+            if self.chunks:
+                if self.return_code == 0:
+                    # The chunks of the input are replaced by the whole staged input
+                    input_path = Path(self.stage_io_dict.get('unique_dir')).joinpath(Path(self.chunks[0]).name)
+                    skipped = merge_results([str(Path(chunk).parent) for chunk in self.chunks], self.io_dict['out']['output_path'],
+                                            query_order=sequence_names(str(input_path)),
+                                            part_names=[Path(chunk).parent.name for chunk in self.chunks],
+                                            replacements={input_path.name: str(input_path)})
+            # Merge the results of every shard & copy them to host
+            elif not self.zip_writer:
+                if self.return_code == 0:
+                    unique_dir = Path(self.stage_io_dict.get('unique_dir'))
+                    skipped = merge_results([str(unique_dir.joinpath(f'shard_{i}')) for i in range(len(self.shards['shards']))],
+                                            self.io_dict['out']['output_path'], evalue_scales(self.shards),
+                                            float(self.evalue) if self.evalue else None)
+            # Add the last result files to the zip
+            else:
+                self.zip_writer.close()
+            stage['bytes_moved'] = path_size(self.io_dict['out']['output_path'])
+        if skipped:
+            fu.log(f'Files differing between the parts that could not be merged (listed in {MERGE_MARKER}): {", ".join(skipped)}', self.out_log, self.global_log)
 
-        # Run Biobb block
-        self.run_biobb()
+        # Apply the hit count and output size limits, keeping the results of a run stopped by a limit
+        self.stopped = stopped_by(self.return_code) if self.time_limit or self.max_output_size else None
+        if self.stopped:
+            fu.log(f'Run stopped by the {self.stopped} limit', self.out_log, self.global_log)
+        if (self.max_hits or self.max_output_size or self.stopped) and os.path.isfile(self.io_dict['out']['output_path']):
+            with self.run_metrics.stage('limit_results'):
+                self.truncation = limit_results(self.io_dict['out']['output_path'], self.max_hits, self.max_output_size, self.stopped)
+            if self.truncation:
+                fu.log(f'Output truncated by the {", ".join(self.truncation["reasons"])} limits', self.out_log, self.global_log)
+                if self.stopped:
+                    self.return_code = 0
 
-        # Make zip file & copy files to host
-        list_to_zip = [os.path.join(self.stage_io_dict.get('unique_dir'), f) for f in os.listdir(self.stage_io_dict.get('unique_dir'))]
-        fu.zip_list(self.io_dict['out']['output_path'], list_to_zip)
+        # Add the output to the cache
+        if self.cache_dir and self.return_code == 0 and not self.stopped and fu.check_complete_files(self.io_dict['out'].values()):
+            self.cache.store(self.cache_key, self.io_dict['out']['output_path'])
 
+        # Keep the work folder of a failed run for the next attempt
+        if self.checkpoint and not (self.return_code == 0 and fu.check_complete_files(self.io_dict['out'].values())):
+            self.checkpoint.save(stages=['build'] if self.checkpoint.built_profile() else [], return_code=self.return_code)
+            fu.log(f'Run failed, its work folder {self.checkpoint.work_dir} is kept to resume it', self.out_log, self.global_log)
         # Remove temporary file(s)
-        self.tmp_files.extend([
-            self.stage_io_dict.get('unique_dir')
-        ])
-        self.remove_tmp_files()
+        else:
+            self.tmp_files.extend([
+                self.stage_io_dict.get('unique_dir')
+            ])
+        with self.run_metrics.stage('remove_tmp_files', path_size(self.stage_io_dict.get('unique_dir')) if self.remove_tmp else 0):
+            self.remove_tmp_files()
+
+        # Release the scratch copy of the database
+        if self.scratch:
+            self.scratch.release()
 
         # Check output arguments
         self.check_arguments(output_files_created=True, raise_exception=False)
 
+        # Write the metrics of the run
+        if self.metrics:
+            self.run_metrics.write(metrics_path(self.io_dict['out']['output_path']), block='AhatoolContainer',
+                                   input_path=self.io_dict['in']['input_path'], return_code=self.return_code)
+        if self.metrics_log:
+            self.run_metrics.log(self.out_log, self.global_log)
+
         return self.return_code
 
+    def abort_launch(self) -> None:
+        """Close the output zip and remove it and the sandbox folder of an interrupted run. Work folders are kept for the next attempt."""
+        if getattr(self, 'zip_writer', None):
+            self.zip_writer.close()
+            if os.path.isfile(self.io_dict['out']['output_path']):
+                os.remove(self.io_dict['out']['output_path'])
+        self._release_container()
+        if self.scratch:
+            self.scratch.release()
+        unique_dir = getattr(self, 'stage_io_dict', {}).get('unique_dir')
+        if unique_dir and not self.checkpoint and Path(unique_dir).resolve() != Path.cwd().resolve():
+            shutil.rmtree(unique_dir, ignore_errors=True)
+
+    def _release_container(self) -> None:
+        """Release the warm container used by the run, so that it can be stopped when idle."""
+        if self.running_container:
+            self.running_container.release()
+            self.running_container = None
+
+    def create_cmd_line(self):
+        # Commands executed in a warm container are already complete
+        if self.warm_container:
+            return
+        super().create_cmd_line()
+
 
 def ahatool_container(input_path: str, output_path: str,
                       properties: dict = None, **kwargs) -> int:
@@ -162,6 +431,9 @@ def ahatool_container(input_path: str, output_path: str,
 
 def main():
     """Command line execution of this building block. Please check the command line documentation."""
+    # Only needed by the command line, not imported with the module to keep it light
+    import argparse
+    from biobb_common.configuration import settings
     parser = argparse.ArgumentParser(description='Description for the template container module.',
                                      formatter_class=lambda prog: argparse.RawTextHelpFormatter(prog, width=99999))
     parser.add_argument('--config', required=False, help='Configuration file')
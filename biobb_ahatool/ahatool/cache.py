@@ -0,0 +1,59 @@
+"""Content-addressed cache of ahatool output zip files."""
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from biobb_ahatool.ahatool.common import lru_evict, run_key, touch
+
+
+class ResultCache:
+    """Local folder of output zip files keyed by a hash of everything that determines the result of a run.
+
+    Args:
+        cache_dir (str): Path to the cache folder. It is created if it does not exist.
+        max_size (int): Maximum size in bytes of the cache. The least recently used zip files are evicted above it.
+    """
+
+    def __init__(self, cache_dir: str, max_size: int = None) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.max_size = max_size
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def key(self, input_path: str, database: str = None, version: str = None, **params) -> str:
+        """Return the cache key of a run, see :func:`run_key <ahatool.common.run_key>`."""
+        return run_key(input_path, database, version, **params)
+
+    def path(self, key: str) -> Path:
+        return self.cache_dir.joinpath(key + '.zip')
+
+    def fetch(self, key: str, output_path: str) -> bool:
+        """Copy the cached zip of **key** to **output_path**. Return False on a cache miss.
+
+        The output is an independent file, so later writes to **output_path** never change the cache entry.
+        """
+        cached_path = self.path(key)
+        if not cached_path.is_file():
+            return False
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=Path(output_path).parent)
+        os.close(fd)
+        try:
+            shutil.copy2(cached_path, tmp_path)
+        except FileNotFoundError:
+            # Evicted by a concurrent run
+            os.remove(tmp_path)
+            return False
+        os.replace(tmp_path, output_path)
+        touch(str(cached_path))
+        return True
+
+    def store(self, key: str, output_path: str) -> None:
+        """Add the zip **output_path** to the cache and evict the least recently used entries if needed."""
+        fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=self.cache_dir)
+        os.close(fd)
+        shutil.copy2(output_path, tmp_path)
+        os.replace(tmp_path, self.path(key))
+        touch(str(self.path(key)))
+        if self.max_size:
+            lru_evict(str(self.cache_dir), self.max_size, pattern='*.zip')
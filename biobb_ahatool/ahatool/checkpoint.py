@@ -0,0 +1,81 @@
+"""Persistent work folders letting an interrupted ahatool run resume from its last completed stage."""
+import json
+import shutil
+import time
+from pathlib import Path
+
+# Manifest of the attempts and completed stages of a run, written in its work folder
+CHECKPOINT_MANIFEST = 'checkpoint.json'
+
+
+def is_complete_profile(path: str) -> bool:
+    """Return True if **path** is a profile HMM file whose last model is completely written."""
+    with open(path, 'rb') as f:
+        if not f.read(5) == b'HMMER':
+            return False
+        f.seek(0, 2)
+        f.seek(max(0, f.tell() - 64))
+        return f.read().rstrip().endswith(b'//')
+
+
+class Checkpoint:
+    """Work folder of a run, kept between attempts until the run succeeds.
+
+    The build stage of AHATool.sh leaves the profile HMM in the work folder. A later
+    attempt of the same run finds it and starts from the search stage with it as input.
+
+    Args:
+        checkpoint_dir (str): Folder where the work folders of the runs are created.
+        key (str): Key of the run, see :func:`run_key <ahatool.common.run_key>`.
+    """
+
+    def __init__(self, checkpoint_dir: str, key: str) -> None:
+        self.work_dir = Path(checkpoint_dir).resolve().joinpath(key)
+        self.manifest_path = self.work_dir.joinpath(CHECKPOINT_MANIFEST)
+        self.manifest = {}
+        self.staged_files = []
+
+    def open(self, **run) -> dict:
+        """Create the work folder or load the manifest of the previous attempts, recording a new one."""
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        if self.manifest_path.is_file():
+            self.manifest = json.loads(self.manifest_path.read_text())
+        else:
+            self.manifest = {'run': {k: str(v) for k, v in run.items()}, 'attempts': 0, 'stages': []}
+        self.manifest['attempts'] += 1
+        self.save()
+        return self.manifest
+
+    def save(self, **updates) -> None:
+        self.manifest.update(updates, updated=time.strftime('%Y-%m-%d %H:%M:%S'))
+        self.manifest_path.write_text(json.dumps(self.manifest, indent=2))
+
+    def built_profile(self) -> str:
+        """Return the newest complete profile HMM written in the work folder by a run, or None."""
+        profiles = [p for p in self.work_dir.rglob('*.hmm') if str(p) not in self.staged_files and is_complete_profile(str(p))]
+        if not profiles:
+            return None
+        return str(max(profiles, key=lambda p: p.stat().st_mtime))
+
+    def use_as_sandbox(self, stage_io_dict: dict) -> None:
+        """Move the files staged in the sandbox folder of **stage_io_dict** to the work folder and use it as sandbox."""
+        unique_dir = Path(stage_io_dict['unique_dir'])
+        # Without sandbox the files are staged in the working directory, which is kept
+        in_place = unique_dir.resolve() == Path.cwd().resolve()
+        for file_path in unique_dir.iterdir() if not in_place else []:
+            self.staged_files.append(str(self.work_dir.joinpath(file_path.name)))
+            shutil.move(str(file_path), self.staged_files[-1])
+        for io in ('in', 'out'):
+            for file_ref, file_path in stage_io_dict[io].items():
+                # Container blocks stage the paths inside the container, which do not change
+                if file_path and Path(file_path).parent == unique_dir:
+                    stage_io_dict[io][file_ref] = str(self.work_dir.joinpath(Path(file_path).name))
+                    if in_place and Path(file_path).exists():
+                        self.staged_files.append(stage_io_dict[io][file_ref])
+                        shutil.copy2(file_path, stage_io_dict[io][file_ref])
+        if not in_place:
+            shutil.rmtree(unique_dir, ignore_errors=True)
+        stage_io_dict['unique_dir'] = str(self.work_dir)
+
+    def remove(self) -> None:
+        shutil.rmtree(self.work_dir, ignore_errors=True)
@@ -0,0 +1,89 @@
+"""Common functions for package biobb_ahatool.ahatool"""
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+
+def file_digest(file_path: str, algorithm: str = 'sha256', chunk_size: int = 1 << 20) -> str:
+    """Return the hex digest of the content of **file_path** reading it in chunks."""
+    digest = hashlib.new(algorithm)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_identity(file_path: str) -> list:
+    """Return the absolute path, size and modification time of **file_path**, or the plain path if it does not exist."""
+    path = Path(file_path)
+    if not path.is_file():
+        return [str(file_path)]
+    stat = path.stat()
+    return [str(path.resolve()), stat.st_size, stat.st_mtime_ns]
+
+
+def run_key(input_path: str, database: str = None, version: str = None, **params) -> str:
+    """Return a hash of everything that determines the result of a run.
+
+    Args:
+        input_path (str): Path to the input file, hashed by content.
+        database (str): Path to the database, identified by path, size and modification time.
+        version (str): Version of the wrapped AHATool.sh (script digest or container image).
+        **params: Any other property changing the result (evalue, start, prefix...).
+    """
+    description = {
+        'input': file_digest(input_path),
+        'database': file_identity(database) if database else None,
+        'version': version,
+        'params': {k: str(v) for k, v in params.items() if v is not None}
+    }
+    return hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+
+def touch(file_path: str) -> None:
+    """Mark **file_path** as recently used for :func:`lru_evict`."""
+    try:
+        os.utime(file_path)
+    except FileNotFoundError:
+        pass
+
+
+def path_size(path: str) -> int:
+    """Return the size in bytes of a file or the total size of the files inside a folder."""
+    path = Path(path)
+    if path.is_file():
+        return path.stat().st_size
+    return sum(f.stat().st_size for f in path.rglob('*') if f.is_file())
+
+
+def lru_evict(folder: str, max_size: int, pattern: str = '*') -> list:
+    """Remove the least recently used entries matching **pattern** in **folder** until their total size is below **max_size** bytes.
+
+    Entries can be files or folders; recency is taken from their modification time.
+
+    Returns:
+        list: Paths of the removed entries.
+    """
+    entries = []
+    for path in Path(folder).glob(pattern):
+        try:
+            entries.append((path.stat().st_mtime, path_size(str(path)), path))
+        except FileNotFoundError:
+            continue
+    total_size = sum(size for _, size, _ in entries)
+    removed = []
+    for _, size, path in sorted(entries):
+        if total_size <= max_size:
+            break
+        try:
+            if path.is_dir():
+                shutil.rmtree(path)
+            else:
+                path.unlink()
+        except FileNotFoundError:
+            pass
+        total_size -= size
+        removed.append(str(path))
+    return removed
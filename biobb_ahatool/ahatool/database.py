@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+
+"""Module preparing the indexed form of the ahatool databases and the command line interface."""
+import fcntl
+import json
+import subprocess
+from pathlib import Path
+
+from biobb_common.tools import file_utils as fu
+from biobb_ahatool.ahatool.common import file_identity
+
+INDEX_MANIFEST_SUFFIX = '.biobb_index.json'
+# Files written by hmmpress next to a profile HMM database
+PRESSED_SUFFIXES = ('.h3m', '.h3i', '.h3f', '.h3p')
+
+
+def database_kind(database: str) -> str:
+    """Return 'hmm' for profile HMM databases and 'fasta' for sequence databases."""
+    with open(database) as f:
+        return 'hmm' if f.readline().startswith('HMMER') else 'fasta'
+
+
+def index_files(database: str, kind: str) -> list:
+    if kind == 'hmm':
+        return [database + suffix for suffix in PRESSED_SUFFIXES]
+    return [database + '.ssi']
+
+
+def _tool_version(binary: str, container_cmd: list = None) -> str:
+    try:
+        output = subprocess.run((container_cmd or []) + [binary, '-h'], capture_output=True, text=True).stdout
+    except OSError:
+        return None
+    return next((line.strip('# ').strip() for line in output.splitlines() if 'HMMER' in line), None)
+
+
+def read_manifest(database: str) -> dict:
+    manifest_path = Path(database + INDEX_MANIFEST_SUFFIX)
+    if not manifest_path.is_file():
+        return None
+    return json.loads(manifest_path.read_text())
+
+
+def index_is_valid(database: str) -> bool:
+    """Return True if **database** has an index built from its current content."""
+    manifest = read_manifest(database)
+    return bool(manifest) and manifest['database'] == file_identity(database) and \
+        all(Path(f).is_file() for f in manifest['index_files'])
+
+
+def prepare_database(database: str, hmmpress_path: str = 'hmmpress', esl_sfetch_path: str = 'esl-sfetch',
+                     force: bool = False, out_log=None, global_log=None, container_cmd: list = None,
+                     container_database: str = None) -> dict:
+    """Build the index of **database** next to it, unless a valid one already exists.
+
+    Profile HMM databases are pressed with hmmpress and sequence databases are indexed with
+    esl-sfetch. A manifest with the identity of the source and the tool version is written
+    next to the database, so the index is rebuilt only when the source changes. Concurrent
+    calls for the same database wait for the first one.
+
+    AHATool.sh reads the database sequentially and does not use the index. The index lets
+    esl-sfetch fetch the hit sequences from the database and hmmscan search pressed profiles.
+    The building blocks never index the database: run this step after every database update.
+    A valid index is copied with the database to the scratch folder of a run.
+
+    Args:
+        database (str): Path to the FASTA or HMM database.
+        hmmpress_path (str): Path to the hmmpress binary.
+        esl_sfetch_path (str): Path to the esl-sfetch binary.
+        force (bool): Rebuild the index even if it is valid.
+        container_cmd (list): Command line items running the binaries in a container, such as ``['docker', 'run', '--rm', '-v', '<folder>:/home/database', '<image>']``.
+        container_database (str): Path to **database** in the container.
+
+    Returns:
+        dict: Index manifest.
+    """
+    database = str(Path(database).resolve())
+    with open(database + '.biobb_index.lock', 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        if not force and index_is_valid(database):
+            return read_manifest(database)
+
+        kind = database_kind(database)
+        fu.log(f'Building {kind} index of {database}', out_log, global_log)
+        tool_database = container_database if container_cmd else database
+        if kind == 'hmm':
+            binary = hmmpress_path
+            cmd = [hmmpress_path, '-f', tool_database]
+        else:
+            binary = esl_sfetch_path
+            cmd = [esl_sfetch_path, '--index', tool_database]
+        process = subprocess.run((container_cmd or []) + cmd, capture_output=True, text=True)
+        if process.returncode != 0:
+            raise RuntimeError(f'Error building the index of {database}: {process.stderr.strip()}')
+
+        manifest = {
+            'database': file_identity(database),
+            'kind': kind,
+            'tool': _tool_version(binary, container_cmd),
+            'index_files': index_files(database, kind)
+        }
+        Path(database + INDEX_MANIFEST_SUFFIX).write_text(json.dumps(manifest, indent=2))
+        return manifest
+
+
+def main():
+    """Command line execution of this module."""
+    import argparse
+    parser = argparse.ArgumentParser(description='Build the indexed form of an ahatool database.',
+                                     formatter_class=lambda prog: argparse.RawTextHelpFormatter(prog, width=99999))
+    required_args = parser.add_argument_group('required arguments')
+    required_args.add_argument('--database', required=True, nargs='+', help='Path to the FASTA or HMM databases.')
+    parser.add_argument('--hmmpress_path', default='hmmpress', help='Path to the hmmpress binary')
+    parser.add_argument('--esl_sfetch_path', default='esl-sfetch', help='Path to the esl-sfetch binary')
+    parser.add_argument('--force', action='store_true', help='Rebuild valid indexes')
+    args = parser.parse_args()
+
+    for database in args.database:
+        manifest = prepare_database(database, args.hmmpress_path, args.esl_sfetch_path, args.force)
+        print(f"{database}: {', '.join(manifest['index_files'])}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+"""Grouping of the batch inputs and sequences searching the same queries, so that every query is run only once."""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from pathlib import Path
+
+from biobb_ahatool.ahatool.common import file_digest
+from biobb_ahatool.ahatool.results import is_hit_table, query_column
+from biobb_ahatool.ahatool.sharding import is_fasta
+
+# Mapping of every batch input to the input run for it, written in the output folder
+DEDUP_MAPPING = 'deduplication.json'
+# Name of the search of the unique sequences of a batch deduplicated by sequence, written in the output folder
+DEDUP_QUERIES = 'deduplicated_queries'
+# Characters of aligned sequences, whose case and order are kept
+GAP_CHARACTERS = b'-.'
+
+
+def normalize_sequence(sequence: bytes) -> bytes:
+    """Return **sequence** without whitespace and terminal stop codon, in upper case if it is not aligned."""
+    sequence = b''.join(sequence.split()).rstrip(b'*')
+    if any(gap in sequence for gap in GAP_CHARACTERS):
+        # Lower case marks insertions in aligned formats
+        return sequence
+    return sequence.upper()
+
+
+def fasta_records(fasta_path: str) -> list:
+    """Return the name and normalized sequence of every record of the FASTA file **fasta_path**."""
+    records, name, record = [], None, None
+    with open(fasta_path, 'rb') as fasta_file:
+        for line in fasta_file:
+            if line.startswith(b'>'):
+                if record is not None:
+                    records.append((name, normalize_sequence(b''.join(record))))
+                name, record = (line[1:].split() or [b''])[0].decode(), []
+            elif record is not None:
+                record.append(line)
+    if record is not None:
+        records.append((name, normalize_sequence(b''.join(record))))
+    return records
+
+
+def fasta_sequences(fasta_path: str) -> list:
+    """Return the normalized sequences of the FASTA file **fasta_path**, ignoring their headers."""
+    return [sequence for _, sequence in fasta_records(fasta_path)]
+
+
+def query_key(input_path: str) -> str:
+    """Return a hash of the sequences searched by the input **input_path**.
+
+    FASTA inputs are hashed by their multiset of normalized sequences, so inputs differing only
+    in headers, sequence order, line wrapping or case have the same key. Repeated sequences
+    weight the profile built from the input, so they are counted. Other inputs (profile HMMs)
+    are hashed by content.
+    """
+    if not is_fasta(input_path):
+        return 'file:' + file_digest(input_path)
+    digest = hashlib.sha256()
+    for sequence in sorted(fasta_sequences(input_path)):
+        digest.update(sequence + b'\n')
+    return 'fasta:' + digest.hexdigest()
+
+
+def fasta_inputs(input_paths: list) -> list:
+    """Return the readable FASTA files of **input_paths**."""
+    fasta_paths = []
+    for input_path in input_paths:
+        try:
+            if is_fasta(input_path):
+                fasta_paths.append(input_path)
+        except (OSError, ValueError):
+            pass
+    return fasta_paths
+
+
+def sequence_queries(input_paths: list, queries_path: str) -> dict:
+    """Write every distinct sequence of the FASTA **input_paths** once to the query file **queries_path**.
+
+    In a search every sequence is an independent query, so the sequences repeated within and
+    across the inputs are searched only once. The queries are named ``query_<i>`` in order of
+    first appearance.
+
+    Returns:
+        dict: Pairs of sequence name and query name of every input path, in input order.
+    """
+    queries, input_queries = {}, {}
+    with open(queries_path, 'wb') as queries_file:
+        for input_path in input_paths:
+            input_queries[input_path] = []
+            for name, sequence in fasta_records(input_path):
+                if sequence not in queries:
+                    queries[sequence] = f'query_{len(queries)}'
+                    queries_file.write(b'>' + queries[sequence].encode() + b'\n' + sequence + b'\n')
+                input_queries[input_path].append((name, queries[sequence]))
+    return input_queries
+
+
+def group_inputs(input_paths: list) -> dict:
+    """Group **input_paths** by :func:`query_key`, in the order of their first input.
+
+    Inputs that cannot be read are kept in a group of their own, so that their run reports the error.
+
+    Returns:
+        dict: List of input paths of every key.
+    """
+    groups = {}
+    for input_path in input_paths:
+        try:
+            key = query_key(input_path)
+        except (OSError, ValueError):
+            key = 'unreadable:' + str(input_path)
+        groups.setdefault(key, []).append(input_path)
+    return groups
+
+
+def fan_out(output_path: str, copy_paths: dict, key: str, representative: str) -> None:
+    """Copy the output zip **output_path** of the input **representative** to every path of **copy_paths**.
+
+    The files of the copies keep the names (and hit tables the query name) of the run of
+    **representative**, so every copy gets a :data:`DEDUP_MAPPING` file recording the input it
+    stands for, the input that was run and their **key**.
+
+    Args:
+        output_path (str): Path to the output zip of the input run.
+        copy_paths (dict): Output zip path of every other input of the group.
+        key (str): Key of the group (see :func:`query_key`).
+        representative (str): Path to the input run.
+    """
+    for input_path, copy_path in copy_paths.items():
+        fd, tmp_path = tempfile.mkstemp(suffix='.zip', dir=Path(copy_path).parent)
+        os.close(fd)
+        try:
+            shutil.copy2(output_path, tmp_path)
+            if zipfile.is_zipfile(tmp_path):
+                with zipfile.ZipFile(tmp_path, 'a', zipfile.ZIP_DEFLATED) as zip_file:
+                    zip_file.writestr(DEDUP_MAPPING, json.dumps({'key': key, 'input': input_path,
+                                                                 'representative': representative,
+                                                                 'representative_output': output_path}, indent=2))
+            os.replace(tmp_path, copy_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def fan_out_queries(output_path: str, copy_path: str, queries: list, input_path: str) -> None:
+    """Write the output zip **copy_path** of **input_path** from the output zip **output_path** of the search of the unique sequences.
+
+    The hit tables keep the rows of the queries of **input_path**, named after its sequences
+    and in its order. The other files are copied and a :data:`DEDUP_MAPPING` file records the
+    query searched for every sequence.
+
+    Args:
+        output_path (str): Path to the output zip of the search of the unique sequences.
+        copy_path (str): Path to the output zip of the input.
+        queries (list): Pairs of sequence name and query name of the input (see :func:`sequence_queries`).
+        input_path (str): Path to the input.
+    """
+    fd, tmp_path = tempfile.mkstemp(suffix='.zip', dir=Path(copy_path).parent)
+    os.close(fd)
+    try:
+        with zipfile.ZipFile(output_path) as in_zip, zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as out_zip:
+            for info in in_zip.infolist():
+                if not is_hit_table(info.filename):
+                    with in_zip.open(info) as in_file, out_zip.open(info.filename, 'w') as out_file:
+                        shutil.copyfileobj(in_file, out_file)
+                    continue
+                column = query_column(info.filename)
+                header, footer, rows = [], [], {}
+                for line in in_zip.read(info).decode().splitlines():
+                    if line.startswith('#') or not line.strip():
+                        (footer if rows else header).append(line)
+                        continue
+                    fields = line.split()
+                    rows.setdefault(fields[column] if column < len(fields) else '', []).append(fields)
+                lines = [' '.join(fields[:column] + [name] + fields[column + 1:])
+                         for name, query in queries for fields in rows.get(query, [])]
+                out_zip.writestr(info.filename, '\n'.join(header + lines + footer) + '\n')
+            out_zip.writestr(DEDUP_MAPPING, json.dumps({'key': 'sequences', 'input': input_path,
+                                                        'representative_output': output_path,
+                                                        'queries': [list(query) for query in queries]}, indent=2))
+        os.replace(tmp_path, copy_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def write_mapping(mapping_path: str, groups: dict, output_paths: dict, return_codes: dict, sequences: dict = None) -> str:
+    """Write the JSON mapping of every group of inputs to the input run for it and its output.
+
+    Args:
+        mapping_path (str): Path to the JSON file.
+        groups (dict): Input paths of every key, the first one being the input run.
+        output_paths (dict): Output path of every input path.
+        return_codes (dict): Return code of every input run.
+        sequences (dict): Search of the inputs deduplicated by sequence: its ``representative`` query file and output, and the ``queries`` of every input (see :func:`sequence_queries`).
+    """
+    mapping = [{'key': key,
+                'representative': inputs[0],
+                'return_code': return_codes.get(inputs[0]),
+                'inputs': {input_path: output_paths[input_path] for input_path in inputs}}
+               for key, inputs in groups.items()]
+    if sequences:
+        mapping.append({'key': 'sequences',
+                        'representative': sequences['representative'],
+                        'representative_output': sequences['representative_output'],
+                        'return_code': sequences['return_code'],
+                        'inputs': {input_path: output_paths[input_path] for input_path in sequences['queries']},
+                        'queries': {input_path: [list(query) for query in queries]
+                                    for input_path, queries in sequences['queries'].items()}})
+    Path(mapping_path).write_text(json.dumps(mapping, indent=2))
+    return mapping_path
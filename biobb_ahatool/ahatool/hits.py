@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+
+"""Module parsing the HMMER hit tables of ahatool outputs into NumPy structured arrays and the command line interface."""
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from pathlib import Path
+
+import numpy as np
+
+from biobb_ahatool.ahatool.results import is_hit_table, iter_result_files
+
+# Columns of the per-sequence (tblout) hit tables: name, column index and type
+SEQUENCE_COLUMNS = (
+    ('target', 0, 'S'), ('query', 2, 'S'),
+    ('evalue', 4, 'f8'), ('score', 5, 'f4'), ('bias', 6, 'f4'),
+    ('dom_evalue', 7, 'f8'), ('dom_score', 8, 'f4'), ('dom_bias', 9, 'f4'),
+)
+# Columns of the per-domain (domtblout) hit tables: name, column index and type
+DOMAIN_COLUMNS = (
+    ('target', 0, 'S'), ('tlen', 2, 'i4'), ('query', 3, 'S'), ('qlen', 5, 'i4'),
+    ('evalue', 6, 'f8'), ('score', 7, 'f4'), ('bias', 8, 'f4'),
+    ('c_evalue', 11, 'f8'), ('i_evalue', 12, 'f8'), ('dom_score', 13, 'f4'), ('dom_bias', 14, 'f4'),
+    ('hmm_from', 15, 'i4'), ('hmm_to', 16, 'i4'), ('ali_from', 17, 'i4'), ('ali_to', 18, 'i4'),
+    ('env_from', 19, 'i4'), ('env_to', 20, 'i4'), ('acc', 21, 'f4'),
+)
+# Value of the missing numeric columns of short tables
+MISSING = {'f': np.nan, 'i': -1}
+
+
+def table_kind(name: str) -> str:
+    """Return 'domain' for per-domain hit tables and 'sequence' for per-sequence ones."""
+    return 'domain' if 'dom' in Path(name).suffix.lower() else 'sequence'
+
+
+def table_columns(kind: str) -> tuple:
+    return DOMAIN_COLUMNS if kind == 'domain' else SEQUENCE_COLUMNS
+
+
+def _build_array(columns: tuple, values: dict, source: np.ndarray) -> np.ndarray:
+    """Return the structured array with a ``source`` field and the fields of **columns** from the lists of **values**."""
+    dtype = [('source', 'i4')]
+    for name, _, kind in columns:
+        dtype.append((name, f'S{max(map(len, values[name]), default=1) or 1}' if kind == 'S' else kind))
+    hits = np.empty(len(source), dtype=dtype)
+    hits['source'] = source
+    for name, _, kind in columns:
+        hits[name] = values[name]
+    return hits
+
+
+def parse_hit_table(lines, kind: str = 'sequence', source: int = 0) -> np.ndarray:
+    """Parse the lines of a HMMER hit table into a structured array.
+
+    Args:
+        lines (iterable): Lines of the table (str or bytes). Comment and blank lines are skipped.
+        kind (str): 'sequence' for tblout tables and 'domain' for domtblout tables.
+        source (int): Value of the ``source`` field of the rows.
+
+    Returns:
+        numpy.ndarray: One row per hit with the fields of :data:`SEQUENCE_COLUMNS` or :data:`DOMAIN_COLUMNS`.
+    """
+    columns = table_columns(kind)
+    values = {name: [] for name, _, _ in columns}
+    # The trailing description may contain spaces and is not split
+    max_index = max(index for _, index, _ in columns)
+    for line in lines:
+        if isinstance(line, str):
+            line = line.encode()
+        if not line.strip() or line.startswith(b'#'):
+            continue
+        fields = line.split(None, max_index + 1)
+        for name, index, column_kind in columns:
+            if index >= len(fields) or fields[index] == b'-' and column_kind != 'S':
+                values[name].append(MISSING[column_kind[0]] if column_kind != 'S' else b'')
+            elif column_kind == 'S':
+                values[name].append(fields[index])
+            else:
+                values[name].append(float(fields[index]))
+    return _build_array(columns, values, np.full(len(values['target']), source, dtype='i4'))
+
+
+def load_hits(source: str, kind: str = 'sequence', index: int = 0) -> np.ndarray:
+    """Parse all the hit tables of **kind** of an ahatool output zip (read in memory, not extracted) or folder.
+
+    Args:
+        source (str): Path to the output zip or folder.
+        kind (str): 'sequence' or 'domain' tables.
+        index (int): Value of the ``source`` field of the rows.
+    """
+    tables = []
+    with ExitStack() as stack:
+        for name, opener in iter_result_files(source, stack):
+            if is_hit_table(name) and table_kind(name) == kind:
+                with opener() as f:
+                    tables.append(parse_hit_table(f, kind, index))
+    return concatenate(tables, kind)
+
+
+def _load_hits(args: tuple) -> np.ndarray:
+    return load_hits(*args)
+
+
+def concatenate(tables: list, kind: str = 'sequence') -> np.ndarray:
+    """Concatenate hit arrays widening their string fields to the longest one."""
+    if not tables:
+        return parse_hit_table([], kind)
+    dtype = [(name, max((t.dtype[name] for t in tables), key=lambda d: d.itemsize)) for name in tables[0].dtype.names]
+    return np.concatenate([t.astype(dtype) for t in tables])
+
+
+def collect_hits(sources: list, kind: str = 'sequence', max_workers: int = None) -> np.ndarray:
+    """Parse the hit tables of many ahatool outputs into a single array.
+
+    The ``source`` field of every row is the index of its output in **sources**.
+
+    Args:
+        sources (list): Paths to the output zip files or folders.
+        kind (str): 'sequence' or 'domain' tables.
+        max_workers (int): Processes parsing the outputs. Defaults to parsing them in this process.
+    """
+    tasks = [(str(source), kind, i) for i, source in enumerate(sources)]
+    if max_workers and max_workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            tables = list(executor.map(_load_hits, tasks, chunksize=max(1, len(tasks) // (max_workers * 4))))
+    else:
+        tables = [_load_hits(task) for task in tasks]
+    return concatenate(tables, kind)
+
+
+def coverage(hits: np.ndarray, of: str = 'query') -> np.ndarray:
+    """Return the fraction of the query (HMM) or target sequence covered by every domain hit."""
+    if 'qlen' not in hits.dtype.names:
+        raise ValueError('Coverage is only available for domain hit tables')
+    if of == 'query':
+        return (hits['hmm_to'] - hits['hmm_from'] + 1) / np.where(hits['qlen'] > 0, hits['qlen'], np.nan)
+    return (hits['ali_to'] - hits['ali_from'] + 1) / np.where(hits['tlen'] > 0, hits['tlen'], np.nan)
+
+
+def filter_hits(hits: np.ndarray, max_evalue: float = None, min_score: float = None,
+                min_coverage: float = None, coverage_of: str = 'query') -> np.ndarray:
+    """Return the hits with E-value, score and coverage (domain tables only) within the given thresholds."""
+    mask = np.ones(len(hits), dtype=bool)
+    if max_evalue is not None:
+        mask &= hits['evalue'] <= max_evalue
+    if min_score is not None:
+        mask &= hits['score'] >= min_score
+    if min_coverage is not None:
+        mask &= coverage(hits, coverage_of) >= min_coverage
+    return hits[mask]
+
+
+def best_hits(hits: np.ndarray, by: str = 'target') -> np.ndarray:
+    """Return the hit with the lowest E-value for every distinct value of the field **by**."""
+    if not len(hits):
+        return hits
+    order = np.lexsort((hits['evalue'], hits[by]))
+    ordered = hits[order]
+    first = np.ones(len(ordered), dtype=bool)
+    first[1:] = ordered[by][1:] != ordered[by][:-1]
+    return ordered[first]
+
+
+def save_hits(path: str, hits: np.ndarray, sources: list = None) -> str:
+    """Write **hits** and the paths of their **sources** to the compressed NumPy file **path**."""
+    np.savez_compressed(path, hits=hits, sources=np.array([str(s) for s in sources or []], dtype='U'))
+    return path
+
+
+def read_hits(path: str) -> tuple:
+    """Read a file written by :func:`save_hits`. Return the hits array and the list of sources."""
+    with np.load(path) as data:
+        return data['hits'], data['sources'].tolist()
+
+
+def main():
+    """Command line execution of this module."""
+    import argparse
+    parser = argparse.ArgumentParser(description='Collect the hit tables of ahatool outputs into a compressed NumPy file.',
+                                     formatter_class=lambda prog: argparse.RawTextHelpFormatter(prog, width=99999))
+    required_args = parser.add_argument_group('required arguments')
+    required_args.add_argument('--input_path', required=True, nargs='+', help='Paths to the ahatool output zip files or folders.')
+    required_args.add_argument('--output_path', required=True, help='Path to the output file. Accepted formats: npz.')
+    parser.add_argument('--kind', choices=('sequence', 'domain'), default='sequence', help='Hit tables collected')
+    parser.add_argument('--max_evalue', type=float, help='Maximum E-value of the hits')
+    parser.add_argument('--min_score', type=float, help='Minimum score of the hits')
+    parser.add_argument('--min_coverage', type=float, help='Minimum query coverage of the domain hits')
+    parser.add_argument('--max_workers', type=int, help='Processes parsing the outputs')
+    args = parser.parse_args()
+
+    hits = filter_hits(collect_hits(args.input_path, args.kind, args.max_workers),
+                       args.max_evalue, args.min_score, args.min_coverage)
+    save_hits(args.output_path, hits, args.input_path)
+    print(f'{len(hits)} hits from {len(args.input_path)} outputs written to {args.output_path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+"""Time, output size and hit count limits of the ahatool runs."""
+import json
+import os
+import tempfile
+import zipfile
+from pathlib import Path
+
+from biobb_ahatool.ahatool.results import is_hit_table
+
+# Script running the command of a run within its limits, written in the sandbox folder
+LIMITS_SCRIPT = 'run_limits.sh'
+# File added to the output zip of a truncated run
+TRUNCATION_MARKER = 'TRUNCATED.json'
+# Exit codes of a command stopped by the time limit (as GNU timeout) or by the output size limit
+TIME_LIMIT_EXIT_CODE = 124
+OUTPUT_LIMIT_EXIT_CODE = 123
+# Seconds between two checks of the limits
+LIMITS_POLL_INTERVAL = 2
+# Seconds a stopped command has to exit before being killed
+LIMITS_GRACE_TIME = 10
+
+
+def write_limits_script(script_path: str, command: str, watch_dir: str, time_limit: float = None,
+                        max_output_size: int = None) -> str:
+    """Write a bash script running **command** and stopping it if it exceeds the limits.
+
+    The command runs in its own process group, which is terminated (and killed after
+    :data:`LIMITS_GRACE_TIME` seconds) when it runs for more than **time_limit** seconds or
+    everything written in **watch_dir** since the start, intermediate files included, grows
+    over **max_output_size** bytes. The script then exits with :data:`TIME_LIMIT_EXIT_CODE`
+    or :data:`OUTPUT_LIMIT_EXIT_CODE`. A TERM or INT signal received by the script, as when
+    the process group of the script is terminated, is forwarded to the process group of the
+    command before exiting.
+    """
+    lines = ['#!/bin/bash', '# Generated by biobb_ahatool: runs the command within the time and output size limits of the run',
+             'set -m']
+    if max_output_size:
+        lines += [f'base=$(du -sb {watch_dir} | cut -f1)']
+    lines += [f'( {command} ) &', 'pid=$!',
+              "trap 'kill -TERM -- -$pid 2>/dev/null; exit 143' TERM",
+              "trap 'kill -INT -- -$pid 2>/dev/null; exit 130' INT",
+              'rc=0', 'while kill -0 $pid 2>/dev/null; do']
+    if time_limit:
+        lines += [f'  if (( SECONDS >= {int(time_limit)} )); then',
+                  f'    echo "Time limit of {int(time_limit)} seconds reached, stopping the run" >&2; rc={TIME_LIMIT_EXIT_CODE}; break',
+                  '  fi']
+    if max_output_size:
+        lines += [f'  if (( $(du -sb {watch_dir} | cut -f1) - base > {int(max_output_size)} )); then',
+                  f'    echo "Output size limit of {int(max_output_size)} bytes reached, stopping the run" >&2; rc={OUTPUT_LIMIT_EXIT_CODE}; break',
+                  '  fi']
+    # Waiting for a background sleep lets the traps run without waiting for it to end
+    lines += [f'  sleep {LIMITS_POLL_INTERVAL} & wait $!', 'done',
+              'if (( rc )); then',
+              '  kill -TERM -- -$pid 2>/dev/null',
+              f'  for i in $(seq {LIMITS_GRACE_TIME}); do kill -0 $pid 2>/dev/null || break; sleep 1; done',
+              '  kill -KILL -- -$pid 2>/dev/null',
+              '  wait $pid',
+              '  exit $rc',
+              'fi',
+              'wait $pid']
+    Path(script_path).write_text('\n'.join(lines) + '\n')
+    return str(script_path)
+
+
+def stopped_by(return_code: int) -> str:
+    """Return the limit that stopped a run from its **return_code**, or None."""
+    return {TIME_LIMIT_EXIT_CODE: 'time_limit', OUTPUT_LIMIT_EXIT_CODE: 'max_output_size'}.get(return_code)
+
+
+def _split_table(data: bytes) -> tuple:
+    """Split a hit table into its header comments, its rows and its footer comments."""
+    lines = data.split(b'\n')
+    if not lines[-1]:
+        lines.pop()
+    header, rows, footer = [], [], []
+    for line in lines:
+        if line.startswith(b'#') or not line.strip():
+            (footer if rows else header).append(line)
+        else:
+            rows.append(line)
+    return header, rows, footer
+
+
+def _join_table(header: list, rows: list, footer: list) -> bytes:
+    return b'\n'.join(header + rows + footer) + b'\n'
+
+
+def _top_rows(name: str, rows: list, max_hits: int) -> list:
+    """Return the rows of the first **max_hits** targets of every query of the hit table **name**.
+
+    HMMER writes the targets of every query by increasing E-value, so the rows are kept in
+    the order of the table. Per-domain tables have one row per domain of every target.
+    """
+    # Query name column of the per-target and per-domain tables
+    query_column = 3 if 'dom' in Path(name).suffix.lower() else 2
+    targets, kept = {}, []
+    for row in rows:
+        fields = row.split(None, query_column + 1)
+        query_targets = targets.setdefault(fields[query_column] if len(fields) > query_column else b'', set())
+        if fields[0] not in query_targets:
+            if len(query_targets) == max_hits:
+                continue
+            query_targets.add(fields[0])
+        kept.append(row)
+    return kept
+
+
+def limit_results(zip_path: str, max_hits: int = None, max_output_size: int = None, stopped: str = None) -> dict:
+    """Apply the hit count and output size limits to the output zip **zip_path**, rewriting it if needed.
+
+    Hit tables keep the rows of their first **max_hits** targets. If the uncompressed size of
+    the files exceeds **max_output_size** bytes, the largest files other than the hit tables are
+    removed and then the last rows of the hit tables are cut. Truncated zips get a
+    :data:`TRUNCATION_MARKER` file describing what was removed.
+
+    Args:
+        zip_path (str): Path to the output zip file.
+        max_hits (int): Maximum number of targets of every hit table.
+        max_output_size (int): Maximum uncompressed size in bytes of the files of the zip.
+        stopped (str): Limit that stopped the run (see :func:`stopped_by`), marking the zip as truncated.
+
+    Returns:
+        dict: Content of the truncation marker, or None if the zip is not truncated.
+    """
+    if not zipfile.is_zipfile(zip_path):
+        return None
+    with zipfile.ZipFile(zip_path) as zip_file:
+        members = {info.filename: zip_file.read(info) for info in zip_file.infolist() if not info.is_dir()}
+    marker = {'reasons': [stopped] if stopped else [], 'tables': {}, 'removed_files': []}
+
+    tables = {}
+    for name, data in members.items():
+        if is_hit_table(name):
+            header, rows, footer = _split_table(data)
+            tables[name] = [header, rows, footer, len(rows)]
+            # A run stopped while writing the table can leave its last row incomplete
+            if stopped and rows and not footer and not data.endswith(b'\n'):
+                tables[name][1] = rows = rows[:-1]
+            if max_hits is not None:
+                tables[name][1] = _top_rows(name, rows, max_hits)
+                if len(tables[name][1]) < len(rows) and 'max_hits' not in marker['reasons']:
+                    marker['reasons'].append('max_hits')
+
+    if max_output_size is not None:
+        sizes = {name: len(data) for name, data in members.items() if name not in tables}
+        sizes.update((name, len(_join_table(*table[:3]))) for name, table in tables.items())
+        # Remove the largest files other than the hit tables first
+        for name in sorted((n for n in sizes if n not in tables), key=sizes.get, reverse=True):
+            if sum(sizes.values()) <= max_output_size:
+                break
+            marker['removed_files'].append(name)
+            del members[name], sizes[name]
+        # Then cut the hit tables in proportion to their size
+        total_size = sum(sizes.values())
+        if total_size > max_output_size:
+            for name, table in tables.items():
+                budget = sizes[name] * max_output_size // total_size - len(_join_table(table[0], [], table[2]))
+                kept = []
+                for row in table[1]:
+                    budget -= len(row) + 1
+                    if budget < 0:
+                        break
+                    kept.append(row)
+                table[1] = kept
+        if (marker['removed_files'] or total_size > max_output_size) and 'max_output_size' not in marker['reasons']:
+            marker['reasons'].append('max_output_size')
+
+    for name, (header, rows, footer, n_rows) in tables.items():
+        if len(rows) < n_rows:
+            marker['tables'][name] = {'rows': n_rows, 'kept': len(rows)}
+            members[name] = _join_table(header, rows, footer)
+    if not marker['reasons']:
+        return None
+
+    members[TRUNCATION_MARKER] = json.dumps(dict(marker, max_hits=max_hits, max_output_size=max_output_size), indent=2).encode()
+    fd, tmp_path = tempfile.mkstemp(suffix='.zip', dir=Path(zip_path).parent)
+    os.close(fd)
+    with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        for name, data in members.items():
+            zip_file.writestr(name, data)
+    os.replace(tmp_path, zip_path)
+    return marker
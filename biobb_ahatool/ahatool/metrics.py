@@ -0,0 +1,65 @@
+"""Per-stage timing and resource instrumentation of ahatool runs."""
+import json
+import resource
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from biobb_common.tools import file_utils as fu
+
+
+def peak_child_rss() -> int:
+    """Return the peak resident set size in KiB of the terminated child processes of this process."""
+    return resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+
+
+class RunMetrics:
+    """Wall time, bytes moved and child peak RSS of every stage of a run.
+
+    The child peak RSS is the maximum over all the children of the process finished so far,
+    so in long-lived processes running several blocks it is an upper bound. Commands run in
+    containers are children of the container runtime, not of this process, so with
+    **child_rss** False (container runs) it is reported as unavailable (None).
+    """
+
+    def __init__(self, child_rss: bool = True) -> None:
+        self.stages = []
+        self.start_time = time.perf_counter()
+        self.child_rss = child_rss
+
+    def record(self, name: str, wall_time: float, bytes_moved: int = 0) -> None:
+        self.stages.append({
+            'stage': name,
+            'wall_time': round(wall_time, 6),
+            'bytes_moved': bytes_moved,
+            'peak_child_rss_kb': peak_child_rss() if self.child_rss else None
+        })
+
+    @contextmanager
+    def stage(self, name: str, bytes_moved: int = 0):
+        """Record the stage **name** around the block. The yielded dict can update its ``bytes_moved``."""
+        values = {'bytes_moved': bytes_moved}
+        start = time.perf_counter()
+        try:
+            yield values
+        finally:
+            self.record(name, time.perf_counter() - start, values['bytes_moved'])
+
+    def to_dict(self, **extra) -> dict:
+        return dict(extra, total_wall_time=round(time.perf_counter() - self.start_time, 6), stages=self.stages)
+
+    def write(self, metrics_path: str, **extra) -> str:
+        """Write the metrics as JSON to **metrics_path** adding the **extra** fields."""
+        Path(metrics_path).write_text(json.dumps(self.to_dict(**extra), indent=2))
+        return metrics_path
+
+    def log(self, out_log=None, global_log=None) -> None:
+        for s in self.stages:
+            rss = 'unavailable' if s['peak_child_rss_kb'] is None else f"{s['peak_child_rss_kb']} KiB"
+            fu.log(f"Stage {s['stage']}: {s['wall_time']:.3f} s, {s['bytes_moved']} bytes, "
+                   f"child peak RSS {rss}", out_log, global_log)
+
+
+def metrics_path(output_path: str) -> str:
+    """Return the default path of the metrics file of **output_path**, next to it."""
+    return str(Path(output_path).with_name(Path(output_path).stem + '_metrics.json'))
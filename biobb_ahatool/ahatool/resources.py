@@ -0,0 +1,87 @@
+"""Sizing of ahatool runs from the CPUs and memory available to the process."""
+import os
+from pathlib import Path
+
+# Threads accepted by AHATool.sh
+THREAD_OPTIONS = (1, 2, 4)
+# Memory in bytes needed by an AHATool.sh job besides the database
+JOB_BASE_MEMORY = 512 << 20
+
+
+def _read(path: str) -> str:
+    try:
+        return Path(path).read_text().strip()
+    except OSError:
+        return None
+
+
+def available_cpus() -> float:
+    """Return the CPUs usable by this process: its CPU affinity bounded by the cgroup (v2 or v1) CPU quota."""
+    cpus = float(len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1)
+    cpu_max = _read('/sys/fs/cgroup/cpu.max')
+    if cpu_max and not cpu_max.startswith('max'):
+        quota, period = cpu_max.split()[:2]
+        cpus = min(cpus, int(quota) / int(period))
+    quota, period = _read('/sys/fs/cgroup/cpu/cpu.cfs_quota_us'), _read('/sys/fs/cgroup/cpu/cpu.cfs_period_us')
+    if quota and period and int(quota) > 0:
+        cpus = min(cpus, int(quota) / int(period))
+    return cpus
+
+
+def available_memory() -> int:
+    """Return the memory in bytes available to this process: the available system memory bounded by the cgroup (v2 or v1) limit."""
+    memory = None
+    meminfo = _read('/proc/meminfo')
+    if meminfo:
+        line = next((line for line in meminfo.splitlines() if line.startswith('MemAvailable:')), None)
+        memory = int(line.split()[1]) * 1024 if line else None
+    for limit_path, usage_path in (('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory.current'),
+                                   ('/sys/fs/cgroup/memory/memory.limit_in_bytes', '/sys/fs/cgroup/memory/memory.usage_in_bytes')):
+        limit, usage = _read(limit_path), _read(usage_path)
+        # cgroup v1 reports no limit as a huge number
+        if limit and limit.isdigit() and int(limit) < 1 << 60:
+            cgroup_memory = int(limit) - int(usage or 0)
+            memory = cgroup_memory if memory is None else min(memory, cgroup_memory)
+    return memory
+
+
+def auto_threads(database: str = None, parallel_jobs: int = 1, cpus: float = None, memory: int = None,
+                 sharded: bool = False) -> dict:
+    """Choose the threads of every AHATool.sh job and the number of concurrent runs fitting in the available resources.
+
+    The threads are the largest of :data:`THREAD_OPTIONS` fitting in the CPUs shared by the
+    **parallel_jobs** of a run (database shards or input chunks). Every job is assumed to need
+    :data:`JOB_BASE_MEMORY` plus the size of the database it searches (one shard of it if
+    **sharded**), which bounds the concurrent runs.
+
+    Args:
+        database (str): Path to the database searched by the jobs.
+        parallel_jobs (int): AHATool.sh jobs running at the same time in a run.
+        cpus (float): Available CPUs. Defaults to :func:`available_cpus`.
+        memory (int): Available memory in bytes. Defaults to :func:`available_memory`.
+        sharded (bool): The **parallel_jobs** search one shard of the database each.
+
+    Returns:
+        dict: ``threads`` per job, concurrent ``runs``, the ``cpus`` and ``memory`` seen, the ``job_memory``
+        estimate and the ``run_memory`` share of the available memory of every run (None if unknown).
+    """
+    cpus = available_cpus() if cpus is None else cpus
+    memory = available_memory() if memory is None else memory
+    database_size = os.path.getsize(database) if database and os.path.isfile(database) else 0
+    if sharded:
+        database_size = -(-database_size // parallel_jobs)
+    job_memory = JOB_BASE_MEMORY + database_size
+
+    cpus_per_job = max(1, int(cpus // parallel_jobs))
+    threads = max(t for t in THREAD_OPTIONS if t <= cpus_per_job or t == THREAD_OPTIONS[0])
+    runs = max(1, int(cpus // (threads * parallel_jobs)))
+    if memory:
+        runs = max(1, min(runs, memory // (job_memory * parallel_jobs)))
+    return {'threads': threads, 'runs': runs, 'cpus': cpus, 'memory': memory, 'job_memory': job_memory,
+            'run_memory': memory // runs if memory else None}
+
+
+def describe(sizing: dict) -> str:
+    memory = f"{sizing['memory'] / (1 << 30):.1f} GiB" if sizing['memory'] else 'unknown memory'
+    return (f"Automatic sizing: {sizing['threads']} threads per job and {sizing['runs']} concurrent runs "
+            f"for {sizing['cpus']:g} CPUs, {memory} and {sizing['job_memory'] / (1 << 30):.1f} GiB per job")
@@ -0,0 +1,156 @@
+"""Post-processing of ahatool output files."""
+import hashlib
+import json
+import shutil
+import zipfile
+from contextlib import ExitStack
+from pathlib import Path
+
+# Extensions of the HMMER per-sequence (tblout) and per-domain (domtblout) hit tables
+HIT_TABLE_EXTENSIONS = ('.tbl', '.tblout', '.domtbl', '.domtblout')
+# Extensions of the result files whose parts are concatenated when merging: sequences and text reports
+CONCATENATED_EXTENSIONS = ('.fa', '.fasta', '.faa', '.fas', '.fna', '.txt', '.out', '.log')
+# File added to a merged zip when files differing between the parts could not be merged
+MERGE_MARKER = 'MERGE_SKIPPED.json'
+
+
+def is_hit_table(name: str) -> bool:
+    """Return True if the result file **name** is a HMMER hit table."""
+    return Path(name).suffix.lower() in HIT_TABLE_EXTENSIONS
+
+
+def evalue_columns(name: str) -> tuple:
+    """Return the indexes of the E-value columns of the hit table **name** depending on the database size, the first one being the sorting key.
+
+    The conditional and independent domain E-values of per-domain tables depend on the number
+    of reported targets, not on the database size, so they are not included.
+    """
+    if 'dom' in Path(name).suffix.lower():
+        # Full sequence E-value
+        return 6,
+    # Full sequence E-value and best domain E-value
+    return 4, 7
+
+
+def iter_result_files(source: str, stack: ExitStack):
+    """Yield the relative name and an opener returning a binary file object for every file of a result zip or folder."""
+    if zipfile.is_zipfile(source):
+        zip_file = stack.enter_context(zipfile.ZipFile(source))
+        for info in zip_file.infolist():
+            if not info.is_dir():
+                yield info.filename, lambda info=info: zip_file.open(info)
+    else:
+        root = Path(source)
+        for path in sorted(root.rglob('*')):
+            if path.is_file():
+                yield str(path.relative_to(root)), lambda path=path: open(path, 'rb')
+
+
+def query_column(name: str) -> int:
+    """Return the index of the query name column of the hit table **name**."""
+    return 3 if 'dom' in Path(name).suffix.lower() else 2
+
+
+def _merge_hit_tables(name: str, parts: list, evalue_scales: list, evalue: float = None, query_order: list = None) -> bytes:
+    """Concatenate the rows of several hit tables rescaling their E-values.
+
+    Rows whose rescaled E-value is over the **evalue** threshold of the run are removed. As in
+    a HMMER table, the rows are grouped by query, in the **query_order** or else in order of
+    appearance, and sorted by E-value within every query.
+    """
+    columns = evalue_columns(name)
+    query = query_column(name)
+    ranks = {name: rank for rank, name in enumerate(query_order or [])}
+    header, footer, rows = [], [], []
+    for index, opener in parts:
+        scale = evalue_scales[index]
+        in_header = True
+        with opener() as f:
+            for line in f.read().decode().splitlines():
+                if line.startswith('#') or not line.strip():
+                    if index == parts[0][0]:
+                        (header if in_header else footer).append(line)
+                    continue
+                in_header = False
+                fields = line.split()
+                if scale != 1:
+                    for column in columns:
+                        if column < len(fields):
+                            fields[column] = f'{float(fields[column]) * scale:.2g}'
+                key = float(fields[columns[0]]) if columns[0] < len(fields) else float('inf')
+                if evalue is not None and key > evalue:
+                    continue
+                query_name = fields[query] if query < len(fields) else ''
+                rank = ranks.setdefault(query_name, len(ranks))
+                rows.append((rank, key, ' '.join(fields)))
+    rows.sort(key=lambda row: row[:2])
+    return ('\n'.join(header + [line for _, _, line in rows] + footer) + '\n').encode()
+
+
+def _without_timestamps(data: bytes) -> bytes:
+    """Return **data** without the DATE lines of the HMMER profiles, which differ between runs."""
+    return b'\n'.join(line for line in data.split(b'\n') if not line.startswith(b'DATE '))
+
+
+def merge_results(sources: list, output_path: str, evalue_scales: list = None, evalue: float = None,
+                  query_order: list = None, part_names: list = None, replacements: dict = None) -> list:
+    """Merge the results of several partial runs (zip files or folders) into a single zip.
+
+    HMMER hit tables with the same name are merged row by row, their E-values multiplied by
+    the scale of each source, filtered by the **evalue** threshold and grouped by query. Files
+    with the same name and content, or profile HMMs differing only in their DATE line, are kept
+    once. Sequence files and text reports (:data:`CONCATENATED_EXTENSIONS`) differing between
+    the sources are concatenated in source order. Any other file differing between the sources
+    cannot be merged: it is kept once per part if **part_names** are given or else left out,
+    and listed in a :data:`MERGE_MARKER` file of the zip.
+
+    Args:
+        sources (list): Paths to the result zip files or folders.
+        output_path (str): Path to the merged zip file.
+        evalue_scales (list): E-value correction factor of each source. Defaults to 1.
+        evalue (float): E-value threshold of the run, applied to the rescaled E-values.
+        query_order (list): Query names in input order, the order of the rows of the hit tables.
+        part_names (list): Name of each source, the folder in the zip of its files that cannot be merged.
+        replacements (dict): Files of the sources written from the given path instead of being merged, such as the whole input of a chunked run.
+
+    Returns:
+        list: Names of the files that could not be merged.
+    """
+    evalue_scales = evalue_scales or [1] * len(sources)
+    replacements = replacements or {}
+    unmerged, per_part = [], {}
+    with ExitStack() as stack:
+        members = {}
+        for index, source in enumerate(sources):
+            for name, opener in iter_result_files(source, stack):
+                members.setdefault(name, []).append((index, opener))
+
+        with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as out_zip:
+            for name, parts in members.items():
+                if name in replacements:
+                    out_zip.write(replacements[name], name)
+                    continue
+                if is_hit_table(name):
+                    out_zip.writestr(name, _merge_hit_tables(name, parts, evalue_scales, evalue, query_order))
+                    continue
+                digests = set()
+                for _, opener in parts:
+                    with opener() as f:
+                        digests.add(hashlib.sha256(_without_timestamps(f.read())).hexdigest())
+                if len(digests) > 1 and Path(name).suffix.lower() not in CONCATENATED_EXTENSIONS:
+                    unmerged.append(name)
+                    for index, opener in parts if part_names else []:
+                        per_part.setdefault(name, []).append(f'{part_names[index]}/{name}')
+                        with opener() as f, out_zip.open(per_part[name][-1], 'w') as out_file:
+                            shutil.copyfileobj(f, out_file)
+                    continue
+                with out_zip.open(name, 'w') as out_file:
+                    for _, opener in parts if len(digests) > 1 else parts[:1]:
+                        with opener() as f:
+                            shutil.copyfileobj(f, out_file)
+            if unmerged:
+                marker = {'parts': len(sources), 'skipped_files': [name for name in unmerged if name not in per_part]}
+                if per_part:
+                    marker['per_part_files'] = per_part
+                out_zip.writestr(MERGE_MARKER, json.dumps(marker, indent=2))
+    return unmerged
@@ -0,0 +1,139 @@
+"""Split of sequence databases and inputs into parts searched in parallel."""
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+from biobb_ahatool.ahatool.common import file_identity
+
+SHARDS_MANIFEST = 'shards.json'
+
+
+def split_fasta(fasta_path: str, part_paths: list) -> tuple:
+    """Split the FASTA file **fasta_path** into the files **part_paths** balanced by residue count.
+
+    The file is streamed once, every sequence going to the part with fewer residues.
+
+    Returns:
+        tuple: Number of sequences and number of residues of every part.
+    """
+    n_parts = len(part_paths)
+    residues = [0] * n_parts
+    sequences = [0] * n_parts
+    part_files = [open(path, 'w') for path in part_paths]
+    try:
+        with open(fasta_path) as fasta_file:
+            record, record_residues = [], 0
+            for line in fasta_file:
+                if line.startswith('>'):
+                    if record:
+                        part = residues.index(min(residues))
+                        part_files[part].writelines(record)
+                        residues[part] += record_residues
+                        sequences[part] += 1
+                    record, record_residues = [line], 0
+                elif record:
+                    record.append(line)
+                    record_residues += len(line.strip())
+            if record:
+                part = residues.index(min(residues))
+                part_files[part].writelines(record)
+                residues[part] += record_residues
+                sequences[part] += 1
+    finally:
+        for f in part_files:
+            f.close()
+    return sequences, residues
+
+
+def split_database(database: str, n_shards: int, shard_dir: str = None) -> dict:
+    """Split the FASTA **database** into **n_shards** files balanced by residue count with :func:`split_fasta`.
+
+    Shards are written to ``<shard_dir>/<database name>_shards<n_shards>`` (next to the
+    database by default) with a manifest, and reused while the database does not change.
+
+    Args:
+        database (str): Path to the FASTA database.
+        n_shards (int): Number of shards.
+        shard_dir (str): Parent folder of the shards folder. Defaults to the database folder.
+
+    Returns:
+        dict: Manifest with the ``shards`` paths, their ``sequences`` count and the ``total_sequences`` of the database.
+    """
+    database = Path(database).resolve()
+    shards_path = Path(shard_dir or database.parent).resolve().joinpath(f'{database.name}_shards{n_shards}')
+    manifest_path = shards_path.joinpath(SHARDS_MANIFEST)
+    if manifest_path.is_file():
+        manifest = json.loads(manifest_path.read_text())
+        if manifest.get('database') == file_identity(str(database)):
+            return manifest
+        shutil.rmtree(shards_path, ignore_errors=True)
+
+    shards_path.parent.mkdir(parents=True, exist_ok=True)
+    build_dir = Path(tempfile.mkdtemp(prefix=f'.{shards_path.name}-', dir=shards_path.parent))
+    names = [f'{database.stem}_{i}{database.suffix}' for i in range(n_shards)]
+    sequences, residues = split_fasta(str(database), [build_dir.joinpath(name) for name in names])
+
+    manifest = {
+        'database': file_identity(str(database)),
+        'shards': [str(shards_path.joinpath(name)) for name in names],
+        'sequences': sequences,
+        'residues': residues,
+        'total_sequences': sum(sequences)
+    }
+    build_dir.joinpath(SHARDS_MANIFEST).write_text(json.dumps(manifest, indent=2))
+    build_dir.chmod(0o755)
+    try:
+        build_dir.rename(shards_path)
+    except OSError:
+        # Another process split the same database first
+        shutil.rmtree(build_dir, ignore_errors=True)
+        return json.loads(manifest_path.read_text())
+    return manifest
+
+
+def evalue_scales(manifest: dict) -> list:
+    """Return the factors correcting the E-values of each shard to the size of the full database."""
+    return [manifest['total_sequences'] / max(n, 1) for n in manifest['sequences']]
+
+
+def split_input(input_path: str, n_chunks: int, chunks_dir: str) -> list:
+    """Split the FASTA **input_path** into at most **n_chunks** chunks balanced by residue count.
+
+    Every chunk is written to ``<chunks_dir>/chunk_<i>/`` with the name of the input, so the
+    files produced from it are named as the ones of a run of the whole input. Empty chunks
+    (inputs with fewer sequences than chunks) are removed.
+
+    Returns:
+        list: Paths to the chunk files.
+    """
+    chunk_paths = []
+    for i in range(n_chunks):
+        Path(chunks_dir).joinpath(f'chunk_{i}').mkdir(parents=True)
+        chunk_paths.append(Path(chunks_dir).joinpath(f'chunk_{i}', Path(input_path).name))
+    sequences, _ = split_fasta(input_path, chunk_paths)
+    for chunk_path, n in zip(chunk_paths, sequences):
+        if not n:
+            shutil.rmtree(chunk_path.parent)
+    return [str(chunk_path) for chunk_path, n in zip(chunk_paths, sequences) if n]
+
+
+def is_fasta(file_path: str) -> bool:
+    with open(file_path) as f:
+        return f.read(1) == '>'
+
+
+def sequence_names(fasta_path: str) -> list:
+    """Return the names of the sequences of the FASTA file **fasta_path**, the query names of a search, in file order."""
+    with open(fasta_path) as f:
+        return [line[1:].split()[0] for line in f if line.startswith('>') and line[1:].strip()]
+
+
+def write_shards_script(script_path: str, commands: list) -> str:
+    """Write a bash script running all **commands** in background and failing if any of them fails."""
+    lines = ['#!/bin/bash', '# Generated by biobb_ahatool: one AHATool.sh job per database shard or input chunk', 'pids=()']
+    for command in commands:
+        lines += [f'( {command} ) &', 'pids+=($!)']
+    lines += ['rc=0', 'for pid in "${pids[@]}"; do wait "$pid" || rc=1; done', 'exit $rc']
+    Path(script_path).write_text('\n'.join(lines) + '\n')
+    return str(script_path)
@@ -0,0 +1,271 @@
+"""Staging of the files shared by all the ahatool runs of a host."""
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import stat
+import tempfile
+from pathlib import Path
+
+from biobb_common.tools import file_utils as fu
+from biobb_ahatool.ahatool.common import file_digest, file_identity, path_size, touch
+from biobb_ahatool.ahatool.database import INDEX_MANIFEST_SUFFIX, index_is_valid, read_manifest
+
+# Manifest of a database copied to the scratch folder, written next to the copy
+SCRATCH_MANIFEST = 'scratch.json'
+
+
+def shared_support_dir(support_folder: str, binary_path: str = None, staging_dir: str = None) -> str:
+    """Return a read-only copy of **support_folder** and **binary_path** shared by all the runs of the host.
+
+    The copy is created only once in **staging_dir** (system temporary folder by default) and reused
+    while the source files, including the ones in the subfolders, do not change. Concurrent callers build it in private folders and the
+    first one renamed into place wins, so no locking is needed.
+
+    Args:
+        support_folder (str): Path to the AHATool_Resources folder.
+        binary_path (str): Path to the AHATool.sh script, copied next to the support files.
+        staging_dir (str): Parent folder of the shared copies.
+
+    Returns:
+        str: Path to the shared folder.
+    """
+    sources = sorted(str(p) for p in Path(support_folder).iterdir())
+    tree = sorted(str(p) for p in Path(support_folder).rglob('*'))
+    if binary_path:
+        sources.append(shutil.which(binary_path) or binary_path)
+        tree.append(sources[-1])
+    key = hashlib.sha256(json.dumps([file_identity(f) for f in tree]).encode()).hexdigest()[:16]
+
+    # The links to the shared files are created from the sandbox folders, so the path must be absolute
+    staging_dir = Path(staging_dir or Path(tempfile.gettempdir()).joinpath('biobb_ahatool_support')).resolve()
+    shared_dir = staging_dir.joinpath(key)
+    if shared_dir.is_dir():
+        return str(shared_dir)
+
+    staging_dir.mkdir(parents=True, exist_ok=True)
+    build_dir = Path(tempfile.mkdtemp(prefix=f'.{key}-', dir=staging_dir))
+    for source in sources:
+        target = build_dir.joinpath(Path(source).name)
+        if Path(source).is_dir():
+            shutil.copytree(source, target)
+        else:
+            shutil.copy2(source, target)
+    # Every copied file is read-only, including the ones in the subfolders
+    for target in build_dir.rglob('*'):
+        if target.is_file() and not target.is_symlink():
+            target.chmod(target.stat().st_mode & ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH))
+    build_dir.chmod(0o755)
+    try:
+        build_dir.rename(shared_dir)
+    except OSError:
+        # Another process staged the same files first
+        shutil.rmtree(build_dir, ignore_errors=True)
+    return str(shared_dir)
+
+
+def link_support_files(shared_dir: str, dest_dir: str) -> list:
+    """Create symbolic links in **dest_dir** to every entry of **shared_dir** and return the list of links.
+
+    Existing links are atomically replaced, so concurrent runs sharing **dest_dir** never see a missing file.
+    """
+    links = []
+    for source in Path(shared_dir).iterdir():
+        link = Path(dest_dir).joinpath(source.name)
+        if not (link.is_symlink() and os.readlink(link) == str(source)):
+            tmp_link = Path(dest_dir).joinpath(f'.{source.name}.{os.getpid()}.tmp')
+            if tmp_link.is_symlink():
+                tmp_link.unlink()
+            tmp_link.symlink_to(source)
+            os.replace(tmp_link, link)
+        links.append(str(link))
+    return links
+
+
+def database_files(database: str) -> list:
+    """Return **database** and its sidecar files (index files written next to it), without the index manifest and locks."""
+    database = Path(database)
+    sidecars = sorted(p for p in database.parent.glob(database.name + '.*')
+                      if p.is_file() and not p.name.endswith(('.lock', INDEX_MANIFEST_SUFFIX)))
+    return [str(database)] + [str(p) for p in sidecars]
+
+
+def _copy_with_digest(source: str, target: str, chunk_size: int = 1 << 20) -> str:
+    """Copy **source** to **target** reading it only once. Return the sha256 digest of the bytes read."""
+    digest = hashlib.sha256()
+    with open(source, 'rb') as source_file, open(target, 'wb') as target_file:
+        for chunk in iter(lambda: source_file.read(chunk_size), b''):
+            digest.update(chunk)
+            target_file.write(chunk)
+    shutil.copystat(source, target)
+    return digest.hexdigest()
+
+
+def _flock(lock_path: Path, operation: int):
+    """Open and lock **lock_path**, retrying if the lock file is removed by an eviction meanwhile.
+
+    Returns:
+        The open lock file, or None if the lock is non-blocking and held by another process.
+    """
+    while True:
+        lock_file = open(lock_path, 'a')
+        try:
+            fcntl.flock(lock_file, operation)
+        except BlockingIOError:
+            lock_file.close()
+            return None
+        try:
+            if os.fstat(lock_file.fileno()).st_ino == os.stat(lock_path).st_ino:
+                return lock_file
+        except FileNotFoundError:
+            pass
+        lock_file.close()
+
+
+class DatabaseScratch:
+    """Node-local folder of database copies reused by all the runs of the node.
+
+    Every database is copied once to ``db-<key>`` in **scratch_dir**, with its index files,
+    and verified by size and checksum. A run holds a shared lock on the copy it uses, so the
+    least recently used copies not in use are evicted when the folder exceeds **max_size**.
+    Evicting, checking the space and copying are serialized by a lock of the whole folder.
+
+    Args:
+        scratch_dir (str): Path to the local scratch folder. It is created if it does not exist.
+        max_size (int): Maximum size in bytes of the database copies in the scratch folder.
+    """
+
+    def __init__(self, scratch_dir: str, max_size: int = None) -> None:
+        self.scratch_dir = Path(scratch_dir).resolve()
+        self.max_size = max_size
+        self.use_lock = None
+        self.scratch_dir.mkdir(parents=True, exist_ok=True)
+
+    def _lock_path(self, entry: str, kind: str) -> Path:
+        return self.scratch_dir.joinpath(f'.{entry}.{kind}.lock')
+
+    def is_staged(self, entry_dir: Path, source: str) -> bool:
+        manifest_path = entry_dir.joinpath(SCRATCH_MANIFEST)
+        if not manifest_path.is_file():
+            return False
+        manifest = json.loads(manifest_path.read_text())
+        try:
+            return manifest['source'] == file_identity(source) and \
+                all(entry_dir.joinpath(name).stat().st_size == size for name, size in manifest['sizes'].items())
+        except FileNotFoundError:
+            return False
+
+    def fits(self, needed: int, keep: str = None) -> bool:
+        """Return True if **needed** bytes fit in the free space and, with the copies other than **keep**, in the maximum size."""
+        if needed > shutil.disk_usage(self.scratch_dir).free:
+            return False
+        return not self.max_size or \
+            sum(path_size(str(p)) for p in self.scratch_dir.glob('db-*') if p.name != keep) + needed <= self.max_size
+
+    def evict(self, needed: int = 0, keep: str = None) -> list:
+        """Remove the least recently used database copies not in use, other than **keep**, until **needed** bytes fit in the maximum size and the free space.
+
+        :meth:`stage` calls it holding the lock of the folder. The lock files of the removed copies are deleted.
+
+        Returns:
+            list: Paths of the removed copies.
+        """
+        entries = []
+        for entry_dir in self.scratch_dir.glob('db-*'):
+            try:
+                if entry_dir.name != keep:
+                    entries.append((entry_dir.stat().st_mtime, path_size(str(entry_dir)), entry_dir))
+            except FileNotFoundError:
+                # Evicted by a concurrent run
+                continue
+        entries.sort()
+        total_size = sum(size for _, size, _ in entries)
+        removed = []
+        for _, size, entry_dir in entries:
+            if (not self.max_size or total_size + needed <= self.max_size) and needed <= shutil.disk_usage(self.scratch_dir).free:
+                break
+            copy_lock = _flock(self._lock_path(entry_dir.name, 'copy'), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            use_lock = copy_lock and _flock(self._lock_path(entry_dir.name, 'use'), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            if not use_lock:
+                # Used or being copied by another run
+                if copy_lock:
+                    copy_lock.close()
+                continue
+            try:
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                # Runs waiting for the removed lock files open new ones
+                for kind in ('copy', 'use'):
+                    self._lock_path(entry_dir.name, kind).unlink()
+            finally:
+                use_lock.close()
+                copy_lock.close()
+            total_size -= size
+            removed.append(str(entry_dir))
+        return removed
+
+    def stage(self, database: str, out_log=None, global_log=None) -> str:
+        """Return the path to the scratch copy of **database**, copying it if needed, and lock it until :meth:`release`.
+
+        Concurrent runs wait for the first one to copy the database. If the copy does not fit
+        in the maximum size or in the free space of the scratch folder, **database** is returned.
+        """
+        source = str(Path(database).resolve())
+        key = hashlib.sha256(json.dumps(file_identity(source)).encode()).hexdigest()[:16]
+        entry = f'db-{key}'
+        entry_dir = self.scratch_dir.joinpath(entry)
+        target = str(entry_dir.joinpath(Path(source).name))
+        copy_lock = _flock(self._lock_path(entry, 'copy'), fcntl.LOCK_EX)
+        try:
+            if self.is_staged(entry_dir, source):
+                fu.log(f'Reusing scratch copy of {database}: {target}', out_log, global_log)
+            else:
+                files = database_files(source)
+                needed = sum(os.path.getsize(f) for f in files)
+                # Other runs cannot take the space freed for the copy
+                with _flock(self.scratch_dir.joinpath('.scratch.lock'), fcntl.LOCK_EX):
+                    self.evict(needed, keep=entry)
+                    if not self.fits(needed, keep=entry):
+                        fu.log(f'Database {database} does not fit in scratch folder {self.scratch_dir}, using it in place', out_log, global_log)
+                        return database
+                    fu.log(f'Copying database {database} to scratch folder {self.scratch_dir}', out_log, global_log)
+                    self._copy(source, files, entry_dir)
+            # Lock the copy before another run can evict it
+            self.use_lock = _flock(self._lock_path(entry, 'use'), fcntl.LOCK_SH)
+        finally:
+            copy_lock.close()
+        touch(str(entry_dir))
+        return target
+
+    def _copy(self, source: str, files: list, entry_dir: Path) -> None:
+        """Copy and verify **files** in a private folder renamed to **entry_dir**."""
+        build_dir = Path(tempfile.mkdtemp(prefix=f'.{entry_dir.name}-', dir=self.scratch_dir))
+        try:
+            sizes = {}
+            for file_path in files:
+                target = build_dir.joinpath(Path(file_path).name)
+                digest = _copy_with_digest(file_path, str(target))
+                if target.stat().st_size != os.path.getsize(file_path) or file_digest(str(target)) != digest:
+                    raise OSError(f'Copy of {file_path} in the scratch folder is corrupted')
+                sizes[target.name] = target.stat().st_size
+            # The index manifest of the copy refers to the copied database and index files
+            target = str(entry_dir.joinpath(Path(source).name))
+            if index_is_valid(source):
+                manifest = read_manifest(source)
+                manifest['index_files'] = [str(entry_dir.joinpath(Path(f).name)) for f in manifest['index_files']]
+                manifest['database'] = [target] + file_identity(str(build_dir.joinpath(Path(source).name)))[1:]
+                build_dir.joinpath(Path(source).name + INDEX_MANIFEST_SUFFIX).write_text(json.dumps(manifest, indent=2))
+            build_dir.joinpath(SCRATCH_MANIFEST).write_text(json.dumps({'source': file_identity(source), 'sizes': sizes}, indent=2))
+            build_dir.chmod(0o755)
+            # A stale copy of the same database is replaced
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            build_dir.rename(entry_dir)
+        except BaseException:
+            shutil.rmtree(build_dir, ignore_errors=True)
+            raise
+
+    def release(self) -> None:
+        """Release the lock on the database copy used by the run."""
+        if self.use_lock:
+            self.use_lock.close()
+            self.use_lock = None
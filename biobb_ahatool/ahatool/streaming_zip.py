@@ -0,0 +1,123 @@
+"""Zip writer archiving the result files of a run while it is still running."""
+import fnmatch
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from pathlib import Path
+
+# Already compressed files, always stored without compression
+STORED_PATTERNS = ('*.gz', '*.bz2', '*.xz', '*.zip', '*.zst')
+
+
+class StreamingZip:
+    """Add the files of **root** to **zip_path** as soon as they are finalized.
+
+    A file is considered finalized when it has not been modified for **settle_time** seconds.
+    The folder is polled in a background thread between :meth:`start` and :meth:`close`, which
+    archives the remaining files. Files modified after being archived are replaced in the zip.
+
+    Args:
+        zip_path (str): Path to the output zip file.
+        root (str): Folder with the result files. Names in the zip are relative to it.
+        compression_level (int): 0 stores the files, 1-9 deflates them with this level.
+        include (list): Glob patterns of the files to archive. Defaults to all of them.
+        exclude (list): Glob patterns of the files not to archive.
+        settle_time (float): Seconds without modification after which a file is archived.
+        poll_interval (float): Seconds between two polls of **root**.
+    """
+
+    def __init__(self, zip_path: str, root: str, compression_level: int = 0, include: list = None,
+                 exclude: list = None, settle_time: float = 30, poll_interval: float = 5) -> None:
+        self.zip_path = Path(zip_path)
+        self.root = Path(root)
+        self.compression_level = compression_level
+        self.include = include or ['*']
+        self.exclude = exclude or []
+        self.settle_time = settle_time
+        self.poll_interval = poll_interval
+        self.archived = {}
+        self.bytes_written = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self.zip_path.parent.mkdir(parents=True, exist_ok=True)
+        self._zip = zipfile.ZipFile(self.zip_path, 'w')
+
+    def _selected(self, name: str) -> bool:
+        return (any(fnmatch.fnmatch(name, p) for p in self.include)
+                and not any(fnmatch.fnmatch(name, p) for p in self.exclude))
+
+    def _write(self, path: Path, name: str, stat: os.stat_result) -> None:
+        if self.compression_level and not any(fnmatch.fnmatch(name, p) for p in STORED_PATTERNS):
+            self._zip.write(path, name, zipfile.ZIP_DEFLATED, self.compression_level)
+        else:
+            self._zip.write(path, name, zipfile.ZIP_STORED)
+        self.archived[name] = (stat.st_mtime_ns, stat.st_size)
+        self.bytes_written += stat.st_size
+
+    def poll(self, final: bool = False) -> None:
+        """Archive the finalized files not yet in the zip, or all of them if **final**."""
+        now = time.time()
+        for path in sorted(self.root.rglob('*')):
+            name = path.relative_to(self.root).as_posix()
+            if name in self.archived or path.resolve() == self.zip_path.resolve() or not self._selected(name):
+                continue
+            try:
+                if not path.is_file():
+                    continue
+                stat = path.stat()
+                if final or now - stat.st_mtime >= self.settle_time:
+                    self._write(path, name, stat)
+            except FileNotFoundError:
+                continue
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            self.poll()
+
+    def start(self) -> 'StreamingZip':
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        """Stop polling, archive the remaining files and replace the ones modified since they were archived."""
+        if self._thread:
+            self._stop.set()
+            self._thread.join()
+        modified = []
+        for name, (mtime, size) in self.archived.items():
+            path = self.root.joinpath(name)
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if (stat.st_mtime_ns, stat.st_size) != (mtime, size):
+                modified.append(name)
+        self.poll(final=True)
+        self._zip.close()
+        if modified:
+            self._replace(modified)
+
+    def _replace(self, names: list) -> None:
+        """Rewrite the zip replacing the entries of **names** with the current content of the files."""
+        fd, tmp_path = tempfile.mkstemp(suffix='.zip', dir=self.zip_path.parent)
+        os.close(fd)
+        with zipfile.ZipFile(self.zip_path) as old_zip, zipfile.ZipFile(tmp_path, 'w') as new_zip:
+            for info in old_zip.infolist():
+                if info.filename not in names:
+                    with old_zip.open(info) as src, new_zip.open(info, 'w') as dst:
+                        shutil.copyfileobj(src, dst)
+            self._zip = new_zip
+            for name in names:
+                path = self.root.joinpath(name)
+                self._write(path, name, path.stat())
+        os.replace(tmp_path, self.zip_path)
+
+    def __enter__(self) -> 'StreamingZip':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,146 @@
+"""Long-lived containers reused by the AhatoolContainer runs of a process."""
+import atexit
+import hashlib
+import itertools
+import os
+import subprocess
+import threading
+import time
+
+# Mount point in warm containers of the folder where the sandbox folders are created
+WARM_WORK_DIR = '/home/work'
+# Folder of the working directory where the sandbox folders of the warm container runs are moved, the only one mounted
+WARM_SANDBOX_DIR = 'biobb_ahatool_warm'
+
+_containers = {}
+_lock = threading.Lock()
+_reaper = None
+# Serial number of the containers, so a new container never takes the name of one being stopped
+_serial = itertools.count()
+
+
+class WarmContainer:
+    """Container started once in background and reused through ``exec``.
+
+    Args:
+        container_path (str): Path to the docker binary.
+        container_image (str): Container image.
+        volumes (dict): Host folders mounted in the container, mapped to their container paths.
+        container_user_id (str): User running the commands in the container.
+        idle_timeout (int): Seconds without running commands after which the container is stopped.
+    """
+
+    def __init__(self, container_path: str, container_image: str, volumes: dict,
+                 container_user_id: str = None, idle_timeout: int = 600) -> None:
+        self.container_path = container_path
+        self.container_image = container_image
+        self.volumes = volumes
+        self.container_user_id = container_user_id
+        self.idle_timeout = idle_timeout
+        key = hashlib.sha256(repr((container_image, sorted(volumes.items()))).encode()).hexdigest()[:12]
+        self.name = f'biobb_ahatool_{os.getpid()}_{key}_{next(_serial)}'
+        self.active = 0
+        self.last_used = time.monotonic()
+        self.running = False
+        self._start_lock = threading.Lock()
+
+    def start(self) -> None:
+        cmd = [self.container_path, 'run', '-d', '--rm', '--name', self.name]
+        for host_path, container_path in self.volumes.items():
+            cmd += ['-v', f'{host_path}:{container_path}']
+        if self.container_user_id:
+            cmd += ['--user', self.container_user_id]
+        cmd += [self.container_image, 'sleep', 'infinity']
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL)
+        self.running = True
+
+    def stop(self) -> None:
+        if self.running:
+            subprocess.run([self.container_path, 'rm', '-f', self.name],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            self.running = False
+
+    def exec_cmd(self, cmd: list, working_dir: str, container_shell_path: str = '/bin/bash -c') -> list:
+        """Return the command line running **cmd** inside the container from **working_dir**."""
+        exec_cmd = [self.container_path, 'exec', '-w', working_dir]
+        if self.container_user_id:
+            exec_cmd += ['--user', self.container_user_id]
+        return exec_cmd + [self.name, container_shell_path, '"' + ' '.join(cmd) + '"']
+
+    def release(self) -> None:
+        """Mark the container as no longer used by a run handed it by :func:`get_warm_container`."""
+        with _lock:
+            self.active -= 1
+            self.last_used = time.monotonic()
+
+
+def get_warm_container(container_path: str, container_image: str, volumes: dict,
+                       container_user_id: str = None, idle_timeout: int = 600) -> WarmContainer:
+    """Return the running warm container for this image and volumes, starting it if needed.
+
+    The container is marked as in use in the same step it is found, so it cannot be stopped as
+    idle before the caller runs its command. The caller must :meth:`release <WarmContainer.release>` it.
+    Docker is never called holding the lock of the containers of the process.
+    """
+    stop_idle_containers()
+    key = (container_path, container_image, tuple(sorted(volumes.items())), container_user_id)
+    with _lock:
+        container = _containers.get(key)
+        if container is None:
+            container = WarmContainer(container_path, container_image, volumes, container_user_id, idle_timeout)
+            _containers[key] = container
+        container.idle_timeout = idle_timeout
+        container.active += 1
+        container.last_used = time.monotonic()
+        _schedule_reaper()
+    try:
+        # Concurrent callers wait for the first one to start the container
+        with container._start_lock:
+            if not container.running:
+                container.start()
+    except BaseException:
+        with _lock:
+            if _containers.get(key) is container and not container.running:
+                del _containers[key]
+        container.release()
+        raise
+    return container
+
+
+def stop_idle_containers() -> None:
+    """Stop the warm containers not used for longer than their idle timeout."""
+    now = time.monotonic()
+    with _lock:
+        idle = [key for key, c in _containers.items() if not c.active and now - c.last_used > c.idle_timeout]
+        stopped = [_containers.pop(key) for key in idle]
+    for container in stopped:
+        container.stop()
+
+
+def shutdown_warm_containers() -> None:
+    """Stop all the warm containers of this process. Registered to run at exit."""
+    with _lock:
+        stopped = list(_containers.values())
+        _containers.clear()
+    for container in stopped:
+        container.stop()
+
+
+def _schedule_reaper() -> None:
+    """Start the background timer stopping idle containers if it is not already running. Call it holding the lock."""
+    global _reaper
+    if _containers and _reaper is None:
+        _reaper = threading.Timer(min(c.idle_timeout for c in _containers.values()) + 1, _reap)
+        _reaper.daemon = True
+        _reaper.start()
+
+
+def _reap() -> None:
+    global _reaper
+    stop_idle_containers()
+    with _lock:
+        _reaper = None
+        _schedule_reaper()
+
+
+atexit.register(shutdown_warm_containers)
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+
+"""Benchmarks of the ahatool wrappers with stand-ins for AHATool.sh and docker.
+
+Measures the overhead added by the wrappers around a run, the cost of staging the support
+files, the throughput of batch runs (of FASTA queries and of profile HMMs), the cost of cold and warm container runs and the import
+time of the package. Inputs are synthetic and seeded, so results of different commits are
+comparable::
+
+    python -m biobb_ahatool.test.benchmarks.run_benchmarks --output before.json
+    python -m biobb_ahatool.test.benchmarks.run_benchmarks --output after.json --compare before.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from biobb_ahatool.test.benchmarks.synthetic import write_database, write_fasta, write_hmm, write_support_folder
+from biobb_ahatool.test.fake_tools import FAKE_AHATOOL, FAKE_DOCKER
+
+
+@contextlib.contextmanager
+def work_dir():
+    """Run the block in a fresh temporary working directory."""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='biobb_ahatool_bench_') as tmp_dir:
+        os.chdir(tmp_dir)
+        try:
+            yield Path(tmp_dir)
+        finally:
+            os.chdir(cwd)
+
+
+def timed(func, *args, **kwargs) -> float:
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        return time.perf_counter() - start
+
+
+def summary(times: list) -> dict:
+    return {'mean': statistics.mean(times), 'median': statistics.median(times), 'min': min(times), 'runs': len(times)}
+
+
+def base_properties(tmp_dir: Path, params: dict) -> dict:
+    support_folder = write_support_folder(str(tmp_dir.joinpath('AHATool_Resources')), params['support_size'])
+    database = write_database(str(tmp_dir.joinpath('db.fa')), params['database_size'])
+    return {'binary_path': FAKE_AHATOOL, 'support_folder': support_folder, 'database': database, 'threads': 1,
+            'support_staging_dir': str(tmp_dir.joinpath('staging')), 'can_write_console_log': False}
+
+
+def wrapper_overhead(query: str, properties: dict, tmp_dir: Path, repeats: int) -> dict:
+    from biobb_ahatool.ahatool.ahatool import ahatool
+    start = ['-s', properties['start']] if properties.get('start') else []
+    binary_times, block_times = [], []
+    for i in range(repeats):
+        binary_times.append(timed(subprocess.run, [FAKE_AHATOOL, *start, '-i', query, '-o', f'direct_{i}.zip'],
+                                  cwd=properties['support_folder'], check=True))
+        block_times.append(timed(ahatool, query, str(tmp_dir.joinpath(f'output_{Path(query).stem}_{i}.zip')), dict(properties)))
+    return {'binary': summary(binary_times), 'block': summary(block_times),
+            'overhead': statistics.median(block_times) - statistics.median(binary_times)}
+
+
+def bench_wrapper_overhead(params: dict) -> dict:
+    """Time of a full ahatool run minus the time of the stand-in binary alone, for a FASTA query and a profile HMM searched directly."""
+    with work_dir() as tmp_dir:
+        properties = base_properties(tmp_dir, params)
+        query = write_fasta(str(tmp_dir.joinpath('query.fasta')), params['query_sequences'])
+        results = wrapper_overhead(query, properties, tmp_dir, params['repeats'])
+        profile = write_hmm(str(tmp_dir.joinpath('profile.hmm')), params['hmm_length'])
+        results['hmm'] = wrapper_overhead(profile, dict(properties, start='search'), tmp_dir, params['repeats'])
+    return results
+
+
+def bench_staging(params: dict) -> dict:
+    """Wall time of the stage_files stage, first run of the host and following runs."""
+    from biobb_ahatool.ahatool.ahatool import ahatool
+    with work_dir() as tmp_dir:
+        properties = dict(base_properties(tmp_dir, params), metrics=True)
+        query = write_fasta(str(tmp_dir.joinpath('query.fasta')), params['query_sequences'])
+        times = []
+        for i in range(params['repeats']):
+            output_path = tmp_dir.joinpath(f'output_{i}.zip')
+            timed(ahatool, query, str(output_path), dict(properties))
+            metrics = json.loads(output_path.with_name(f'output_{i}_metrics.json').read_text())
+            times.append(next(s['wall_time'] for s in metrics['stages'] if s['stage'] == 'stage_files'))
+    return {'support_size': params['support_size'], 'first': times[0], 'reuse': summary(times[1:] or times)}
+
+
+def bench_batch(params: dict) -> dict:
+    """Throughput of ahatool_batch with a fixed runtime per input, for FASTA queries and profile HMMs searched directly."""
+    from biobb_ahatool.ahatool.ahatool import ahatool_batch
+    results = {}
+    for kind in ('fasta', 'hmm'):
+        with work_dir() as tmp_dir:
+            properties = base_properties(tmp_dir, params)
+            input_dir = tmp_dir.joinpath('inputs')
+            input_dir.mkdir()
+            for i in range(params['batch_inputs']):
+                if kind == 'fasta':
+                    write_fasta(str(input_dir.joinpath(f'query_{i}.fasta')), params['query_sequences'], seed=i)
+                else:
+                    write_hmm(str(input_dir.joinpath(f'query_{i}.hmm')), params['hmm_length'], f'profile_{i}', seed=i)
+                    properties['start'] = 'search'
+            os.environ['FAKE_AHATOOL_RUNTIME'] = str(params['runtime'])
+            try:
+                elapsed = timed(ahatool_batch, str(input_dir), str(tmp_dir.joinpath('outputs')), properties,
+                                max_workers=params['workers'])
+            finally:
+                os.environ.pop('FAKE_AHATOOL_RUNTIME')
+        ideal = params['batch_inputs'] * params['runtime'] / params['workers']
+        results[kind] = {'inputs': params['batch_inputs'], 'workers': params['workers'], 'elapsed': elapsed,
+                         'inputs_per_second': params['batch_inputs'] / elapsed, 'efficiency': ideal / elapsed if ideal else None}
+    return results
+
+
+def bench_container(params: dict) -> dict:
+    """Time of cold (one docker run per launch) and warm (docker exec) ahatool_container runs."""
+    from biobb_ahatool.ahatool.ahatool_container import ahatool_container
+    from biobb_ahatool.ahatool.warm_container import shutdown_warm_containers
+    results = {}
+    for mode in ('cold', 'warm'):
+        with work_dir() as tmp_dir:
+            properties = base_properties(tmp_dir, params)
+            properties.update({'container_path': FAKE_DOCKER, 'container_shell_path': '/bin/bash -c',
+                               'warm_container': mode == 'warm', 'zip_settle_time': 0})
+            os.environ['FAKE_DOCKER_STATE'] = str(tmp_dir.joinpath('fake_docker'))
+            os.environ['FAKE_AHATOOL_OUTPUT_SIZE'] = str(params['output_size'])
+            try:
+                query = write_fasta(str(tmp_dir.joinpath('query.fasta')), params['query_sequences'])
+                times = [timed(ahatool_container, query, str(tmp_dir.joinpath(f'output_{i}.zip')), dict(properties))
+                         for i in range(params['repeats'])]
+                shutdown_warm_containers()
+            finally:
+                os.environ.pop('FAKE_DOCKER_STATE')
+                os.environ.pop('FAKE_AHATOOL_OUTPUT_SIZE')
+            results[mode] = summary(times)
+    return results
+
+
+# Modules imported by the import time benchmark
+IMPORT_MODULES = ('biobb_ahatool', 'biobb_ahatool.ahatool.ahatool', 'biobb_ahatool.ahatool.ahatool_container')
+
+
+def bench_import_time(params: dict) -> dict:
+    """Time of importing the package and the block modules in a new interpreter, minus the interpreter startup."""
+    def import_time(statement: str) -> float:
+        return statistics.median(timed(subprocess.run, [sys.executable, '-c', statement], check=True)
+                                 for _ in range(params['repeats']))
+    startup = import_time('pass')
+    results = {'startup': startup, 'budget': params['import_budget']}
+    for module in IMPORT_MODULES:
+        results[module] = import_time(f'import {module}') - startup
+    results['within_budget'] = all(results[module] <= params['import_budget'] for module in IMPORT_MODULES)
+    return results
+
+
+BENCHMARKS = {
+    'wrapper_overhead': bench_wrapper_overhead,
+    'staging': bench_staging,
+    'batch': bench_batch,
+    'container': bench_container,
+    'import_time': bench_import_time,
+}
+
+
+def flatten(results: dict, prefix: str = '') -> dict:
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f'{prefix}{key}.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[prefix + key] = value
+    return flat
+
+
+def compare(results: dict, baseline: dict) -> None:
+    """Print the ratio of every numeric result to the one of **baseline**."""
+    current, previous = flatten(results['results']), flatten(baseline['results'])
+    print(f"{'metric':50} {'baseline':>12} {'current':>12} {'ratio':>8}")
+    for key in sorted(current.keys() & previous.keys()):
+        ratio = current[key] / previous[key] if previous[key] else float('nan')
+        print(f'{key:50} {previous[key]:12.4g} {current[key]:12.4g} {ratio:8.2f}')
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=Path(__file__).parent, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks of the ahatool wrappers with stand-in tools.',
+                                     formatter_class=lambda prog: argparse.RawTextHelpFormatter(prog, width=99999))
+    parser.add_argument('--benchmarks', nargs='+', choices=BENCHMARKS, default=list(BENCHMARKS), help='Benchmarks to run')
+    parser.add_argument('--repeats', type=int, default=5, help='Runs of every timed operation')
+    parser.add_argument('--query_sequences', type=int, default=50, help='Sequences of every synthetic query')
+    parser.add_argument('--hmm_length', type=int, default=200, help='Match states of every synthetic profile HMM query')
+    parser.add_argument('--database_size', type=int, default=1 << 20, help='Size in bytes of the synthetic database')
+    parser.add_argument('--support_size', type=int, default=50 << 20, help='Size in bytes of the synthetic support folder')
+    parser.add_argument('--output_size', type=int, default=10 << 20, help='Bytes of result files written by every container run')
+    parser.add_argument('--batch_inputs', type=int, default=16, help='Inputs of the batch benchmark')
+    parser.add_argument('--workers', type=int, default=4, help='Workers of the batch benchmark')
+    parser.add_argument('--runtime', type=float, default=0.5, help='Seconds of every stand-in AHATool.sh run in the batch benchmark')
+    parser.add_argument('--import_budget', type=float, default=0.15, help='Maximum seconds to import every module of the import time benchmark. The command fails above it')
+    parser.add_argument('--output', help='Path to the JSON results file')
+    parser.add_argument('--compare', help='Path to a previous JSON results file to compare with')
+    args = parser.parse_args()
+
+    params = {k: v for k, v in vars(args).items() if k not in ('benchmarks', 'output', 'compare')}
+    results = {
+        'commit': git_commit(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'params': params,
+        'results': {name: BENCHMARKS[name](params) for name in args.benchmarks}
+    }
+    text = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(text)
+    else:
+        print(text)
+    if args.compare:
+        compare(results, json.loads(Path(args.compare).read_text()))
+    if not results['results'].get('import_time', {}).get('within_budget', True):
+        sys.exit(f'Import time above the budget of {args.import_budget} seconds')
+
+
+if __name__ == '__main__':
+    main()
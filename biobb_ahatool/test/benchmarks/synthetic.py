@@ -0,0 +1,58 @@
+"""Synthetic inputs, databases and support folders for the ahatool benchmarks."""
+import math
+import random
+from pathlib import Path
+
+AMINO_ACIDS = 'ACDEFGHIKLMNPQRSTVWY'
+
+
+def random_sequence(rng: random.Random, length: int) -> str:
+    return ''.join(rng.choice(AMINO_ACIDS) for _ in range(length))
+
+
+def write_fasta(path: str, n_sequences: int, mean_length: int = 300, seed: int = 0, prefix: str = 'seq') -> str:
+    """Write **n_sequences** random protein sequences with lengths between 0.5 and 1.5 times **mean_length**."""
+    rng = random.Random(seed)
+    with open(path, 'w') as f:
+        for i in range(n_sequences):
+            sequence = random_sequence(rng, rng.randint(mean_length // 2, mean_length * 3 // 2))
+            f.write(f'>{prefix}_{i} synthetic protein {i}\n')
+            for start in range(0, len(sequence), 60):
+                f.write(sequence[start:start + 60] + '\n')
+    return str(path)
+
+
+def write_database(path: str, size: int, mean_length: int = 300, seed: int = 1) -> str:
+    """Write a random FASTA database of about **size** bytes."""
+    n_sequences = max(1, size // (mean_length + mean_length // 60 + 30))
+    return write_fasta(path, n_sequences, mean_length, seed, prefix='db')
+
+
+def write_hmm(path: str, length: int = 100, name: str = 'synthetic', seed: int = 0) -> str:
+    """Write a random profile HMM of **length** match states in HMMER3 text format."""
+    rng = random.Random(seed)
+
+    def scores(n):
+        weights = [rng.random() for _ in range(n)]
+        return '  '.join(f'{-math.log(w / sum(weights)):.5f}' for w in weights)
+
+    lines = ['HMMER3/f [3.3.2 | Nov 2020]', f'NAME  {name}', f'LENG  {length}', 'ALPH  amino',
+             'RF    no', 'MM    no', 'CONS  yes', 'CS    no', 'MAP   yes', 'NSEQ  10', 'EFFN  5.000000',
+             f'HMM          {"        ".join(AMINO_ACIDS)}',
+             '            m->m     m->i     m->d     i->m     i->i     d->m     d->d',
+             f'  COMPO   {scores(20)}', f'          {scores(20)}', f'          {scores(7)}']
+    for node in range(1, length + 1):
+        lines += [f'{node:7d}   {scores(20)} {node} {rng.choice(AMINO_ACIDS).lower()} - - -',
+                  f'          {scores(20)}', f'          {scores(7)}']
+    lines.append('//')
+    Path(path).write_text('\n'.join(lines) + '\n')
+    return str(path)
+
+
+def write_support_folder(path: str, size: int, n_files: int = 10) -> str:
+    """Write an AHATool_Resources stand-in with **n_files** files adding up to **size** bytes."""
+    Path(path).mkdir(parents=True, exist_ok=True)
+    Path(path).joinpath('resource.txt').write_text('synthetic resource\n')
+    for i in range(n_files):
+        Path(path).joinpath(f'resource_{i}.dat').write_bytes(b'0' * (size // n_files))
+    return str(path)
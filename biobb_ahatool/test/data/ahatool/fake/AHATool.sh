@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Stand-in for AHATool.sh used by the unitests and the benchmarks.
+
+Accepts the AHATool.sh command line and writes a zip with a HMMER-like hit table.
+FAKE_AHATOOL_RUNTIME (seconds) and FAKE_AHATOOL_OUTPUT_SIZE (bytes of an extra
+alignment file) control the cost of a run. The build stage writes <prefix>.hmm in the
+working directory and FAKE_AHATOOL_FAIL_AFTER_BUILD makes the run fail after it.
+
+If the database exists, the hits of every query are the FAKE_AHATOOL_HITS targets of the
+database with the lowest per-target score, whose E-value is proportional to the number of
+database sequences as in HMMER. Otherwise every input sequence is a hit. The queries of a
+search of sequences are the input sequences, otherwise the profile named after the input.
+"""
+import argparse
+import hashlib
+import os
+import time
+import zipfile
+from pathlib import Path
+
+parser = argparse.ArgumentParser()
+parser.add_argument('-p', dest='prefix', default='fake')
+parser.add_argument('-s', dest='start', default='build')
+parser.add_argument('-d', dest='database', default='nr.fa')
+parser.add_argument('-e', dest='evalue', type=float, default=1e-10)
+parser.add_argument('-t', dest='threads', default='2')
+parser.add_argument('-o', dest='output', default=None)
+parser.add_argument('-i', dest='input', required=True)
+args = parser.parse_args()
+
+resources = [Path('resource.txt'), Path(__file__).with_name('resource.txt'),
+             Path(__file__).parent.joinpath('AHATool_Resources', 'resource.txt')]
+if not any(path.exists() for path in resources):
+    raise SystemExit('AHATool_Resources not found')
+
+text = Path(args.input).read_text()
+if not text.startswith(('>', 'HMMER')):
+    raise SystemExit(f'Unrecognized input format: {args.input}')
+
+if args.start == 'build' and text.startswith('>'):
+    Path(f'{args.prefix}.hmm').write_text('HMMER3/f [fake]\nNAME  {}\nLENG  1\n//\n'.format(Path(args.input).stem))
+    if os.getenv('FAKE_AHATOOL_FAIL_AFTER_BUILD'):
+        raise SystemExit('Search stage failed')
+
+time.sleep(float(os.getenv('FAKE_AHATOOL_RUNTIME', 0)))
+output_size = int(os.getenv('FAKE_AHATOOL_OUTPUT_SIZE', 0))
+alignment = (b'>seq\n' + b'ACDEFGHIKLMNPQRSTVWY' * 4 + b'\n') * (output_size // 86 + 1) if output_size else b''
+
+
+
+def target_pvalue(target: str) -> float:
+    """Deterministic stand-in of the per-sequence P-value of a target."""
+    return (1 + int(hashlib.sha256(target.encode()).hexdigest(), 16) % 900) * 1e-33
+
+
+# The queries of a search of sequences are the input sequences, otherwise the input profile
+records = [record.split()[0] for record in text.split('>')[1:]] if text.startswith('>') else []
+by_sequence = args.start == 'search' and bool(records)
+queries = records if by_sequence else [Path(args.input).stem]
+lines = [f'# start: {args.start}', '# target name  accession  query name  accession  E-value  score  bias']
+if Path(args.database).is_file():
+    with open(args.database) as database:
+        targets = [line[1:].split()[0] for line in database if line.startswith('>')]
+    hits = sorted(targets, key=target_pvalue)[:int(os.getenv('FAKE_AHATOOL_HITS', 3))]
+    for query in queries:
+        for i, target in enumerate(hits):
+            lines.append(f'{target} - {query} - {target_pvalue(target) * len(targets):.3e} {200.0 - i:.1f} 0.1')
+else:
+    for i, target in enumerate(records):
+        query = target if by_sequence else queries[0]
+        lines.append(f'{target} - {query} - {1e-30 * 10 ** i:.1e} {200.0 - i:.1f} 0.1')
+# Without output zip (container mode) the results are left in the working directory
+if args.output:
+    with zipfile.ZipFile(args.output, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        zip_file.writestr(f'{args.prefix}_hits.tbl', '\n'.join(lines) + '\n')
+        if alignment:
+            zip_file.writestr(f'{args.prefix}_alignment.aln', alignment[:output_size])
+else:
+    Path(f'{args.prefix}_hits.tbl').write_text('\n'.join(lines) + '\n')
+    if alignment:
+        Path(f'{args.prefix}_alignment.aln').write_bytes(alignment[:output_size])
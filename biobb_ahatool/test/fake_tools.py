@@ -0,0 +1,17 @@
+"""Stand-ins for AHATool.sh and docker shared by the unitests and the benchmarks."""
+from pathlib import Path
+
+from biobb_common.tools import test_fixtures as fx
+
+FAKE_DIR = Path(__file__).resolve().parent.joinpath('data', 'ahatool', 'fake')
+FAKE_AHATOOL = str(FAKE_DIR.joinpath('AHATool.sh'))
+FAKE_DOCKER = str(FAKE_DIR.joinpath('docker'))
+FAKE_ESL_SFETCH = str(FAKE_DIR.joinpath('esl-sfetch'))
+FAKE_RESOURCES = str(FAKE_DIR.joinpath('AHATool_Resources'))
+
+
+def fake_test_setup(test_object, key: str) -> None:
+    """Set up a test as :func:`test_setup <biobb_common.tools.test_fixtures.test_setup>` running the stand-in AHATool.sh."""
+    fx.test_setup(test_object, key)
+    test_object.properties['binary_path'] = FAKE_AHATOOL
+    test_object.properties['support_folder'] = FAKE_RESOURCES
@@ -0,0 +1,89 @@
+import asyncio
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+from biobb_common.tools import test_fixtures as fx
+from biobb_ahatool.test.fake_tools import fake_test_setup
+from biobb_ahatool.ahatool.ahatool import Ahatool
+from biobb_ahatool.ahatool.ahatool_async import ahatool_async, ahatool_many, launch_async
+
+
+class TestAhatoolAsync():
+    def setup_class(self):
+        fake_test_setup(self, 'ahatool_async')
+
+    def teardown_class(self):
+        fx.test_teardown(self)
+
+    def test_ahatool_many(self):
+        input_paths, output_paths = [], []
+        for name in ('family_a', 'family_b', 'family_c'):
+            input_paths.append(shutil.copy2(Path(self.data_dir).joinpath('ahatool', 'test.fasta'), name + '.fasta'))
+            output_paths.append(str(Path(self.paths['output_dir']).joinpath(name + '.zip')))
+        Path('family_d.fasta').write_text('not a fasta file\n')
+        input_paths.append('family_d.fasta')
+        output_paths.append(str(Path(self.paths['output_dir']).joinpath('family_d.zip')))
+
+        return_codes = asyncio.run(ahatool_many(input_paths, output_paths, self.properties, max_concurrency=2))
+        for input_path, output_path in zip(input_paths[:3], output_paths):
+            assert fx.exe_success(return_codes[input_path])
+            assert fx.not_empty(output_path)
+        assert not fx.exe_success(return_codes['family_d.fasta'])
+
+    def test_ahatool_async_timeout(self):
+        input_path = str(Path(self.data_dir).joinpath('ahatool', 'test.fasta'))
+        sandboxes = set(p for p in Path.cwd().iterdir() if p.is_dir())
+        os.environ['FAKE_AHATOOL_RUNTIME'] = '30'
+        try:
+            try:
+                asyncio.run(ahatool_async(input_path, 'timeout.zip', dict(self.properties), timeout=1))
+                assert False, 'The run did not time out'
+            except asyncio.TimeoutError:
+                pass
+        finally:
+            os.environ.pop('FAKE_AHATOOL_RUNTIME')
+        assert not Path('timeout.zip').exists()
+        assert set(p for p in Path.cwd().iterdir() if p.is_dir()) == sandboxes
+
+    def test_ahatool_many_timeout(self):
+        # Timed out jobs are written to the global log
+        messages = []
+        global_log = logging.getLogger('ahatool_many_timeout')
+        global_log.setLevel(logging.INFO)
+        global_log.addHandler(logging.Handler())
+        global_log.handlers[-1].emit = lambda record: messages.append(record.getMessage())
+        input_path = str(Path(self.data_dir).joinpath('ahatool', 'test.fasta'))
+        os.environ['FAKE_AHATOOL_RUNTIME'] = '30'
+        try:
+            return_codes = asyncio.run(ahatool_many([input_path], ['many_timeout.zip'], dict(self.properties, global_log=global_log), timeout=1))
+        finally:
+            os.environ.pop('FAKE_AHATOOL_RUNTIME')
+        assert return_codes == {input_path: None}
+        assert any(message.strip() == f'{input_path}: timed out after 1 seconds' for message in messages)
+
+    def test_ahatool_async_cancel_staging(self):
+        input_path = str(Path(self.data_dir).joinpath('ahatool', 'test.fasta'))
+        sandboxes = set(p for p in Path.cwd().iterdir() if p.is_dir())
+        block = Ahatool(input_path=input_path, output_path='cancelled.zip', properties=dict(self.properties))
+        prepare_launch = block.prepare_launch
+
+        def slow_prepare_launch():
+            time.sleep(0.5)
+            return prepare_launch()
+        block.prepare_launch = slow_prepare_launch
+
+        async def cancel_while_staging():
+            launch = asyncio.ensure_future(launch_async(block))
+            await asyncio.sleep(0.1)
+            launch.cancel()
+            try:
+                await launch
+                assert False, 'The run was not cancelled'
+            except asyncio.CancelledError:
+                pass
+        asyncio.run(cancel_while_staging())
+        # The sandbox created by the staging finished after the cancellation is removed
+        assert block.stage_io_dict.get('unique_dir')
+        assert set(p for p in Path.cwd().iterdir() if p.is_dir()) == sandboxes
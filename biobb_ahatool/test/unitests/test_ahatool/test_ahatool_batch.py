@@ -0,0 +1,53 @@
+import logging
+import shutil
+from pathlib import Path
+from biobb_common.tools import test_fixtures as fx
+from biobb_ahatool.test.fake_tools import fake_test_setup
+from biobb_ahatool.ahatool.ahatool import _batch_run, _batch_workers, ahatool_batch
+
+
+class TestAhatoolBatch():
+    def setup_class(self):
+        fake_test_setup(self, 'ahatool_batch')
+
+    def teardown_class(self):
+        fx.test_teardown(self)
+
+    def test_ahatool_batch(self):
+        input_dir = Path('batch_input')
+        input_dir.mkdir()
+        for name in ('family_a', 'family_b', 'family_c'):
+            shutil.copy2(Path(self.data_dir).joinpath('ahatool', 'test.fasta'), input_dir.joinpath(name + '.fasta'))
+        input_dir.joinpath('family_d.fasta').write_text('not a fasta file\n')
+
+        return_codes = ahatool_batch(input_paths=str(input_dir), properties=self.properties, max_workers=2, **self.paths)
+        assert len(return_codes) == 4
+        for name in ('family_a', 'family_b', 'family_c'):
+            assert fx.exe_success(return_codes[str(input_dir.joinpath(name + '.fasta'))])
+            assert fx.not_empty(str(Path(self.paths['output_dir']).joinpath(name + '.zip')))
+        assert not fx.exe_success(return_codes[str(input_dir.joinpath('family_d.fasta'))])
+        assert not Path('resource.txt').exists()
+
+    def test_batch_workers(self):
+        database = str(Path(self.data_dir).joinpath('ahatool', 'nr_test.fa'))
+        assert _batch_workers({'threads': 2}, cpus=8) == 4
+        assert _batch_workers({'threads': 2}, max_workers=3, cpus=8) == 3
+        # Every run of a sharded database or chunked input runs several jobs
+        assert _batch_workers({'threads': 2, 'database': database, 'database_shards': 2}, cpus=8) == 2
+        assert _batch_workers({'threads': 1, 'start': 'search', 'input_chunks': 4}, cpus=8) == 2
+        assert _batch_workers({'threads': 1, 'input_chunks': 4}, cpus=8) == 8
+        properties = {'threads': 'auto', 'database': database, 'database_shards': 4}
+        assert _batch_workers(properties, cpus=16, memory=64 << 30) == 1
+        assert properties['threads'] == 4
+        properties = {'threads': 'auto', 'database': database}
+        assert _batch_workers(properties, cpus=16, memory=64 << 30) == 4
+
+    def test_batch_run_error(self):
+        # Errors of a run are written to the global log of the batch
+        messages = []
+        global_log = logging.getLogger('ahatool_batch_errors')
+        global_log.setLevel(logging.INFO)
+        global_log.addHandler(logging.Handler())
+        global_log.handlers[-1].emit = lambda record: messages.append(record.getMessage())
+        assert _batch_run(None, 'error.zip', dict(self.properties, global_log=global_log)) is None
+        assert any(message.strip().startswith('None: ') for message in messages)
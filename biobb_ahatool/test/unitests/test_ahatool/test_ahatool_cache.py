@@ -0,0 +1,72 @@
+import os
+import zipfile
+from pathlib import Path
+from biobb_common.tools import test_fixtures as fx
+from biobb_ahatool.test.fake_tools import FAKE_DOCKER, fake_test_setup
+from biobb_ahatool.ahatool.ahatool import ahatool
+from biobb_ahatool.ahatool.ahatool_container import ahatool_container
+
+
+class TestAhatoolCache():
+    def setup_class(self):
+        fake_test_setup(self, 'ahatool_cache')
+
+    def teardown_class(self):
+        fx.test_teardown(self)
+
+    def test_ahatool_cache(self):
+        returncode = ahatool(properties=self.properties, **self.paths)
+        assert fx.exe_success(returncode)
+        assert Path('resource.txt').is_symlink()
+        assert fx.not_empty('output_metrics.json')
+        cached_files = list(Path(self.properties['cache_dir']).glob('*.zip'))
+        assert len(cached_files) == 1
+
+        returncode = ahatool(properties=self.properties, input_path=self.paths['input_path'], output_path='renamed.zip')
+        assert fx.exe_success(returncode)
+        assert Path('renamed.zip').read_bytes() == cached_files[0].read_bytes()
+        assert not os.path.samefile('renamed.zip', cached_files[0])
+
+        properties = dict(self.properties, evalue=0.001)
+        returncode = ahatool(properties=properties, input_path=self.paths['input_path'], output_path='other_evalue.zip')
+        assert fx.exe_success(returncode)
+        assert len(list(Path(self.properties['cache_dir']).glob('*.zip'))) == 2
+
+    def test_ahatool_cache_overwrite(self):
+        # Writing a new result to the path of a cache hit does not change the cache entry
+        properties = dict(self.properties, cache_dir='overwrite_cache')
+        for prefix, output_path in (('A', 'first.zip'), ('A', 'out.zip'), ('B', 'out.zip'), ('A', 'again.zip')):
+            returncode = ahatool(properties=dict(properties, prefix=prefix), input_path=self.paths['input_path'], output_path=output_path)
+            assert fx.exe_success(returncode)
+        with zipfile.ZipFile('out.zip') as zip_file:
+            assert zip_file.namelist() == ['B_hits.tbl']
+        with zipfile.ZipFile('again.zip') as zip_file:
+            assert zip_file.namelist() == ['A_hits.tbl']
+
+    def test_ahatool_cache_shards(self):
+        # A sharded run and a plain run of the same input have different cache entries
+        properties = dict(self.properties, cache_dir='shards_cache', database_shard_dir='cache_shards',
+                          database=str(Path(self.data_dir).joinpath('ahatool', 'nr_test.fa')))
+        assert fx.exe_success(ahatool(properties=dict(properties, database_shards=2), input_path=self.paths['input_path'], output_path='sharded.zip'))
+        assert fx.exe_success(ahatool(properties=properties, input_path=self.paths['input_path'], output_path='plain.zip'))
+        assert len(list(Path('shards_cache').glob('*.zip'))) == 2
+        with zipfile.ZipFile('plain.zip') as zip_file:
+            table = zip_file.read(next(n for n in zip_file.namelist() if n.endswith('.tbl'))).decode()
+        assert len([line for line in table.splitlines() if not line.startswith('#')]) == 3
+
+    def test_ahatool_container_cache_zip(self):
+        # The files of the output zip are part of the cache key of container runs
+        properties = dict(self.properties, cache_dir='container_cache', container_path=FAKE_DOCKER,
+                          container_image='bsceapm/ahatool:2.2', metrics=False)
+        os.environ['FAKE_DOCKER_STATE'] = str(Path('fake_docker_cache').resolve())
+        try:
+            assert fx.exe_success(ahatool_container(properties=properties, input_path=self.paths['input_path'], output_path='all_files.zip'))
+            assert fx.exe_success(ahatool_container(properties=dict(properties, zip_exclude=['*.fasta']),
+                                                    input_path=self.paths['input_path'], output_path='no_input.zip'))
+        finally:
+            os.environ.pop('FAKE_DOCKER_STATE')
+        with zipfile.ZipFile('all_files.zip') as zip_file:
+            assert any(name.endswith('.fasta') for name in zip_file.namelist())
+        with zipfile.ZipFile('no_input.zip') as zip_file:
+            assert not any(name.endswith('.fasta') for name in zip_file.namelist())
+        assert len(list(Path('container_cache').glob('*.zip'))) == 2
@@ -0,0 +1,34 @@
+import json
+import os
+import zipfile
+from pathlib import Path
+from biobb_common.tools import test_fixtures as fx
+from biobb_ahatool.test.fake_tools import fake_test_setup
+from biobb_ahatool.ahatool.ahatool import ahatool
+
+
+class TestAhatoolCheckpoint():
+    def setup_class(self):
+        fake_test_setup(self, 'ahatool_checkpoint')
+
+    def teardown_class(self):
+        fx.test_teardown(self)
+
+    def test_ahatool_checkpoint(self):
+        os.environ['FAKE_AHATOOL_FAIL_AFTER_BUILD'] = '1'
+        try:
+            returncode = ahatool(properties=dict(self.properties), **self.paths)
+        finally:
+            os.environ.pop('FAKE_AHATOOL_FAIL_AFTER_BUILD')
+        assert not fx.exe_success(returncode)
+        work_dirs = list(Path(self.properties['checkpoint_dir']).iterdir())
+        assert len(work_dirs) == 1
+        assert work_dirs[0].joinpath('ckpt.hmm').is_file()
+        manifest = json.loads(work_dirs[0].joinpath('checkpoint.json').read_text())
+        assert manifest['stages'] == ['build']
+
+        returncode = ahatool(properties=dict(self.properties), **self.paths)
+        assert fx.exe_success(returncode)
+        with zipfile.ZipFile(self.paths['output_path']) as zip_file:
+            assert zip_file.read('ckpt_hits.tbl').decode().startswith('# start: search')
+        assert not list(Path(self.properties['checkpoint_dir']).iterdir())
@@ -0,0 +1,83 @@
+import json
+import os
+import zipfile
+from pathlib import Path
+from biobb_common.tools import test_fixtures as fx
+from biobb_ahatool.test.fake_tools import FAKE_DOCKER, fake_test_setup
+from biobb_ahatool.ahatool.ahatool import Ahatool, ahatool
+from biobb_ahatool.ahatool.ahatool_container import ahatool_container
+from biobb_ahatool.ahatool.results import merge_results
+from biobb_ahatool.ahatool.sharding import sequence_names, split_input
+
+
+class TestAhatoolChunks():
+    def setup_class(self):
+        fake_test_setup(self, 'ahatool_chunks')
+
+    def teardown_class(self):
+        fx.test_teardown(self)
+
+    def test_split_input(self):
+        Path('split.fasta').write_text('>a\nAAAAAAAAAA\nAAAAAAAAAA\n>b\nCCCCCCCCCC\n>c\nDDDDDDDDDD\n>d\nEEEEE\n')
+        chunks = split_input('split.fasta', 4, 'split_chunks')
+        # Balanced by residues: the longest sequence alone, the others shared by the remaining chunks
+        assert len(chunks) == 4
+        assert all(Path(chunk).name == 'split.fasta' for chunk in chunks)
+        assert Path(chunks[0]).read_text() == '>a\nAAAAAAAAAA\nAAAAAAAAAA\n'
+        assert len(split_input('split.fasta', 6, 'split_more_chunks')) == 4
+
+    def test_ahatool_chunks(self):
+        Path('query.fasta').write_text(''.join(f'>seq{i}\n{"ACDEFGHIKL" * (i + 1)}\n' for i in range(7)))
+        returncode = ahatool(properties=self.properties, input_path='query.fasta', **self.paths)
+        assert fx.exe_success(returncode)
+
+        with zipfile.ZipFile(self.paths['output_path']) as zip_file:
+            assert zip_file.namelist() == ['chunks_hits.tbl']
+            rows = [line.split() for line in zip_file.read('chunks_hits.tbl').decode().splitlines() if not line.startswith('#')]
+        # Every sequence is a query, in input order
+        assert [(row[0], row[2]) for row in rows] == [(f'seq{i}', f'seq{i}') for i in range(7)]
+
+    def test_ahatool_chunks_build(self):
+        # The build stage makes one profile from the whole input, so it is not chunked
+        Path('build.fasta').write_text(''.join(f'>seq{i}\nACDEFGHIKL\n' for i in range(4)))
+        block = Ahatool(input_path='build.fasta', output_path='build.zip', properties=dict(self.properties, start='build'))
+        assert fx.exe_success(block.launch())
+        assert block.chunks == []
+        with zipfile.ZipFile('build.zip') as zip_file:
+            assert zip_file.read('chunks_hits.tbl').decode().startswith('# start: build')
+
+    def test_merge_chunks(self):
+        Path('whole.fasta').write_text('>q1\nAAAA\n>q2\nCCCC\n>q3\nDDDD\n')
+        for i, queries in enumerate((['q3'], ['q2', 'q1'])):
+            Path(f'merge_chunk_{i}').mkdir()
+            Path(f'merge_chunk_{i}', 'whole.fasta').write_text(f'>{queries[0]}\nXXXX\n')
+            Path(f'merge_chunk_{i}', 'hits.tbl').write_text(''.join(f't{i}{q} - {q} - 1e-{10 + i} 100.0 0.1 1e-{10 + i} 99.0 0.1\n'
+                                                                    f'u{i}{q} - {q} - 1e-{20 + i} 100.0 0.1 1e-{20 + i} 99.0 0.1\n' for q in queries))
+            Path(f'merge_chunk_{i}', 'query.aln').write_text(f'{queries}\n')
+        unmerged = merge_results(['merge_chunk_0', 'merge_chunk_1'], 'merged_chunks.zip', query_order=sequence_names('whole.fasta'),
+                                 part_names=['chunk_0', 'chunk_1'], replacements={'whole.fasta': 'whole.fasta'})
+        assert unmerged == ['query.aln']
+        with zipfile.ZipFile('merged_chunks.zip') as zip_file:
+            # The whole input instead of the chunks and the files that cannot be merged once per chunk
+            assert zip_file.read('whole.fasta') == Path('whole.fasta').read_bytes()
+            assert zip_file.read('chunk_1/query.aln') == b"['q2', 'q1']\n"
+            assert json.loads(zip_file.read('MERGE_SKIPPED.json'))['per_part_files'] == {'query.aln': ['chunk_0/query.aln', 'chunk_1/query.aln']}
+            # Rows grouped by query in input order, sorted by E-value within every query
+            rows = [line.split()[:3] for line in zip_file.read('hits.tbl').decode().splitlines()]
+        assert [row[0] for row in rows] == ['u1q1', 't1q1', 'u1q2', 't1q2', 'u0q3', 't0q3']
+
+    def test_ahatool_container_chunks(self):
+        # The output of a chunked container run has the staged input, not its chunks
+        Path('query.seq').write_text(''.join(f'>seq{i}\n{"ACDEFGHIKL" * (i + 1)}\n' for i in range(5)))
+        os.environ['FAKE_DOCKER_STATE'] = str(Path('fake_docker_chunks').resolve())
+        try:
+            returncode = ahatool_container(properties=dict(self.properties, container_path=FAKE_DOCKER, container_image='bsceapm/ahatool:2.2'),
+                                           input_path='query.seq', output_path='container_chunks.zip')
+        finally:
+            os.environ.pop('FAKE_DOCKER_STATE')
+        assert fx.exe_success(returncode)
+        with zipfile.ZipFile('container_chunks.zip') as zip_file:
+            assert sorted(zip_file.namelist()) == ['chunks_hits.tbl', 'query.seq']
+            assert zip_file.read('query.seq') == Path('query.seq').read_bytes()
+            rows = [line.split() for line in zip_file.read('chunks_hits.tbl').decode().splitlines() if not line.startswith('#')]
+        assert sorted(row[0] for row in rows) == [f'seq{i}' for i in range(5)]
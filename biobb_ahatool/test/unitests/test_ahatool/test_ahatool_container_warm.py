@@ -0,0 +1,53 @@
+import json
+import os
+import zipfile
+from pathlib import Path
+from biobb_common.tools import test_fixtures as fx
+from biobb_ahatool.test.fake_tools import FAKE_DOCKER, fake_test_setup
+from biobb_ahatool.ahatool.ahatool_container import ahatool_container
+from biobb_ahatool.ahatool.warm_container import get_warm_container, shutdown_warm_containers, stop_idle_containers
+
+
+class TestAhatoolContainerWarm():
+    def setup_class(self):
+        fake_test_setup(self, 'ahatool_container_warm')
+        self.properties['container_path'] = FAKE_DOCKER
+        self.properties['database'] = str(Path(self.data_dir).joinpath('ahatool', 'nr_test.fa'))
+        os.environ['FAKE_DOCKER_STATE'] = str(Path('fake_docker').resolve())
+
+    def teardown_class(self):
+        shutdown_warm_containers()
+        os.environ.pop('FAKE_DOCKER_STATE')
+        fx.test_teardown(self)
+
+    def test_ahatool_container_warm(self):
+        for output_path in ('first.zip', 'second.zip'):
+            returncode = ahatool_container(properties=self.properties, input_path=self.paths['input_path'], output_path=output_path)
+            assert fx.exe_success(returncode)
+            with zipfile.ZipFile(output_path) as zip_file:
+                assert 'warm_hits.tbl' in zip_file.namelist()
+            metrics = json.loads(Path(output_path).with_name(Path(output_path).stem + '_metrics.json').read_text())
+            assert [s['stage'] for s in metrics['stages']] == ['init', 'stage_files', 'run_biobb', 'zip_results', 'remove_tmp_files']
+            # The peak RSS of the docker client is not the one of the run
+            assert all(s['peak_child_rss_kb'] is None for s in metrics['stages'])
+
+        calls = [line.split() for line in Path('fake_docker', 'calls.log').read_text().splitlines()]
+        assert [call[0] for call in calls] == ['run', 'exec', 'exec']
+        # Only the folder of the sandboxes is mounted, not the whole working directory
+        mounts = [calls[0][i + 1].split(':')[0] for i, item in enumerate(calls[0]) if item == '-v']
+        assert str(Path('biobb_ahatool_warm').resolve()) in mounts
+        assert str(Path.cwd()) not in mounts
+        calls = [call[0] for call in calls]
+
+        shutdown_warm_containers()
+        calls = [line.split()[0] for line in Path('fake_docker', 'calls.log').read_text().splitlines()]
+        assert calls[-1] == 'rm'
+
+    def test_warm_container_in_use(self):
+        # A container handed out is not stopped as idle until it is released
+        container = get_warm_container(FAKE_DOCKER, 'image', {str(Path('in_use').resolve()): '/home/work'}, idle_timeout=0)
+        stop_idle_containers()
+        assert container.running
+        container.release()
+        stop_idle_containers()
+        assert not container.running
@@ -0,0 +1,96 @@
+import json
+import os
+import zipfile
+from pathlib import Path
+from biobb_common.tools import test_fixtures as fx
+from biobb_ahatool.test.fake_tools import fake_test_setup
+from biobb_ahatool.ahatool.ahatool import ahatool_batch
+from biobb_ahatool.ahatool.dedup import group_inputs, query_key
+
+
+class TestAhatoolDedup():
+    def setup_class(self):
+        fake_test_setup(self, 'ahatool_dedup')
+
+    def teardown_class(self):
+        fx.test_teardown(self)
+
+    def test_query_key(self):
+        Path('key_a.fasta').write_text('>a\nACDE\nFGHI\n>b\nKLMN\n')
+        # Other headers, order, wrapping and case
+        Path('key_b.fasta').write_text('>y desc\nklmn*\n>x\nACDEFGHI\n')
+        # A repeated sequence weights the profile built from the input
+        Path('key_f.fasta').write_text('>a\nACDEFGHI\n>b\nKLMN\n>c\nKLMN\n')
+        Path('key_c.fasta').write_text('>a\nACDEFGHI\n')
+        Path('key_d.fasta').write_text('>a\nacde-fghi\n')
+        Path('key_e.fasta').write_text('>a\nACDE-FGHI\n')
+        assert query_key('key_a.fasta') == query_key('key_b.fasta')
+        assert query_key('key_a.fasta') != query_key('key_c.fasta')
+        assert query_key('key_a.fasta') != query_key('key_f.fasta')
+        # Case of aligned sequences is kept
+        assert query_key('key_d.fasta') != query_key('key_e.fasta')
+        groups = group_inputs(['key_a.fasta', 'key_c.fasta', 'key_b.fasta', 'missing.fasta'])
+        assert list(groups.values()) == [['key_a.fasta', 'key_b.fasta'], ['key_c.fasta'], ['missing.fasta']]
+
+    def test_ahatool_dedup(self):
+        input_dir = Path('dedup_input')
+        input_dir.mkdir()
+        input_dir.joinpath('family_a.fasta').write_text('>a\nACDEFGHI\n>b\nKLMNPQRS\n')
+        input_dir.joinpath('family_b.fasta').write_text('>b2\nKLMNPQRS\n>a2\nacdefghi\n')
+        input_dir.joinpath('family_c.fasta').write_text('>c\nTVWY\n')
+        input_dir.joinpath('family_d.fasta').write_text('not a fasta file\n')
+
+        return_codes = ahatool_batch(input_paths=str(input_dir), properties=self.properties, max_workers=2,
+                                     deduplicate=True, **self.paths)
+        names = ['family_a', 'family_b', 'family_c', 'family_d']
+        assert list(return_codes) == [str(input_dir.joinpath(name + '.fasta')) for name in names]
+        assert [fx.exe_success(code) for code in return_codes.values()] == [True, True, True, False]
+
+        output_dir = Path(self.paths['output_dir'])
+        output_a, output_b = output_dir.joinpath('family_a.zip'), output_dir.joinpath('family_b.zip')
+        assert not os.path.samefile(output_a, output_b)
+        with zipfile.ZipFile(output_a) as zip_a, zipfile.ZipFile(output_b) as zip_b:
+            assert 'deduplication.json' not in zip_a.namelist()
+            assert zip_b.namelist() == zip_a.namelist() + ['deduplication.json']
+            assert all(zip_a.read(name) == zip_b.read(name) for name in zip_a.namelist())
+            copy_mapping = json.loads(zip_b.read('deduplication.json'))
+        assert copy_mapping['input'] == str(input_dir.joinpath('family_b.fasta'))
+        assert copy_mapping['representative'] == str(input_dir.joinpath('family_a.fasta'))
+
+        mapping = json.loads(output_dir.joinpath('deduplication.json').read_text())
+        assert len(mapping) == 3
+        assert mapping[0]['representative'] == str(input_dir.joinpath('family_a.fasta'))
+        assert list(mapping[0]['inputs'].values()) == [str(output_a), str(output_b)]
+        assert mapping[2]['return_code'] != 0
+
+    def test_ahatool_dedup_sequences(self):
+        # In a search every sequence is a query searched once for all the inputs
+        input_dir = Path('dedup_search_input')
+        input_dir.mkdir()
+        input_dir.joinpath('family_a.fasta').write_text('>a1\nACDEFGHI\n>a2\nKLMNPQRS\n')
+        input_dir.joinpath('family_b.fasta').write_text('>b1\nklmnpqrs\n>b2\nTVWY\n>b3\nACDEFGHI\n')
+        input_dir.joinpath('family_c.fasta').write_text('>c1\nTVWY*\n')
+        output_dir = Path('dedup_search_output')
+
+        return_codes = ahatool_batch(input_paths=str(input_dir), output_dir=str(output_dir), max_workers=2,
+                                     properties=dict(self.properties, start='search'), deduplicate=True)
+        assert list(return_codes) == [str(input_dir.joinpath(f'family_{name}.fasta')) for name in 'abc']
+        assert all(fx.exe_success(code) for code in return_codes.values())
+        assert output_dir.joinpath('deduplicated_queries.fasta').read_text() == '>query_0\nACDEFGHI\n>query_1\nKLMNPQRS\n>query_2\nTVWY\n'
+
+        # The hits of the queries of every input, named after its sequences and in its order
+        expected = {'a': [('a1', 'query_0'), ('a2', 'query_1')],
+                    'b': [('b1', 'query_1'), ('b2', 'query_2'), ('b3', 'query_0')],
+                    'c': [('c1', 'query_2')]}
+        for name, queries in expected.items():
+            with zipfile.ZipFile(output_dir.joinpath(f'family_{name}.zip')) as zip_file:
+                rows = [line.split() for line in zip_file.read('dedup_hits.tbl').decode().splitlines() if not line.startswith('#')]
+                copy_mapping = json.loads(zip_file.read('deduplication.json'))
+            assert [(row[2], row[0]) for row in rows] == queries
+            assert copy_mapping['queries'] == [list(query) for query in queries]
+
+        mapping = json.loads(output_dir.joinpath('deduplication.json').read_text())
+        assert [group['key'] for group in mapping] == ['sequences']
+        assert mapping[0]['return_code'] == 0
+        assert mapping[0]['queries'][str(input_dir.joinpath('family_c.fasta'))] == [['c1', 'query_2']]
+        assert not list(output_dir.glob('.deduplicated_queries_*'))
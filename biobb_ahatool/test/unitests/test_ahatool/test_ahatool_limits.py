@@ -0,0 +1,97 @@
+import json
+import os
+import signal
+import subprocess
+import time
+import zipfile
+from pathlib import Path
+from biobb_common.tools import test_fixtures as fx
+from biobb_ahatool.test.fake_tools import fake_test_setup
+from biobb_ahatool.ahatool.ahatool import ahatool
+from biobb_ahatool.ahatool.limits import limit_results, write_limits_script
+
+DOMAIN_TABLE = b"""# target tlen query qlen
+t1 - 100 q1 - 50 1e-20 80.0 0.1 1 2 1e-21 1e-20 79.0 0.1 1 50 1 60 1 65 0.95
+t1 - 100 q1 - 50 1e-20 80.0 0.1 2 2 1e-5 1e-4 20.0 0.1 10 20 70 80 68 82 0.90
+t2 - 200 q1 - 50 1e-3 12.0 0.3 1 1 1e-3 1e-2 11.0 0.3 1 25 1 30 1 32 0.80
+t3 - 200 q1 - 50 1e-2 10.0 0.3 1 1 1e-2 1e-1 9.0 0.3 1 25 1 30 1 32 0.80
+u1 - 100 q2 - 50 1e-30 90.0 0.1 1 1 1e-31 1e-30 89.0 0.1 1 50 1 60 1 65 0.95
+u2 - 100 q2 - 50 1e-25 85.0 0.1 1 1 1e-26 1e-25 84.0 0.1 1 50 1 60 1 65 0.95
+u3 - 100 q2 - 50 1e-20 80.0 0.1 1 1 1e-21 1e-20 79.0 0.1 1 50 1 60 1 65 0.95
+# Program: hmmsearch
+"""
+
+
+class TestAhatoolLimits():
+    def setup_class(self):
+        fake_test_setup(self, 'ahatool_limits')
+
+    def teardown_class(self):
+        fx.test_teardown(self)
+
+    def test_limit_results(self):
+        with zipfile.ZipFile('domains.zip', 'w') as zip_file:
+            zip_file.writestr('hits.domtbl', DOMAIN_TABLE)
+        marker = limit_results('domains.zip', max_hits=2)
+        assert marker['reasons'] == ['max_hits']
+        with zipfile.ZipFile('domains.zip') as zip_file:
+            rows = zip_file.read('hits.domtbl').decode().splitlines()
+            # The cap applies to the targets of every query
+            assert [row.split()[0] for row in rows if not row.startswith('#')] == ['t1', 't1', 't2', 'u1', 'u2']
+            assert rows[-1] == '# Program: hmmsearch'
+            assert json.loads(zip_file.read('TRUNCATED.json'))['tables'] == {'hits.domtbl': {'rows': 7, 'kept': 5}}
+        assert limit_results('domains.zip', max_hits=2) is None
+
+        # A stopped run can leave the last row incomplete
+        with zipfile.ZipFile('partial.zip', 'w') as zip_file:
+            zip_file.writestr('hits.tbl', b'# header\na - q - 1e-30 200.0 0.1\nb - q - 1e-2')
+            zip_file.writestr('alignment.aln', b'A' * 1000)
+        marker = limit_results('partial.zip', max_output_size=500, stopped='time_limit')
+        assert marker['reasons'] == ['time_limit', 'max_output_size']
+        assert marker['removed_files'] == ['alignment.aln']
+        with zipfile.ZipFile('partial.zip') as zip_file:
+            assert sorted(zip_file.namelist()) == ['TRUNCATED.json', 'hits.tbl']
+            assert zip_file.read('hits.tbl') == b'# header\na - q - 1e-30 200.0 0.1\n'
+
+    def test_ahatool_limits(self):
+        Path('query.fasta').write_text(''.join(f'>seq{i}\nACDEFGHIKL\n' for i in range(5)))
+        os.environ['FAKE_AHATOOL_OUTPUT_SIZE'] = '200000'
+        try:
+            # A time limit longer than the run, which is only checked every few seconds
+            returncode = ahatool(properties=dict(self.properties, time_limit=60), input_path='query.fasta', **self.paths)
+        finally:
+            os.environ.pop('FAKE_AHATOOL_OUTPUT_SIZE')
+        assert fx.exe_success(returncode)
+        with zipfile.ZipFile(self.paths['output_path']) as zip_file:
+            assert sorted(zip_file.namelist()) == ['TRUNCATED.json', 'limits_hits.tbl']
+            rows = [row for row in zip_file.read('limits_hits.tbl').decode().splitlines() if not row.startswith('#')]
+            assert [row.split()[0] for row in rows] == ['seq0', 'seq1']
+            marker = json.loads(zip_file.read('TRUNCATED.json'))
+        assert marker['reasons'] == ['max_hits', 'max_output_size']
+        assert marker['removed_files'] == ['limits_alignment.aln']
+
+    def test_ahatool_time_limit(self):
+        os.environ['FAKE_AHATOOL_RUNTIME'] = '30'
+        start = time.perf_counter()
+        try:
+            returncode = ahatool(properties=self.properties, input_path='query.fasta', output_path='slow.zip')
+        finally:
+            os.environ.pop('FAKE_AHATOOL_RUNTIME')
+        # Stopped before writing any result
+        assert returncode == 124
+        assert time.perf_counter() - start < 15
+
+    def test_limits_script_signal(self):
+        # Terminating the process group of the script also stops the command in its own group
+        Path('signal_dir').mkdir()
+        script = write_limits_script('signal_limits.sh', "bash -c 'echo $$ > child.pid; exec sleep 30'", 'signal_dir', time_limit=60)
+        process = subprocess.Popen(['bash', script], start_new_session=True)
+        while not Path('child.pid').is_file() or not Path('child.pid').read_text().strip():
+            time.sleep(0.1)
+        child = int(Path('child.pid').read_text())
+        os.killpg(process.pid, signal.SIGTERM)
+        assert process.wait(timeout=10) == 143
+        deadline = time.perf_counter() + 10
+        while time.perf_counter() < deadline and Path(f'/proc/{child}').exists() and 'Z' not in Path(f'/proc/{child}/stat').read_text().split()[2]:
+            time.sleep(0.1)
+        assert not Path(f'/proc/{child}').exists() or Path(f'/proc/{child}/stat').read_text().split()[2] == 'Z'
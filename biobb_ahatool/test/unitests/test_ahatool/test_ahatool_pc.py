@@ -0,0 +1,69 @@
+import importlib
+import shutil
+import sys
+import types
+import zipfile
+from pathlib import Path
+from unittest import mock
+from biobb_common.tools import test_fixtures as fx
+from biobb_ahatool.test.fake_tools import fake_test_setup
+
+ADAPTERS = ('biobb_ahatool.adapters.pycompss.ahatool.ahatool_pc',
+            'biobb_ahatool.adapters.pycompss.ahatool.ahatool_container_pc')
+
+
+def pycompss_modules() -> dict:
+    """Stand-in pycompss API whose decorators record their arguments and run the tasks synchronously."""
+    def decorator(attribute):
+        def factory(**arguments):
+            def decorate(function):
+                setattr(function, attribute, arguments)
+                return function
+            return decorate
+        return factory
+    modules = {name: types.ModuleType(name) for name in
+               ('pycompss', 'pycompss.api', 'pycompss.api.task', 'pycompss.api.constraint', 'pycompss.api.parameter')}
+    modules['pycompss.api.task'].task = decorator('task_parameters')
+    modules['pycompss.api.constraint'].constraint = decorator('constraints')
+    modules['pycompss.api.parameter'].FILE_IN = 'FILE_IN'
+    modules['pycompss.api.parameter'].FILE_OUT = 'FILE_OUT'
+    return modules
+
+
+class TestAhatoolPc():
+    def setup_class(self):
+        fake_test_setup(self, 'ahatool_pc')
+        self.patch = mock.patch.dict(sys.modules, pycompss_modules())
+        self.patch.start()
+        self.ahatool_pc, self.ahatool_container_pc = (importlib.import_module(name) for name in ADAPTERS)
+
+    def teardown_class(self):
+        self.patch.stop()
+        for name in ADAPTERS:
+            sys.modules.pop(name, None)
+        fx.test_teardown(self)
+
+    def test_constrained_tasks(self):
+        for module, prefix in ((self.ahatool_pc, '_ahatool_pc_'), (self.ahatool_container_pc, '_ahatool_container_pc_')):
+            for units in (1, 2, 4):
+                task = getattr(module, f'{prefix}{units}')
+                assert task.constraints == {'computing_units': str(units)}
+                # The database is not a task file, so its index files are kept next to it
+                assert task.task_parameters == {'input_path': 'FILE_IN', 'output_path': 'FILE_OUT'}
+
+    def test_computing_units(self):
+        computing_units = self.ahatool_pc.computing_units
+        assert [computing_units({'threads': threads}) for threads in (None, 1, 2, 3, 4, 8)] == [1, 1, 2, 4, 4, 4]
+        assert computing_units({'threads': 'auto'}) in (1, 2, 4)
+
+    def test_ahatool_pc(self):
+        shutil.copy2(Path(self.data_dir).joinpath('ahatool', 'nr_test.fa'), 'nr_test.fa')
+        calls = []
+        with mock.patch.object(self.ahatool_pc, '_ahatool', side_effect=lambda *args, **kwargs: calls.append(args)):
+            self.ahatool_pc.ahatool_pc(self.paths['input_path'], 'dispatch.zip', dict(self.properties, threads=2))
+        assert calls == [(self.paths['input_path'], 'dispatch.zip', dict(self.properties, threads=2, database=str(Path('nr_test.fa').resolve())))]
+
+        # Tasks run synchronously with the stand-in API
+        self.ahatool_pc.ahatool_pc(self.paths['input_path'], self.paths['output_path'], dict(self.properties, threads=1))
+        with zipfile.ZipFile(self.paths['output_path']) as zip_file:
+            assert 'pc_hits.tbl' in zip_file.namelist()
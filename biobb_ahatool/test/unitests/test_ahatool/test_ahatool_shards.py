@@ -0,0 +1,72 @@
+import hashlib
+import json
+import zipfile
+from pathlib import Path
+from biobb_common.tools import test_fixtures as fx
+from biobb_ahatool.test.fake_tools import fake_test_setup
+from biobb_ahatool.ahatool.ahatool import ahatool
+from biobb_ahatool.ahatool.results import merge_results
+
+
+def fasta_names(fasta_path) -> list:
+    return [line[1:].split()[0] for line in Path(fasta_path).read_text().splitlines() if line.startswith('>')]
+
+
+def target_pvalue(target: str) -> float:
+    """P-value of a target in the stand-in AHATool.sh."""
+    return (1 + int(hashlib.sha256(target.encode()).hexdigest(), 16) % 900) * 1e-33
+
+
+class TestAhatoolShards():
+    def setup_class(self):
+        fake_test_setup(self, 'ahatool_shards')
+        self.properties['database'] = str(Path(self.data_dir).joinpath('ahatool', 'nr_test.fa'))
+
+    def teardown_class(self):
+        fx.test_teardown(self)
+
+    def test_merge_results(self):
+        for i in range(2):
+            with zipfile.ZipFile(f'part_{i}.zip', 'w') as zip_file:
+                zip_file.writestr('hits.tbl', f'# header\nt{i} - q - 1e-{20 + i} 100.0 0.1 1e-{20 + i} 99.0 0.1\nu{i} - q - 1e-11 10.0 0.1 1e-11 9.0 0.1\n')
+                zip_file.writestr('hits.domtbl', f'# header\nt{i} - 100 q - 50 1e-{20 + i} 80.0 0.1 1 1 1e-5 1e-4 79.0 0.1 1 50 1 60 1 65 0.95\n')
+                zip_file.writestr('query.hmm', f'HMMER3/f [3.3.2]\nNAME  query\nDATE  Mon Oct 18 10:0{i}:00 2026\n//\n')
+                zip_file.writestr('same.txt', 'same\n')
+                zip_file.writestr('report.txt', f'part {i}\n')
+                zip_file.writestr('hits.fasta', f'>t{i}\nACDE\n')
+                zip_file.writestr('hits.aln', f'CLUSTAL\n\nt{i} ACDE\n')
+        skipped = merge_results(['part_0.zip', 'part_1.zip'], 'merged.zip', [10, 10], evalue=1e-11)
+        # Profiles differing only in their DATE line are kept once, sequences and reports are
+        # concatenated and the other differing files are left out and listed in the zip
+        assert skipped == ['hits.aln']
+        with zipfile.ZipFile('merged.zip') as zip_file:
+            assert sorted(zip_file.namelist()) == ['MERGE_SKIPPED.json', 'hits.domtbl', 'hits.fasta', 'hits.tbl', 'query.hmm', 'report.txt', 'same.txt']
+            assert json.loads(zip_file.read('MERGE_SKIPPED.json'))['skipped_files'] == ['hits.aln']
+            assert 'DATE  Mon Oct 18 10:00:00 2026' in zip_file.read('query.hmm').decode()
+            assert zip_file.read('same.txt') == b'same\n'
+            assert zip_file.read('report.txt') == b'part 0\npart 1\n'
+            assert zip_file.read('hits.fasta') == b'>t0\nACDE\n>t1\nACDE\n'
+            # Rescaled E-values over the threshold are removed
+            rows = [row.split() for row in zip_file.read('hits.tbl').decode().splitlines()[1:]]
+            assert [(row[0], row[4], row[7]) for row in rows] == [('t1', '1e-20', '1e-20'), ('t0', '1e-19', '1e-19')]
+            # Domain E-values do not depend on the database size
+            rows = [row.split() for row in zip_file.read('hits.domtbl').decode().splitlines()[1:]]
+            assert [(row[0], row[6], row[11], row[12]) for row in rows] == [('t1', '1e-20', '1e-5', '1e-4'), ('t0', '1e-19', '1e-5', '1e-4')]
+
+    def test_ahatool_shards(self):
+        returncode = ahatool(properties=self.properties, **self.paths)
+        assert fx.exe_success(returncode)
+        shards = sorted(Path(self.properties['database_shard_dir']).glob('*/nr_test_*.fa'))
+        assert len(shards) == 2
+
+        with zipfile.ZipFile(self.paths['output_path']) as zip_file:
+            rows = [line.split() for line in zip_file.read('shards_hits.tbl').decode().splitlines() if not line.startswith('#')]
+        # The best 3 targets of every shard
+        expected = [sorted(fasta_names(shard), key=target_pvalue)[:3] for shard in shards]
+        assert sorted(row[0] for row in rows) == sorted(expected[0] + expected[1])
+        # E-values rescaled to the size of the full database, with 2 significant digits, and sorted
+        database_size = len(fasta_names(self.properties['database']))
+        evalues = [float(row[4]) for row in rows]
+        assert evalues == sorted(evalues)
+        for row, evalue in zip(rows, evalues):
+            assert abs(evalue / (target_pvalue(row[0]) * database_size) - 1) < 0.05
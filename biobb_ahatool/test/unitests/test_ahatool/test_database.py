@@ -0,0 +1,49 @@
+import os
+import shutil
+from pathlib import Path
+from biobb_common.tools import test_fixtures as fx
+from biobb_ahatool.test.fake_tools import FAKE_DOCKER, FAKE_ESL_SFETCH
+from biobb_ahatool.ahatool.database import index_is_valid, prepare_database
+
+
+class TestDatabase():
+    def setup_class(self):
+        fx.test_setup(self, 'database')
+
+    def teardown_class(self):
+        fx.test_teardown(self)
+
+    def test_prepare_database(self):
+        database = shutil.copy2(self.paths['database'], 'nr_test.fa')
+        esl_sfetch_path = str(Path(self.data_dir).joinpath('ahatool', 'fake', 'esl-sfetch'))
+        assert not index_is_valid(database)
+
+        manifest = prepare_database(database, esl_sfetch_path=esl_sfetch_path)
+        assert manifest['kind'] == 'fasta'
+        assert manifest['tool'].startswith('HMMER')
+        assert fx.not_empty(database + '.ssi')
+        assert index_is_valid(database)
+
+        with open(database, 'a') as f:
+            f.write('>new_sequence\nMKV\n')
+        assert not index_is_valid(database)
+        prepare_database(database, esl_sfetch_path=esl_sfetch_path)
+        assert index_is_valid(database)
+
+    def test_prepare_database_container(self):
+        database_dir = Path('container_db').resolve()
+        database_dir.mkdir()
+        database = shutil.copy2(self.paths['database'], str(database_dir.joinpath('nr_test.fa')))
+        os.environ['FAKE_DOCKER_STATE'] = str(Path('fake_docker').resolve())
+        try:
+            manifest = prepare_database(database, esl_sfetch_path=FAKE_ESL_SFETCH,
+                                        container_cmd=[FAKE_DOCKER, 'run', '--rm', '-v', f'{database_dir}:/home/database', 'image'],
+                                        container_database='/home/database/nr_test.fa')
+        finally:
+            os.environ.pop('FAKE_DOCKER_STATE')
+        # The binaries run in the container on its path of the database, the manifest keeps the host paths
+        calls = Path('fake_docker', 'calls.log').read_text().splitlines()
+        assert calls[0].endswith(f'{FAKE_ESL_SFETCH} --index /home/database/nr_test.fa')
+        assert manifest['tool'].startswith('HMMER')
+        assert manifest['index_files'] == [database + '.ssi']
+        assert index_is_valid(database)
@@ -0,0 +1,82 @@
+import shutil
+from pathlib import Path
+from biobb_common.tools import test_fixtures as fx
+from biobb_ahatool.test.fake_tools import FAKE_ESL_SFETCH, fake_test_setup
+from biobb_ahatool.ahatool.ahatool import Ahatool, ahatool
+from biobb_ahatool.ahatool.database import index_is_valid, prepare_database
+from biobb_ahatool.ahatool.staging import DatabaseScratch
+
+
+class TestDatabaseScratch():
+    def setup_class(self):
+        fake_test_setup(self, 'database_scratch')
+        self.esl_sfetch_path = FAKE_ESL_SFETCH
+
+    def teardown_class(self):
+        fx.test_teardown(self)
+
+    def test_stage(self):
+        database = shutil.copy2(self.paths['database'], 'stage_db.fa')
+        prepare_database(database, esl_sfetch_path=self.esl_sfetch_path)
+        scratch = DatabaseScratch('stage_scratch')
+        copy = scratch.stage(database)
+        scratch.release()
+        assert copy != str(Path(database).resolve())
+        assert Path(copy).read_bytes() == Path(database).read_bytes()
+        assert Path(copy + '.ssi').read_bytes() == Path(database + '.ssi').read_bytes()
+        assert index_is_valid(copy)
+
+        # Reused while the database does not change
+        copy_mtime = Path(copy).stat().st_mtime_ns
+        assert DatabaseScratch('stage_scratch').stage(database) == copy
+        assert Path(copy).stat().st_mtime_ns == copy_mtime
+        with open(database, 'a') as f:
+            f.write('>new_sequence\nMKV\n')
+        assert DatabaseScratch('stage_scratch').stage(database) != copy
+
+    def test_evict(self):
+        databases = []
+        for name in ('evict_a.fa', 'evict_b.fa', 'evict_c.fa'):
+            Path(name).write_text(f'>{name}\n' + 'ACDEFGHIKL' * 100 + '\n')
+            databases.append(name)
+        max_size = 2 * Path(databases[0]).stat().st_size + 500
+        used, used_c = DatabaseScratch('evict_scratch', max_size), DatabaseScratch('evict_scratch', max_size)
+        try:
+            copy_a = used.stage(databases[0])
+            scratch = DatabaseScratch('evict_scratch', max_size)
+            copy_b = scratch.stage(databases[1])
+            scratch.release()
+            # The copy of b and its lock files are evicted, the copy of a is in use
+            copy_c = used_c.stage(databases[2])
+            assert Path(copy_a).is_file() and Path(copy_c).is_file()
+            assert not Path(copy_b).exists()
+            assert not list(Path('evict_scratch').glob(f'.{Path(copy_b).parent.name}.*.lock'))
+            # Nothing can be evicted: the database is used in place
+            assert DatabaseScratch('evict_scratch', max_size).stage(databases[1]) == databases[1]
+        finally:
+            used.release()
+            used_c.release()
+
+    def test_ahatool_scratch_failure(self):
+        # A run failing with an exception releases its scratch copy
+        block = Ahatool(properties=dict(self.properties, database=self.paths['database'], scratch_dir='failure_scratch'),
+                        input_path=self.paths['input_path'], output_path='failure.zip')
+
+        def run_biobb():
+            raise OSError('run failed')
+        block.run_biobb = run_biobb
+        try:
+            block.launch()
+            assert False, 'The run did not fail'
+        except OSError:
+            pass
+        assert block.scratch.use_lock is None
+        assert DatabaseScratch('failure_scratch', 1).evict(1)
+
+    def test_ahatool_scratch(self):
+        properties = dict(self.properties, database=self.paths['database'], metrics=True)
+        assert fx.exe_success(ahatool(properties=properties, input_path=self.paths['input_path'],
+                                      output_path=self.paths['output_path']))
+        copies = list(Path('scratch').glob('db-*/nr_test.fa'))
+        assert len(copies) == 1
+        assert copies[0].read_bytes() == Path(self.paths['database']).read_bytes()
@@ -0,0 +1,52 @@
+import zipfile
+from pathlib import Path
+import numpy as np
+from biobb_common.tools import test_fixtures as fx
+from biobb_ahatool.test.fake_tools import fake_test_setup
+from biobb_ahatool.ahatool.ahatool import ahatool
+from biobb_ahatool.ahatool.hits import best_hits, collect_hits, filter_hits, parse_hit_table, read_hits, save_hits
+
+DOMAIN_TABLE = """# target tlen query qlen ...
+t1 - 100 q1 - 50 1e-20 80.0 0.1 1 1 1e-21 1e-20 79.0 0.1 1 50 1 60 1 65 0.95 first target
+t1 - 100 q1 - 50 1e-20 80.0 0.1 1 1 1e-5 1e-4 20.0 0.1 10 20 70 80 68 82 0.90 first target
+t2 - 200 q1 - 50 1e-3 12.0 0.3 1 1 1e-3 1e-2 11.0 0.3 1 25 1 30 1 32 0.80 -
+"""
+
+
+class TestHits():
+    def setup_class(self):
+        fake_test_setup(self, 'hits')
+
+    def teardown_class(self):
+        fx.test_teardown(self)
+
+    def test_domain_table(self):
+        hits = parse_hit_table(DOMAIN_TABLE.splitlines(), 'domain')
+        assert len(hits) == 3
+        assert hits['target'].tolist() == [b't1', b't1', b't2']
+        assert hits['hmm_to'].tolist() == [50, 20, 25]
+        np.testing.assert_allclose(hits['acc'], [0.95, 0.90, 0.80])
+        assert filter_hits(hits, min_coverage=0.9)['hmm_to'].tolist() == [50]
+        assert len(filter_hits(hits, max_evalue=1e-10, min_score=50)) == 2
+        assert best_hits(hits)['target'].tolist() == [b't1', b't2']
+
+    def test_collect_hits(self):
+        assert fx.exe_success(ahatool(properties=self.properties, **self.paths))
+        Path('two.fasta').write_text('>a\nACDE\n>longer_target_name\nACDE\n')
+        assert fx.exe_success(ahatool(properties=self.properties, input_path='two.fasta', output_path='two.zip'))
+        with zipfile.ZipFile('two.zip') as zip_file:
+            zip_file.extractall('two')
+
+        sources = [self.paths['output_path'], 'two.zip', 'two']
+        hits = collect_hits(sources)
+        assert hits['source'].tolist().count(0) == len(parse_hit_table(
+            zipfile.ZipFile(self.paths['output_path']).read('hits_hits.tbl').decode().splitlines()))
+        assert hits[hits['source'] == 1]['target'].tolist() == [b'a', b'longer_target_name']
+        assert hits[hits['source'] == 2]['target'].tolist() == [b'a', b'longer_target_name']
+        assert collect_hits(sources, max_workers=2).tobytes() == hits.tobytes()
+        assert len(collect_hits(sources, 'domain')) == 0
+
+        save_hits('hits.npz', filter_hits(hits, max_evalue=1e-29), sources)
+        saved, saved_sources = read_hits('hits.npz')
+        assert saved_sources == sources
+        assert saved['target'].tolist() == [t for t, e in zip(hits['target'].tolist(), hits['evalue']) if e <= 1e-29]
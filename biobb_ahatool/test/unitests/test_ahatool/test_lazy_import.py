@@ -0,0 +1,29 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+from biobb_common.tools import test_fixtures as fx
+
+# Root of the repository, importable by the subprocesses run from the test folder
+REPO_ROOT = str(Path(__file__).resolve().parents[4])
+
+
+class TestLazyImport():
+    def setup_class(self):
+        fx.test_setup(self, 'lazy_import')
+
+    def teardown_class(self):
+        fx.test_teardown(self)
+
+    def run_python(self, code):
+        python_path = os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get('PYTHONPATH')]))
+        return subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                              env={**os.environ, 'PYTHONPATH': python_path}).stdout.split()
+
+    def test_lazy_import(self):
+        # Importing the packages does not import the building blocks nor biobb_common
+        assert self.run_python("import sys, biobb_ahatool, biobb_ahatool.ahatool; "
+                               "print('biobb_common' in sys.modules, 'biobb_ahatool.ahatool.ahatool' in sys.modules)") == ['False', 'False']
+        # The building blocks are imported on first access
+        assert self.run_python("import biobb_ahatool; from biobb_ahatool.ahatool import ahatool; "
+                               "print(biobb_ahatool.Ahatool is ahatool.Ahatool, callable(biobb_ahatool.ahatool_container))") == ['True', 'True']
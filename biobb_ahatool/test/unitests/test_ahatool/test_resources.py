@@ -0,0 +1,38 @@
+from pathlib import Path
+from biobb_common.tools import test_fixtures as fx
+from biobb_ahatool.test.fake_tools import fake_test_setup
+from biobb_ahatool.ahatool.ahatool import Ahatool
+from biobb_ahatool.ahatool.resources import JOB_BASE_MEMORY, auto_threads
+
+
+class TestResources():
+    def setup_class(self):
+        fake_test_setup(self, 'resources')
+
+    def teardown_class(self):
+        fx.test_teardown(self)
+
+    def test_auto_threads(self):
+        gib = 1 << 30
+        assert auto_threads(cpus=8, memory=8 * gib)['threads'] == 4
+        assert auto_threads(cpus=8, memory=8 * gib)['runs'] == 2
+        assert auto_threads(cpus=3, memory=8 * gib)['threads'] == 2
+        assert auto_threads(cpus=0.5, memory=8 * gib)['threads'] == 1
+        # Database shards or input chunks share the CPUs of the run
+        assert auto_threads(parallel_jobs=4, cpus=8, memory=8 * gib)['threads'] == 2
+        # Runs limited by memory
+        assert auto_threads(cpus=16, memory=2 * JOB_BASE_MEMORY)['runs'] == 2
+        assert auto_threads(cpus=16, memory=2 * JOB_BASE_MEMORY)['run_memory'] == JOB_BASE_MEMORY
+
+    def test_auto_threads_shards(self):
+        Path('sizing.fa').write_bytes(b'>a\n' + b'A' * 4092 + b'\n')
+        # Every job of a sharded run searches one shard of the database
+        assert auto_threads('sizing.fa', cpus=4, memory=1 << 40)['job_memory'] == JOB_BASE_MEMORY + 4096
+        assert auto_threads('sizing.fa', parallel_jobs=4, cpus=4, memory=1 << 40, sharded=True)['job_memory'] == JOB_BASE_MEMORY + 1024
+        assert auto_threads('sizing.fa', parallel_jobs=4, cpus=4, memory=1 << 40)['job_memory'] == JOB_BASE_MEMORY + 4096
+
+    def test_ahatool_auto_threads(self):
+        block = Ahatool(properties=self.properties, **self.paths)
+        assert fx.exe_success(block.launch())
+        assert block.threads in (1, 2, 4)
+        assert block.sizing['threads'] == block.threads
@@ -0,0 +1,32 @@
+import time
+import zipfile
+from pathlib import Path
+from biobb_common.tools import test_fixtures as fx
+from biobb_ahatool.ahatool.streaming_zip import StreamingZip
+
+
+class TestStreamingZip():
+    def setup_class(self):
+        fx.test_setup(self, 'streaming_zip')
+
+    def teardown_class(self):
+        fx.test_teardown(self)
+
+    def test_streaming_zip(self):
+        results = Path('results')
+        results.mkdir()
+        zip_writer = StreamingZip(self.paths['output_path'], str(results), self.properties['zip_compression_level'],
+                                  exclude=self.properties['zip_exclude'], settle_time=0, poll_interval=0.05).start()
+        results.joinpath('hits.tbl').write_text('first\n')
+        results.joinpath('alignment.aln.gz').write_bytes(b'\x1f\x8b' + b'0' * 100)
+        results.joinpath('search.tmp').write_text('intermediate\n' * 100)
+        time.sleep(0.3)
+        assert 'hits.tbl' in zip_writer.archived
+        results.joinpath('hits.tbl').write_text('second version\n')
+        zip_writer.close()
+
+        with zipfile.ZipFile(self.paths['output_path']) as zip_file:
+            assert sorted(zip_file.namelist()) == ['alignment.aln.gz', 'hits.tbl']
+            assert zip_file.read('hits.tbl') == b'second version\n'
+            assert zip_file.getinfo('alignment.aln.gz').compress_type == zipfile.ZIP_STORED
+            assert zip_file.getinfo('hits.tbl').compress_type == zipfile.ZIP_DEFLATED
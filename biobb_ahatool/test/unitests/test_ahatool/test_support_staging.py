@@ -0,0 +1,58 @@
+import stat
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from biobb_common.tools import test_fixtures as fx
+from biobb_ahatool.test.fake_tools import FAKE_AHATOOL, fake_test_setup
+from biobb_ahatool.ahatool.ahatool import ahatool
+from biobb_ahatool.ahatool.staging import shared_support_dir
+
+
+def make_support_folder(support_folder: str) -> None:
+    Path(support_folder, 'models').mkdir(parents=True)
+    Path(support_folder, 'resource.txt').write_text('resource\n')
+    Path(support_folder, 'models', 'model.hmm').write_text('HMMER3/f\n//\n')
+
+
+class TestSupportStaging():
+    def setup_class(self):
+        fake_test_setup(self, 'support_staging')
+
+    def teardown_class(self):
+        fx.test_teardown(self)
+
+    def test_shared_support_dir(self):
+        make_support_folder('support')
+        staging_dir = self.properties['support_staging_dir']
+        shared_dir = shared_support_dir('support', FAKE_AHATOOL, staging_dir)
+        assert Path(shared_dir, 'models', 'model.hmm').read_text() == 'HMMER3/f\n//\n'
+        assert Path(shared_dir, 'AHATool.sh').is_file()
+        assert Path(shared_dir).is_absolute()
+        assert not Path(shared_dir, 'resource.txt').stat().st_mode & stat.S_IWUSR
+        assert not Path(shared_dir, 'models', 'model.hmm').stat().st_mode & stat.S_IWUSR
+        # Reused while the files do not change
+        assert shared_support_dir('support', FAKE_AHATOOL, staging_dir) == shared_dir
+
+        # A change in a subfolder makes a new copy
+        time.sleep(0.01)
+        Path('support', 'models', 'model.hmm').write_text('HMMER3/f\nNAME  changed\n//\n')
+        changed_dir = shared_support_dir('support', FAKE_AHATOOL, staging_dir)
+        assert changed_dir != shared_dir
+        assert 'changed' in Path(changed_dir, 'models', 'model.hmm').read_text()
+
+    def test_shared_support_dir_concurrent(self):
+        make_support_folder('concurrent_support')
+        staging_dir = 'concurrent_staging'
+        with ProcessPoolExecutor(max_workers=4) as executor:
+            shared_dirs = set(executor.map(shared_support_dir, ['concurrent_support'] * 8, [FAKE_AHATOOL] * 8, [staging_dir] * 8))
+        # All the callers get the same copy and the private copies of the others are removed
+        assert len(shared_dirs) == 1
+        assert [p.name for p in Path(staging_dir).iterdir()] == [Path(shared_dirs.pop()).name]
+
+    def test_ahatool_relative_staging_dir(self):
+        # The links of the sandbox to a relative staging folder are not dangling
+        Path('relative.fasta').write_text('>a\nACDEFGHIKL\n')
+        returncode = ahatool(properties=dict(self.properties, support_staging_dir='relative_staging'),
+                             input_path='relative.fasta', output_path='relative.zip')
+        assert fx.exe_success(returncode)
+        assert fx.not_empty('relative.zip')
@@ -18,7 +18,7 @@ setuptools.setup(
         "Bioexcel": "https://bioexcel.eu/"
     },
     packages=setuptools.find_packages(exclude=['adapters', 'docs', 'test']),
-    install_requires=['biobb_common==3.9.0'],
+    install_requires=['biobb_common==3.9.0', 'numpy'],
     python_requires='>=3.7,<3.10',
     classifiers=(
         "Development Status :: 3 - Alpha",